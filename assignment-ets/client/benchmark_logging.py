@@ -0,0 +1,113 @@
+import argparse
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+import file_client_cli_pool
+import file_client_v2
+
+"""
+Measures how much server logging costs: starts the server once per
+logging configuration and counts the small requests per second that a
+few persistent connections get through.
+"""
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'server')
+
+CONFIGURATIONS = {
+    'on': [],
+    'sampled': ['--log-sample', '0.01'],
+    'off': ['--log-level', 'WARNING'],
+}
+
+def start_server(port: int, mode: int, workers: int, extra: List[str], log_file) -> subprocess.Popen:
+    server = subprocess.Popen(
+        [sys.executable, 'file_server_pools.py', '--port', str(port), '--mode', str(mode),
+         '--workers', str(workers), '--non-interactive'] + extra,
+        cwd=SERVER_DIR, stdout=log_file, stderr=subprocess.STDOUT)
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            with file_client_v2.BinaryConnection():
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not start")
+
+def measure(connections: int, duration: float) -> Dict:
+    """Requests per second of ``connections`` clients sending LIST in a loop"""
+    counts = [0] * connections
+    errors = [0] * connections
+    stop = threading.Event()
+
+    def client(index):
+        with file_client_v2.BinaryConnection() as conn:
+            while not stop.is_set():
+                if conn.list(limit=1)['status'] == 'OK':
+                    counts[index] += 1
+                else:
+                    errors[index] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(connections)]
+    start_time = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start_time
+    return {"requests": sum(counts), "errors": sum(errors), "rps": sum(counts) / elapsed}
+
+def run_benchmark(args: argparse.Namespace) -> List[Dict]:
+    results = []
+    for name in args.configurations:
+        with tempfile.TemporaryFile() as log_file:
+            server = start_server(args.port, args.mode, args.workers, CONFIGURATIONS[name], log_file)
+            try:
+                measure(args.connections, min(1.0, args.duration))  # Warm up
+                result = measure(args.connections, args.duration)
+            finally:
+                server.terminate()
+                server.wait()
+            log_file.seek(0, os.SEEK_END)
+            result.update(configuration=name, log_bytes=log_file.tell())
+        results.append(result)
+    return results
+
+def display_results(results: List[Dict]) -> None:
+    baseline = next((r['rps'] for r in results if r['configuration'] == 'off'), None)
+    print(f"\n{'Logging':<10}{'Requests':>10}{'Errors':>8}{'Req/s':>10}{'vs off':>8}{'Log KB':>10}")
+    print("-" * 56)
+    for result in results:
+        ratio = f"{result['rps'] / baseline:.2f}" if baseline else '-'
+        print(f"{result['configuration']:<10}{result['requests']:>10}{result['errors']:>8}"
+              f"{result['rps']:>10.0f}{ratio:>8}{result['log_bytes'] / 1024:>10.0f}")
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Server throughput with logging on and off')
+    parser.add_argument('--port', type=int, default=8899, help='Port for the benchmark server')
+    parser.add_argument('--mode', type=int, choices=[1, 2, 3], default=1,
+                       help='Server mode: 1=Thread Pool, 2=Prefork, 3=Asyncio')
+    parser.add_argument('--workers', type=int, choices=[1, 5, 50], default=5)
+    parser.add_argument('--connections', type=int, default=8, help='Concurrent client connections')
+    parser.add_argument('--duration', type=float, default=5.0, help='Seconds per configuration')
+    parser.add_argument('--configurations', nargs='+', choices=list(CONFIGURATIONS),
+                       default=list(CONFIGURATIONS))
+    return parser.parse_args()
+
+def main() -> None:
+    args = parse_arguments()
+    logging.getLogger().setLevel(logging.ERROR)
+    file_client_cli_pool.server_address = ('127.0.0.1', args.port)
+    results = run_benchmark(args)
+    display_results(results)
+
+if __name__ == "__main__":
+    main()
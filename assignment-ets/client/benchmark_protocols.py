@@ -0,0 +1,85 @@
+import argparse
+import logging
+import os
+import time
+from typing import Callable, Dict, List
+
+import file_client_cli_pool
+import file_client_v2
+from stress_test_thread import FILE_SIZES, prepare_test_files, get_file_size
+
+"""
+Compares the legacy JSON/base64 protocol (v1) with the binary protocol (v2)
+by uploading and downloading the stress test files with both.
+"""
+
+PROTOCOLS = {
+    'v1': {
+        'upload': file_client_cli_pool.remote_upload,
+        'download': file_client_cli_pool.remote_get,
+    },
+    'v2': {
+        'upload': file_client_v2.remote_upload,
+        'download': file_client_v2.remote_get,
+    },
+}
+
+def time_operation(func: Callable[[str], bool], filename: str, repeat: int) -> Dict:
+    """Run one operation ``repeat`` times and keep the best time"""
+    timings = []
+    successes = 0
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        if func(filename):
+            successes += 1
+        timings.append(time.perf_counter() - start_time)
+    return {"best_time": min(timings), "successes": successes}
+
+def run_benchmark(filenames: List[str], repeat: int) -> List[Dict]:
+    results = []
+    for filename in filenames:
+        size = get_file_size(filename)
+        for operation in ('upload', 'download'):
+            for protocol, functions in PROTOCOLS.items():
+                timing = time_operation(functions[operation], filename, repeat)
+                results.append({
+                    "filename": filename,
+                    "operation": operation,
+                    "protocol": protocol,
+                    "size": size,
+                    "best_time": timing['best_time'],
+                    "throughput": size / timing['best_time'] if timing['best_time'] > 0 else 0,
+                    "successes": timing['successes'],
+                })
+        # Downloads land in the working directory
+        if os.path.exists(filename):
+            os.remove(filename)
+    return results
+
+def display_results(results: List[Dict], repeat: int) -> None:
+    print(f"\n{'File':<16}{'Operation':<10}{'Protocol':<10}{'Best time (s)':>14}{'MB/s':>10}{'OK':>6}")
+    print("-" * 66)
+    for result in results:
+        print(f"{result['filename']:<16}{result['operation']:<10}{result['protocol']:<10}"
+              f"{result['best_time']:>14.3f}{result['throughput']/1024/1024:>10.2f}"
+              f"{result['successes']:>3}/{repeat}")
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Protocol v1 vs v2 benchmark')
+    parser.add_argument('--host', default=file_client_cli_pool.server_address[0])
+    parser.add_argument('--port', type=int, default=file_client_cli_pool.server_address[1])
+    parser.add_argument('--files', nargs='+', choices=list(FILE_SIZES.keys()),
+                       default=list(FILE_SIZES.keys()), help='Test files to transfer')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement')
+    return parser.parse_args()
+
+def main() -> None:
+    args = parse_arguments()
+    logging.getLogger().setLevel(logging.ERROR)
+    file_client_cli_pool.server_address = (args.host, args.port)
+    prepare_test_files()
+    results = run_benchmark(args.files, args.repeat)
+    display_results(results, args.repeat)
+
+if __name__ == "__main__":
+    main()
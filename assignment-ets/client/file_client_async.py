@@ -0,0 +1,408 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+import time
+from collections import deque
+
+import file_client_cli_pool
+from file_client_cli_pool import (StaleConnection, DecompressingFile, ResponseParser,
+                                  STREAM_BUFFER_SIZE, RESPONSE_BUFFER_SIZE, BUSY_RETRIES,
+                                  POOL_MAX_SIZE, busy_delay)
+
+"""
+* Client asyncio untuk file server (protokol v1), padanan remote_list,
+  remote_get, remote_upload dan remote_delete di file_client_cli_pool.
+  Satu proses bisa menjalankan ribuan transfer bersamaan tanpa satu
+  thread/proses per client.
+
+* GET memakai GETRAW dan UPLOAD memakai UPLOADRAW: isi file mengalir
+  per potongan STREAM_BUFFER_SIZE antara socket dan file, tidak pernah
+  dimuat utuh ke memori dan tanpa base64.
+
+* Baca/tulis file (dan dekompresi) berjalan di thread pool, dikumpulkan
+  per DISK_BATCH byte, supaya disk yang lambat tidak menahan event loop
+  dan semua koneksi lain.
+
+* Setiap langkah I/O (connect, baca, kirim) dibatasi timeout; transfer
+  besar tetap boleh lama selama datanya terus mengalir.
+
+* AsyncClient menyimpan koneksi idle untuk dipakai ulang, membatasi
+  jumlah koneksi yang terbuka, dan mengirim ulang sekali jika koneksi
+  lama ternyata sudah ditutup server. Request yang dijawab BUSY, atau
+  koneksi baru yang langsung ditutup server tanpa jawaban, diulang
+  dengan backoff selama belum melewati timeout.
+
+Contoh:
+
+    async with AsyncClient() as client:
+        await asyncio.gather(*(remote_get(name, client=client) for name in names))
+"""
+
+IO_TIMEOUT = 60.0  # Seconds one connect, read or write may take
+MAX_CONNECTIONS = 1000  # Connections an AsyncClient keeps open at once
+MAX_RESPONSE = 64 * 1024 * 1024  # Longest JSON response, e.g. a LIST of many files
+# The StreamReader limit is also its flow-control mark (reading pauses past
+# 2x limit), so it stays at the asyncio default; long JSON is read in pieces
+READER_LIMIT = 64 * 1024
+DISK_BATCH = STREAM_BUFFER_SIZE  # Received bytes collected per file write in the pool
+
+LENGTH_PREFIX = struct.Struct('!I')
+
+
+class AsyncConnection:
+    """One v1 connection; each method sends a command and reads its answer"""
+    def __init__(self, reader, writer, timeout=IO_TIMEOUT):
+        self.reader = reader
+        self.writer = writer
+        self.timeout = timeout
+        self.address = file_client_cli_pool.server_address
+
+    @classmethod
+    async def open(cls, timeout=IO_TIMEOUT):
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(*file_client_cli_pool.server_address, limit=READER_LIMIT), timeout)
+        writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return cls(reader, writer, timeout)
+
+    def is_open(self):
+        return not self.reader.at_eof() and not self.writer.is_closing()
+
+    def close(self):
+        self.writer.close()
+
+    async def _wait(self, awaitable):
+        return await asyncio.wait_for(awaitable, self.timeout)
+
+    async def _drain(self):
+        try:
+            await self._wait(self.writer.drain())
+        except (BrokenPipeError, ConnectionResetError) as e:
+            raise StaleConnection(str(e)) from e
+
+    async def _first(self, awaitable):
+        # The first read of an answer tells a connection the server closed
+        # while it was idle (nothing was processed) from a real failure
+        try:
+            return await self._wait(awaitable)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                raise
+            raise StaleConnection("Connection closed by the server") from e
+        except ConnectionResetError as e:
+            raise StaleConnection(str(e)) from e
+
+    async def send(self, command_str, payload_length=None):
+        command_bytes = command_str.encode()
+        message = LENGTH_PREFIX.pack(len(command_bytes)) + command_bytes
+        if payload_length is not None:
+            message += LENGTH_PREFIX.pack(payload_length)
+        self.writer.write(message)
+        await self._drain()
+
+    async def recv_json(self):
+        """A JSON response terminated by CRLFCRLF, at most MAX_RESPONSE bytes"""
+        parser = ResponseParser()
+        received = 0
+        while True:
+            read = self.reader.read(RESPONSE_BUFFER_SIZE)
+            chunk = await (self._wait(read) if received else self._first(read))
+            if not chunk:
+                if not received:
+                    raise StaleConnection("Connection closed by the server")
+                raise RuntimeError("Socket connection broken")
+            received += len(chunk)
+            if received > MAX_RESPONSE:
+                raise RuntimeError(f"Response longer than {MAX_RESPONSE} bytes")
+            if parser.feed(chunk):
+                return parser.result()
+
+    async def recv_header(self):
+        """The length-prefixed JSON header of a raw response"""
+        length = LENGTH_PREFIX.unpack(await self._first(self.reader.readexactly(LENGTH_PREFIX.size)))[0]
+        return json.loads(await self._wait(self.reader.readexactly(length)))
+
+    async def recv_body(self, fp, length):
+        batch = DiskBatch(fp)
+        while length > 0:
+            chunk = await self._wait(self.reader.read(min(length, STREAM_BUFFER_SIZE)))
+            if not chunk:
+                raise RuntimeError("Socket connection broken")
+            await batch.write(chunk)
+            length -= len(chunk)
+        await batch.flush()
+
+    async def recv_chunks(self, fp):
+        """Copy a chunked body (4-byte length + data, ended by length 0) into fp"""
+        batch = DiskBatch(fp)
+        while True:
+            length = LENGTH_PREFIX.unpack(await self._wait(self.reader.readexactly(LENGTH_PREFIX.size)))[0]
+            if length == 0:
+                break
+            await batch.write(await self._wait(self.reader.readexactly(length)))
+        await batch.flush()
+
+    async def command(self, command_str):
+        await self.send(command_str)
+        return await self.recv_json()
+
+    async def list(self):
+        return await self.command("LIST")
+
+    async def delete(self, filename):
+        return await self.command(f"DELETE {filename}")
+
+    async def get(self, filename, local_path=None, accept=None, cached=True):
+        """GETRAW ``filename`` into ``local_path`` (the name by default).
+
+        Uses file_client_cli_pool.download_cache like the blocking client;
+        a copy revalidated from the cache is reported as ``cached``.
+        """
+        command_str = f"GETRAW {filename}"
+        if accept:
+            command_str += f" accept={accept}"
+        etag = file_client_cli_pool.cached_etag(filename) if cached else None
+        if etag:
+            command_str += f" if_none_match={etag}"
+        await self.send(command_str)
+        hasil = await self.recv_header()
+        if hasil['status'] == 'NOT_MODIFIED':
+            if await asyncio.to_thread(file_client_cli_pool.from_cache, filename, etag,
+                                       local_path or hasil['data_namafile']):
+                return dict(hasil, status='OK', cached=True)
+            return await self.get(filename, local_path, accept, cached=False)
+        if hasil['status'] != 'OK':
+            return hasil
+        local_path = local_path or hasil['data_namafile']
+        # Like part_file: only a complete body is renamed to local_path
+        fp, part_path = await asyncio.to_thread(file_client_cli_pool.open_part_file, local_path)
+        try:
+            try:
+                sink = DecompressingFile(fp, hasil['compression']) if hasil.get('compression') else fp
+                if hasil.get('chunked'):
+                    await self.recv_chunks(sink)
+                else:
+                    await self.recv_body(sink, hasil['data_size'])
+                if sink is not fp:
+                    await asyncio.to_thread(sink.finish)
+            finally:
+                await asyncio.to_thread(fp.close)
+        except BaseException:
+            file_client_cli_pool.remove_part_file(part_path)
+            raise
+        await asyncio.to_thread(os.replace, part_path, local_path)
+        await asyncio.to_thread(file_client_cli_pool.remember_download, filename, local_path, hasil.get('etag'))
+        return hasil
+
+    async def upload(self, local_path, filename=None):
+        """UPLOADRAW ``local_path``, streamed from disk"""
+        filename = filename or os.path.basename(local_path)
+        fp = await asyncio.to_thread(open, local_path, 'rb')
+        try:
+            size = os.fstat(fp.fileno()).st_size
+            await self.send(f"UPLOADRAW {filename}", size)
+            while True:
+                chunk = await asyncio.to_thread(fp.read, DISK_BATCH)
+                if not chunk:
+                    break
+                self.writer.write(chunk)
+                await self._drain()
+        finally:
+            fp.close()
+        return await self.recv_json()
+
+
+class DiskBatch:
+    """Collects received pieces and writes them to ``fp`` in the thread
+    pool once DISK_BATCH bytes are pending, so the event loop never waits
+    on the disk (or on decompression, when ``fp`` decompresses)"""
+    def __init__(self, fp):
+        self.fp = fp
+        self.pieces = []
+        self.pending = 0
+
+    async def write(self, data):
+        self.pieces.append(data)
+        self.pending += len(data)
+        if self.pending >= DISK_BATCH:
+            await self.flush()
+
+    async def flush(self):
+        if self.pieces:
+            pieces, self.pieces, self.pending = self.pieces, [], 0
+            await asyncio.to_thread(self._write_all, pieces)
+
+    def _write_all(self, pieces):
+        for piece in pieces:
+            self.fp.write(piece)
+
+
+class AsyncClient:
+    """Runs requests on pooled AsyncConnections within one event loop.
+
+    At most ``max_connections`` requests are in flight; further ones wait
+    for a free slot instead of opening more sockets. Up to ``pool_size``
+    idle connections are kept for reuse.
+    """
+    def __init__(self, max_connections=MAX_CONNECTIONS, pool_size=POOL_MAX_SIZE, timeout=IO_TIMEOUT):
+        self.slots = asyncio.Semaphore(max_connections)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.idle = deque()
+        self.retry_after = None  # Latest hint from a BUSY answer
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def close(self):
+        while self.idle:
+            self.idle.popleft().close()
+
+    async def acquire(self):
+        """(connection, reused)"""
+        while self.idle:
+            conn = self.idle.pop()
+            if conn.address == file_client_cli_pool.server_address and conn.is_open():
+                return conn, True
+            conn.close()
+        return await AsyncConnection.open(self.timeout), False
+
+    def release(self, conn):
+        if len(self.idle) < self.pool_size and conn.is_open():
+            self.idle.append(conn)
+        else:
+            conn.close()
+
+    async def run(self, operation):
+        """``await operation(conn)``, retried while the server answers BUSY.
+
+        With thousands of requests in flight a few retries are not enough
+        for the server's queue to drain, so BUSY is retried with growing
+        backoff for up to ``timeout`` seconds rather than a fixed count.
+        """
+        async with self.slots:
+            deadline = time.monotonic() + self.timeout
+            attempt = 0
+            while True:
+                try:
+                    hasil = await self._exchange(operation)
+                except StaleConnection:
+                    # A server shedding more connections than it can even
+                    # answer BUSY on closes new ones without a reply; wait
+                    # as long as its last BUSY on another connection asked
+                    if time.monotonic() >= deadline:
+                        raise
+                    hasil = {'status': 'BUSY', 'retry_after': self.retry_after}
+                if not (isinstance(hasil, dict) and hasil.get('status') == 'BUSY'):
+                    return hasil
+                self.retry_after = hasil.get('retry_after') or self.retry_after
+                delay = busy_delay(self.retry_after, min(attempt, BUSY_RETRIES))
+                if time.monotonic() + delay >= deadline:
+                    return hasil
+                logging.debug(f"server busy, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def _exchange(self, operation):
+        conn, reused = await self.acquire()
+        try:
+            try:
+                hasil = await operation(conn)
+            except StaleConnection:
+                if not reused:
+                    raise
+                conn.close()
+                conn = await AsyncConnection.open(self.timeout)
+                hasil = await operation(conn)
+        except BaseException:
+            conn.close()
+            raise
+        self.release(conn)
+        return hasil
+
+    async def list(self):
+        return await self.run(lambda conn: conn.list())
+
+    async def get(self, filename, local_path=None, accept=None):
+        return await self.run(lambda conn: conn.get(filename, local_path, accept))
+
+    async def upload(self, local_path, filename=None):
+        return await self.run(lambda conn: conn.upload(local_path, filename))
+
+    async def delete(self, filename):
+        return await self.run(lambda conn: conn.delete(filename))
+
+
+async def request(operation, client=None):
+    """Run ``operation`` on ``client``, or on a one-off connection without one"""
+    if client is not None:
+        return await client.run(operation)
+    async with AsyncClient(pool_size=0) as one_off:
+        return await one_off.run(operation)
+
+async def remote_list(client=None):
+    try:
+        hasil = await request(lambda conn: conn.list(), client)
+    except Exception as e:
+        logging.warning(f"error during data receiving: {str(e)}")
+        return False
+    if (hasil['status']=='OK'):
+        print("daftar file : ")
+        for nmfile in hasil['data']:
+            print(f"- {nmfile}")
+        return True
+    else:
+        print("Gagal")
+        return False
+
+async def remote_get(filename="", accept=None, client=None):
+    try:
+        hasil = await request(lambda conn: conn.get(filename, accept=accept), client)
+    except Exception as e:
+        logging.warning(f"error during data receiving: {str(e)}")
+        return False
+    if (hasil['status']=='OK'):
+        return True
+    else:
+        print(f"Gagal: {hasil['data']}")
+        return False
+
+async def remote_upload(filename="", client=None):
+    filepath = os.path.join("./files", filename)
+    if not os.path.exists(filepath):
+        print(f"File {filename} tidak ditemukan di direktori files")
+        return False
+    try:
+        hasil = await request(lambda conn: conn.upload(filepath, filename), client)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return False
+    if (hasil['status']=='OK'):
+        print(f"File {filename} berhasil diupload")
+        return True
+    else:
+        print(f"Gagal upload: {hasil['data']}")
+        return False
+
+async def remote_delete(filename="", client=None):
+    try:
+        hasil = await request(lambda conn: conn.delete(filename), client)
+    except Exception as e:
+        logging.warning(f"error during data receiving: {str(e)}")
+        return False
+    if (hasil['status']=='OK'):
+        print(f"File {filename} berhasil dihapus")
+        return True
+    else:
+        print(f"Gagal menghapus: {hasil['data']}")
+        return False
+
+
+if __name__=='__main__':
+    file_client_cli_pool.server_address=('172.16.16.101', 8889)
+    asyncio.run(remote_list())
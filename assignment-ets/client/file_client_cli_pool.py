@@ -1,24 +1,76 @@
 import socket
 import json
 import base64
+import binascii
 import logging
 import time
 import struct
 import os
+import hashlib
+import mmap
+import random
+import tempfile
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from file_codec import SAMPLE_SIZE, Decompressor, compress_chunks, worth_compressing
+from file_delta import compute_delta
+from file_download_cache import DownloadCache, DEFAULT_DIRECTORY, DEFAULT_MAX_BYTES
 
 server_address=('172.16.16.101', 8889)
 
 # Configure socket buffer sizes
-SOCKET_BUFFER_SIZE = 256 * 1024 * 1024  # 256MB buffer (balanced size)
-CHUNK_SIZE = 256 * 1024 * 1024  # 256MB chunks for file transfer
+SOCKET_BUFFER_SIZE = None  # SO_SNDBUF/SO_RCVBUF; None keeps the kernel's autotuning
+STREAM_BUFFER_SIZE = 1024 * 1024  # 1MB reusable buffer for streamed downloads
+RESPONSE_BUFFER_SIZE = 64 * 1024  # recv() size for JSON responses
+RESPONSE_TERMINATOR = b"\r\n\r\n"
 
-def send_command(command_str="", binary_data=None):
+# Retries when the server answers BUSY
+BUSY_RETRIES = 5
+BACKOFF_MIN = 0.05  # Seconds, used when the server gives no retry_after
+BACKOFF_MAX = 10.0
+
+# Kept-alive v1 connections shared by the remote_* functions
+POOL_MAX_SIZE = 32  # Idle connections kept open
+POOL_IDLE_TIMEOUT = 30.0  # Seconds before an unused connection is closed
+
+def umask_file_mode():
+    """The mode open(..., 'wb') gives a new file under the process umask"""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+# Downloads are written to a mkstemp file (mode 0600) and renamed; they get
+# this mode first, like a file opened by name. Read once, at import time,
+# because os.umask can only be read by setting it.
+DOWNLOAD_FILE_MODE = umask_file_mode()
+
+# Delta uploads (remote_upload(..., delta=True))
+DELTA_MIN_SIZE = 64 * 1024  # Smaller files are simply sent in full
+DELTA_MAX_CHANGED = 0.5  # Send in full when more than this fraction changed
+DELTA_MAX_LITERAL = 2 * 1024 * 1024  # Changed bytes are searched byte by byte (~1 MB/s); past this sending in full is faster
+
+def open_download_cache(directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES):
+    """The DownloadCache, or None (no cache) when its directory is not usable"""
+    try:
+        return DownloadCache(directory, max_bytes)
+    except OSError as e:
+        logging.warning(f"download cache disabled: {str(e)}")
+        return None
+
+# Downloads kept on disk and revalidated with a conditional GET, so repeating
+# the download of an unchanged file is one small round trip; None disables it
+download_cache = open_download_cache()
+
+def open_connection():
     global server_address
     sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     
     # Optimize socket settings
-    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, struct.pack('i', SOCKET_BUFFER_SIZE))
-    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, struct.pack('i', SOCKET_BUFFER_SIZE))
+    if SOCKET_BUFFER_SIZE:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, struct.pack('i', SOCKET_BUFFER_SIZE))
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, struct.pack('i', SOCKET_BUFFER_SIZE))
     sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
     # Enable TCP keepalive
     sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
@@ -29,47 +81,377 @@ def send_command(command_str="", binary_data=None):
     
     sock.connect(server_address)
     logging.warning(f"connecting to {server_address}")
-    try:
-        # Send command length first (4 bytes)
-        command_bytes = command_str.encode()
-        command_length = len(command_bytes)
-        sock.sendall(struct.pack('!I', command_length))
-        
-        # Send command
-        sock.sendall(command_bytes)
-        
-        # If there's binary data to send
-        if binary_data:
-            # Send binary data length
-            data_length = len(binary_data)
-            sock.sendall(struct.pack('!I', data_length))
-            # Send binary data in chunks
-            total_sent = 0
-            while total_sent < data_length:
-                sent = sock.send(binary_data[total_sent:total_sent + CHUNK_SIZE])
-                if sent == 0:
-                    raise RuntimeError("Socket connection broken")
-                total_sent += sent
-            
-        # Look for the response
-        data_received = b""
+    return sock
+
+class StaleConnection(ConnectionError):
+    """The server closed a kept-alive connection before answering"""
+
+class ConnectionPool:
+    """Thread-safe pool of idle connections to ``server_address``.
+
+    ``acquire`` hands out the most recently used idle connection that is
+    still open, or a new one; ``release`` returns it after a complete
+    exchange, keeping at most ``max_size`` idle for up to
+    ``idle_timeout`` seconds. A connection whose request failed is closed
+    instead of released. Pooled connections are dropped in a forked
+    child, which must not share them with its parent.
+    """
+    def __init__(self, max_size=POOL_MAX_SIZE, idle_timeout=POOL_IDLE_TIMEOUT):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.idle = deque()  # (sock, address, released at), oldest first
+        self.pid = os.getpid()
+
+    def acquire(self):
+        """(connection, reused)"""
         while True:
-            chunk = sock.recv(SOCKET_BUFFER_SIZE)
-            if chunk:
-                data_received += chunk
-                if b"\r\n\r\n" in data_received:
+            with self.lock:
+                self._check_fork()
+                self._expire(time.monotonic())
+                if not self.idle:
                     break
-            else:
-                break
-                
-        hasil = json.loads(data_received.decode())
-        logging.warning("data received from server:")
+                sock, address, _ = self.idle.pop()
+            if address == server_address and is_open(sock):
+                return sock, True
+            sock.close()
+        return open_connection(), False
+
+    def release(self, sock):
+        with self.lock:
+            self._check_fork()
+            if len(self.idle) < self.max_size:
+                self.idle.append((sock, server_address, time.monotonic()))
+                return
+        sock.close()
+
+    def close(self):
+        with self.lock:
+            while self.idle:
+                self.idle.popleft()[0].close()
+
+    def exchange(self, request):
+        """Run ``request(sock)`` on a pooled connection and return its result.
+
+        A reused connection that turns out to be closed by the server
+        (StaleConnection) is replaced by a new one, once.
+        """
+        sock, reused = self.acquire()
+        try:
+            try:
+                result = request(sock)
+            except StaleConnection:
+                if not reused:
+                    raise
+                sock.close()
+                sock = open_connection()
+                result = request(sock)
+        except BaseException:
+            sock.close()
+            raise
+        self.release(sock)
+        return result
+
+    def _expire(self, now):
+        while self.idle and now - self.idle[0][2] > self.idle_timeout:
+            self.idle.popleft()[0].close()
+
+    def _check_fork(self):
+        if self.pid != os.getpid():
+            for sock, _, _ in self.idle:
+                sock.close()  # Only this process's copy of the descriptor
+            self.idle.clear()
+            self.pid = os.getpid()
+
+# None opens a new connection for every command
+connection_pool = ConnectionPool()
+
+def is_open(sock):
+    """Health check of an idle connection: nothing to read and no EOF"""
+    try:
+        sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+    return False  # EOF, or bytes no request asked for
+
+def exchange(request):
+    """``request(sock)`` on a pooled connection, or on a new one without a pool"""
+    if connection_pool is not None:
+        return connection_pool.exchange(request)
+    sock = open_connection()
+    try:
+        return request(sock)
+    finally:
+        sock.close()
+
+def send_request(sock, command_str="", binary_data=None):
+    # Send command length first (4 bytes)
+    command_bytes = command_str.encode()
+    command_length = len(command_bytes)
+    sock.sendall(struct.pack('!I', command_length))
+    
+    # Send command
+    sock.sendall(command_bytes)
+    
+    # If there's binary data to send (an empty payload still needs its length)
+    if binary_data is not None:
+        # Send binary data length
+        data_length = len(binary_data)
+        sock.sendall(struct.pack('!I', data_length))
+        if isinstance(binary_data, Base64Payload):
+            for piece in binary_data.pieces():
+                sock.sendall(piece)
+        else:
+            # Send binary data without copying it into slices
+            sock.sendall(memoryview(binary_data))
+
+class Base64Payload:
+    """The base64 text of the rest of ``fp``, encoded piece by piece while
+    it is sent; its length is known up front for the length prefix"""
+    def __init__(self, fp):
+        self.fp = fp
+        self.start = fp.tell()
+        self.length = 4 * -(-(os.fstat(fp.fileno()).st_size - self.start) // 3)
+
+    def __len__(self):
+        return self.length
+
+    def pieces(self):
+        # From the start again on every call, so a retried request resends it all
+        self.fp.seek(self.start)
+        piece_size = STREAM_BUFFER_SIZE - STREAM_BUFFER_SIZE % 3
+        while True:
+            piece = self.fp.read(piece_size)
+            if not piece:
+                return
+            yield base64.b64encode(piece)
+
+def send_and_wait(sock, command_str="", binary_data=None):
+    """Send a request and wait until its answer starts arriving"""
+    try:
+        send_request(sock, command_str, binary_data)
+        first = sock.recv(1, socket.MSG_PEEK)
+    except (BrokenPipeError, ConnectionResetError) as e:
+        raise StaleConnection(str(e)) from e
+    if not first:
+        raise StaleConnection("Connection closed by the server")
+
+def recv_exact(sock, length):
+    data = bytearray(length)
+    view = memoryview(data)
+    received = 0
+    while received < length:
+        nbytes = sock.recv_into(view[received:])
+        if nbytes == 0:
+            raise RuntimeError("Socket connection broken")
+        received += nbytes
+    return bytes(data)
+
+def recv_body(sock, fp, length, buffer=None):
+    """Copy ``length`` bytes from the socket into fp through one reusable buffer"""
+    if buffer is None:
+        buffer = bytearray(min(STREAM_BUFFER_SIZE, length) or 1)
+    view = memoryview(buffer)
+    while length > 0:
+        nbytes = sock.recv_into(view[:min(length, len(buffer))])
+        if nbytes == 0:
+            raise RuntimeError("Socket connection broken")
+        fp.write(view[:nbytes])
+        length -= nbytes
+
+def create_part_file(directory, prefix):
+    """A new uniquely named ``.part`` file in ``directory``: (file open for
+    writing, path). Concurrent downloads of one name each get their own."""
+    fd, part_path = tempfile.mkstemp(dir=directory or '.', prefix=prefix, suffix='.part')
+    try:
+        os.fchmod(fd, DOWNLOAD_FILE_MODE)
+        return os.fdopen(fd, 'wb'), part_path
+    except BaseException:
+        os.close(fd)
+        os.unlink(part_path)
+        raise
+
+def open_part_file(local_path):
+    """create_part_file next to ``local_path``, so renaming it is atomic"""
+    directory, name = os.path.split(local_path)
+    return create_part_file(directory, '.' + name + '.')
+
+def remove_part_file(part_path):
+    try:
+        os.unlink(part_path)
+    except FileNotFoundError:
+        pass
+
+@contextmanager
+def part_file(local_path):
+    """Write a download to its own ``.part`` file and rename it to
+    ``local_path`` only when the block completes; a failed or truncated
+    download is removed instead of looking like a finished file"""
+    fp, part_path = open_part_file(local_path)
+    try:
+        with fp:
+            yield fp
+    except BaseException:
+        remove_part_file(part_path)
+        raise
+    os.replace(part_path, local_path)
+
+def recv_chunks(sock, fp):
+    """Copy a chunked body (4-byte length + data, ended by length 0) into fp"""
+    buffer = bytearray(STREAM_BUFFER_SIZE)
+    while True:
+        length = struct.unpack('!I', recv_exact(sock, 4))[0]
+        if length == 0:
+            return
+        recv_body(sock, fp, length, buffer)
+
+class Base64Writer:
+    """Write-only wrapper that decodes the base64 text written into ``fp``,
+    however it is split; a partial 4-character group waits for the next write"""
+    def __init__(self, fp):
+        self.fp = fp
+        self.pending = b''
+
+    def write(self, text):
+        text = self.pending + text
+        whole = len(text) - len(text) % 4
+        if whole:
+            self.fp.write(binascii.a2b_base64(text[:whole]))
+        self.pending = text[whole:]
+
+    def finish(self):
+        if self.pending:
+            raise ValueError("Truncated base64 data")
+
+class ResponseParser:
+    """Push parser for a JSON + CRLFCRLF response.
+
+    Each ``feed`` only searches the new bytes (and the few before them a
+    terminator could straddle), so receiving is linear in the response
+    size. With ``fp``, the base64 string ``stream_field`` is not kept: it
+    is decoded into ``fp`` as it arrives and left out of ``result()``.
+    """
+    def __init__(self, fp=None, stream_field='data_file'):
+        self.fp = fp
+        self.marker = f'"{stream_field}": "'.encode() if fp is not None else None
+        self.stream_field = stream_field
+        self.overlap = max(len(self.marker or b''), len(RESPONSE_TERMINATOR)) - 1
+        self.head = bytearray()  # The JSON up to the streamed value (all of it without one)
+        self.tail = None  # The JSON after the streamed value
+        self.writer = None
+
+    def feed(self, data):
+        """True once the whole response has arrived"""
+        position = 0
+        while position < len(data):
+            if self.writer is not None and self.tail is None:
+                end = data.find(b'"', position)  # Base64 never contains a quote
+                if end == -1:
+                    self.writer.write(data[position:])
+                    return False
+                self.writer.write(data[position:end])
+                self.writer.finish()
+                self.tail = bytearray()
+                position = end + 1
+                continue
+            received = self.head if self.tail is None else self.tail
+            searched = max(0, len(received) - self.overlap)
+            received += data[position:]
+            position = len(data)
+            if self.marker is not None and self.writer is None:
+                start = received.find(self.marker, searched)
+                if start != -1:
+                    value = start + len(self.marker)
+                    data, position = bytes(received[value:]), 0
+                    del received[value:]
+                    self.writer = Base64Writer(self.fp)
+                    continue
+            if received.find(RESPONSE_TERMINATOR, searched) != -1:
+                return True
+        return False
+
+    def result(self):
+        if self.writer is None:
+            return json.loads(self.head)
+        hasil = json.loads(self.head + b'"' + self.tail)
+        del hasil[self.stream_field]
         return hasil
+
+def recv_response(sock, fp=None):
+    """Receive a JSON + CRLFCRLF response; see ResponseParser for ``fp``"""
+    parser = ResponseParser(fp)
+    while True:
+        chunk = sock.recv(RESPONSE_BUFFER_SIZE)
+        if not chunk:
+            raise RuntimeError("Socket connection broken")
+        if parser.feed(chunk):
+            return parser.result()
+
+class DecompressingFile:
+    """Write-only wrapper that decompresses what is written into ``fp``"""
+    def __init__(self, fp, codec):
+        self.fp = fp
+        self.decompressor = Decompressor(codec, STREAM_BUFFER_SIZE)
+
+    def write(self, data):
+        self.decompressor.feed(data, self.fp.write)
+
+    def finish(self):
+        self.decompressor.finish()
+
+def compress_file(fp, codec):
+    """Compress the rest of ``fp`` into an anonymous temporary file.
+
+    Returns None when the first SAMPLE_SIZE bytes do not compress well
+    enough to be worth it; ``fp`` is left at its original position.
+    """
+    start = fp.tell()
+    sample = fp.read(SAMPLE_SIZE)
+    fp.seek(start)
+    if not worth_compressing(codec, sample):
+        return None
+    out = tempfile.TemporaryFile()
+    with open(os.dup(fp.fileno()), 'rb', closefd=True) as source:
+        for piece in compress_chunks(source, codec, STREAM_BUFFER_SIZE):
+            out.write(piece)
+    out.flush()
+    out.seek(0)
+    return out
+
+def busy_delay(retry_after, attempt):
+    """Wait before retry ``attempt``: the server's hint doubled per attempt,
+    with jitter so rejected clients do not come back all at once"""
+    delay = min(max(retry_after or 0, BACKOFF_MIN) * (2 ** attempt), BACKOFF_MAX)
+    return random.uniform(delay / 2, delay)
+
+def retry_busy(request):
+    """Call ``request()`` again while it returns a BUSY result"""
+    for attempt in range(BUSY_RETRIES):
+        hasil = request()
+        if not (isinstance(hasil, dict) and hasil.get('status') == 'BUSY'):
+            return hasil
+        delay = busy_delay(hasil.get('retry_after'), attempt)
+        logging.warning(f"server busy, retrying in {delay:.2f}s")
+        time.sleep(delay)
+    return request()
+
+def send_command(command_str="", binary_data=None):
+    return retry_busy(lambda: send_command_once(command_str, binary_data))
+
+def send_command_once(command_str="", binary_data=None):
+    try:
+        return exchange(lambda sock: command_exchange(sock, command_str, binary_data))
     except Exception as e:
         logging.warning(f"error during data receiving: {str(e)}")
         return False
-    finally:
-        sock.close()
+
+def command_exchange(sock, command_str, binary_data):
+    send_and_wait(sock, command_str, binary_data)
+    hasil = recv_response(sock)
+    logging.warning("data received from server:")
+    return hasil
 
 def remote_list():
     command_str = "LIST"
@@ -83,21 +465,141 @@ def remote_list():
         print("Gagal")
         return False
 
+def cached_etag(filename):
+    """ETag of the cached copy of ``filename``, sent as if_none_match"""
+    return download_cache.lookup(server_address, filename) if download_cache else None
+
+def from_cache(filename, etag, local_path):
+    """The server answered NOT_MODIFIED: use the cached copy, False if it is gone"""
+    return download_cache.copy_to(server_address, filename, etag, local_path)
+
+def remember_download(filename, local_path, etag):
+    if download_cache and etag:
+        download_cache.store(server_address, filename, etag, local_path)
+
 def remote_get(filename=""):
     command_str = f"GET {filename}"
-    hasil = send_command(command_str)
-    if (hasil['status']=='OK'):
-        namafile = hasil['data_namafile']
-        # Decode base64 string back to binary
-        isifile = base64.b64decode(hasil['data_file'])
-        with open(namafile, 'wb') as fp:
-            fp.write(isifile)
+    etag = cached_etag(filename)
+    hasil = retry_busy(lambda: get_once(command_str + (f" if_none_match={etag}" if etag else "")))
+    if hasil and hasil['status'] == 'NOT_MODIFIED':
+        if from_cache(filename, etag, hasil['data_namafile']):
+            return True
+        hasil = retry_busy(lambda: get_once(command_str))
+    if (hasil and hasil['status']=='OK'):
+        remember_download(filename, hasil['data_namafile'], hasil.get('etag'))
         return True
     else:
         print("Gagal")
         return False
 
-def remote_upload(filename=""):
+def get_once(command_str):
+    try:
+        return exchange(lambda sock: get_exchange(sock, command_str))
+    except Exception as e:
+        logging.warning(f"error during data receiving: {str(e)}")
+        return False
+
+def get_exchange(sock, command_str):
+    """GET with the base64 content decoded straight into a temporary file
+    as it arrives, renamed to ``data_namafile`` once complete"""
+    send_and_wait(sock, command_str)
+    fp, temp_path = create_part_file('.', '.get-')
+    try:
+        with fp:
+            hasil = recv_response(sock, fp)
+        if hasil['status'] == 'OK':
+            os.replace(temp_path, hasil['data_namafile'])
+            temp_path = None
+        return hasil
+    finally:
+        if temp_path is not None:
+            os.unlink(temp_path)
+
+def remote_get_binary(filename="", accept=None):
+    """Download a file with GETRAW: a length-prefixed JSON header followed by
+    the raw file body, written to disk as it arrives.
+
+    ``accept`` (e.g. "zlib,lzma") lets the server compress the transfer;
+    the body is decompressed while it is written."""
+    etag = cached_etag(filename)
+    hasil = retry_busy(lambda: get_binary_once(filename, accept, etag))
+    if isinstance(hasil, dict) and hasil['status'] == 'NOT_MODIFIED':
+        if from_cache(filename, etag, hasil['data_namafile']):
+            return True
+        hasil = retry_busy(lambda: get_binary_once(filename, accept))
+    if isinstance(hasil, dict):
+        print(f"Gagal: {hasil['data']}")
+        return False
+    return hasil
+
+def get_binary_once(filename, accept, etag=None):
+    """One GETRAW attempt; returns the header when the server is BUSY or
+    the cached copy with ``etag`` is still current"""
+    command_str = f"GETRAW {filename}"
+    if accept:
+        command_str += f" accept={accept}"
+    if etag:
+        command_str += f" if_none_match={etag}"
+    try:
+        return exchange(lambda sock: get_binary_exchange(sock, command_str, filename))
+    except Exception as e:
+        logging.warning(f"error during data receiving: {str(e)}")
+        return False
+
+def get_binary_exchange(sock, command_str, filename):
+    send_and_wait(sock, command_str)
+    header_length = struct.unpack('!I', recv_exact(sock, 4))[0]
+    hasil = json.loads(recv_exact(sock, header_length).decode())
+    if (hasil['status'] in ('BUSY', 'NOT_MODIFIED')):
+        return hasil
+    if (hasil['status']!='OK'):
+        print(f"Gagal: {hasil['data']}")
+        return False
+    
+    # recv_body checks the byte count, recv_chunks waits for the end chunk
+    with part_file(hasil['data_namafile']) as fp:
+        sink = DecompressingFile(fp, hasil['compression']) if hasil.get('compression') else fp
+        if hasil.get('chunked'):
+            recv_chunks(sock, sink)
+        else:
+            recv_body(sock, sink, hasil['data_size'])
+        if sink is not fp:
+            sink.finish()
+    remember_download(filename, hasil['data_namafile'], hasil.get('etag'))
+    return True
+
+def upload_delta(filename, fp):
+    """Send only what changed since the server's copy of ``filename``.
+
+    ``fp`` is memory-mapped rather than read, so the file is never loaded
+    whole. The search gives up as soon as more than DELTA_MAX_CHANGED of
+    the file (and at most DELTA_MAX_LITERAL bytes) would be sent as
+    literal data. Returns the server's result, or None when there is no
+    usable copy on the server or too much changed, and the file should be
+    sent in full.
+    """
+    hasil = send_command(f"SIGS {filename}")
+    if not hasil or hasil['status'] != 'OK':
+        return None
+    base = hasil['data']
+    with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as file_content:
+        size = len(file_content)
+        limit = min(int(size * DELTA_MAX_CHANGED), DELTA_MAX_LITERAL)
+        delta = compute_delta(file_content, base64.b64decode(base['signatures']), base['size'],
+                              base['block_size'], limit)
+        if delta is None:
+            return None
+        digest = hashlib.sha256(file_content).hexdigest()
+    hasil = send_command(f"DELTA {filename} digest={digest}", delta)
+    if hasil and hasil['status'] == 'OK':
+        logging.warning(f"delta upload of {filename}: {len(delta)} of {size} bytes sent")
+        return hasil
+    logging.warning(f"delta upload of {filename} failed, sending it in full")
+    return None
+
+def remote_upload(filename="", compression=None, delta=False):
+    """Upload ./files/<filename>; with ``delta`` a file the server already
+    has is updated by sending only the blocks that changed"""
     try:
         # Get full path of the file in the files directory
         filepath = os.path.join("./files", filename)
@@ -107,18 +609,23 @@ def remote_upload(filename=""):
             print(f"File {filename} tidak ditemukan di direktori files")
             return False
             
-        # Read file content in binary mode and encode to base64
         with open(filepath, 'rb') as fp:
-            file_content = fp.read()
-            # Encode to base64 in chunks to reduce memory usage
-            file_content_b64 = base64.b64encode(file_content).decode()
-        
-        # Convert base64 string back to binary for sending
-        binary_data = file_content_b64.encode()
-        
-        # Send command and binary data
-        command_str = f"UPLOAD {filename}"
-        hasil = send_command(command_str, binary_data)
+            size = os.fstat(fp.fileno()).st_size
+            if delta and size >= DELTA_MIN_SIZE and upload_delta(filename, fp):
+                print(f"File {filename} berhasil diupload")
+                return True
+            fp.seek(0)
+            
+            # Compress (into a temporary file) when the content is worth it,
+            # then base64 encode while sending
+            command_str = f"UPLOAD {filename}"
+            body = compress_file(fp, compression) if compression else None
+            if body is not None:
+                command_str += f" compression={compression}"
+            else:
+                body = fp
+            with body:
+                hasil = send_command(command_str, Base64Payload(body))
         if (hasil['status']=='OK'):
             print(f"File {filename} berhasil diupload")
             return True
@@ -139,6 +646,21 @@ def remote_delete(filename=""):
         print(f"Gagal menghapus: {hasil['data']}")
         return False
 
+def remote_stats():
+    """Server counters (latency per command, bytes, connections, queue)"""
+    hasil = send_command("STATS")
+    if (hasil['status']=='OK'):
+        stats = hasil['data']
+        print(f"koneksi aktif: {stats['connections']['active']}, "
+              f"antrean: {stats['queue']['depth']}, utilisasi: {stats['utilisation']:.0%}")
+        for command, latency in stats['commands'].items():
+            print(f"- {command}: {latency['count']} request, {latency['errors']} error, "
+                  f"p50 {latency['p50']}s, p99 {latency['p99']}s")
+        return stats
+    else:
+        print(f"Gagal: {hasil['data']}")
+        return False
+
 if __name__=='__main__':
     server_address=('172.16.16.101', 8889)
     remote_list()
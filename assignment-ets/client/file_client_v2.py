@@ -0,0 +1,780 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import tarfile
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import file_client_cli_pool
+from file_client_cli_pool import (open_connection, recv_exact, recv_chunks, compress_file,
+                                  DecompressingFile, STREAM_BUFFER_SIZE, part_file,
+                                  open_part_file, remove_part_file)
+
+# Protocol v2 framing, must match server/file_framing.py
+MAGIC = b'FPV2'
+VERSION = 3  # From 3 on responses may come back out of order, matched by request id
+VERSION_FORMAT = struct.Struct('!H')
+HEADER = struct.Struct('!BBHIIQ')  # opcode, status, flags, request id, meta len, body len
+
+OP_LIST = 1
+OP_GET = 2
+OP_UPLOAD = 3
+OP_DELETE = 4
+OP_UPLOAD_OPEN = 5
+OP_UPLOAD_PART = 6
+OP_UPLOAD_COMMIT = 7
+OP_UPLOAD_ABORT = 8
+OP_HAVE = 9
+OP_LINK = 10
+OP_STATS = 11
+OP_MGET = 12
+OP_MDELETE = 13
+OP_MUPLOAD = 14
+OP_ARCHIVE = 15
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+STATUS_NOT_MODIFIED = 3
+
+LENGTH_PREFIX = struct.Struct('!I')
+
+PIPELINE_WINDOW = 16  # Requests in flight; keep it below the server's pipeline_depth
+
+
+class ChunkedBodyReader:
+    """Read-only file over a chunked body (4-byte length + data, ended by
+    length 0), so a tar stream can be extracted while it arrives"""
+    def __init__(self, sock):
+        self.sock = sock
+        self.piece = memoryview(b'')  # Unread rest of the current chunk
+        self.finished = False
+
+    def _next_piece(self):
+        """False once the end chunk has arrived"""
+        while not self.piece and not self.finished:
+            length = LENGTH_PREFIX.unpack(recv_exact(self.sock, LENGTH_PREFIX.size))[0]
+            if length == 0:
+                self.finished = True
+            else:
+                self.piece = memoryview(recv_exact(self.sock, length))
+        return bool(self.piece)
+
+    def readinto(self, buffer):
+        # Copies straight out of the current chunk, however small the reads
+        if not self._next_piece():
+            return 0
+        nbytes = min(len(buffer), len(self.piece))
+        buffer[:nbytes] = self.piece[:nbytes]
+        self.piece = self.piece[nbytes:]
+        return nbytes
+
+    def read(self, size=-1):
+        parts = []
+        while (size < 0 or size > 0) and self._next_piece():
+            take = len(self.piece) if size < 0 else min(size, len(self.piece))
+            parts.append(self.piece[:take])
+            self.piece = self.piece[take:]
+            if size > 0:
+                size -= take
+        return b''.join(parts)
+
+    def drain(self, fp=None):
+        """Consume the rest of the body, writing it to ``fp`` if given"""
+        while True:
+            data = self.read(STREAM_BUFFER_SIZE)
+            if not data:
+                return
+            if fp is not None:
+                fp.write(data)
+
+
+class BinaryConnection:
+    """A protocol v2/v3 connection: negotiated once, then one frame per request"""
+    def __init__(self):
+        self.sock = open_connection()
+        self.next_request_id = 1
+        self.buffer = None  # Receive buffer reused by every download
+        try:
+            self.sock.sendall(MAGIC + VERSION_FORMAT.pack(VERSION))
+            reply = recv_exact(self.sock, len(MAGIC) + VERSION_FORMAT.size)
+            if reply[:len(MAGIC)] != MAGIC:
+                raise RuntimeError("Server does not speak protocol v2")
+            self.version = VERSION_FORMAT.unpack(reply[len(MAGIC):])[0]
+        except Exception:
+            self.sock.close()
+            raise
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def send_header(self, opcode, meta, body_length):
+        """Send a frame header and meta; the caller sends ``body_length`` bytes after it"""
+        request_id = self.next_request_id
+        self.next_request_id += 1
+        meta_bytes = json.dumps(meta or {}).encode()
+        self.sock.sendall(HEADER.pack(opcode, 0, 0, request_id, len(meta_bytes), body_length) + meta_bytes)
+        return request_id
+
+    def send_request(self, opcode, meta=None, body=b'', body_file=None, body_length=0, body_offset=0):
+        """Send one frame; ``body_file`` is sent with sendfile instead of ``body``"""
+        if body_file is None:
+            body_length = len(body)
+        request_id = self.send_header(opcode, meta, body_length)
+        if body_file is not None:
+            if body_length:
+                self.sock.sendfile(body_file, body_offset, body_length)
+        elif body:
+            self.sock.sendall(body)
+        return request_id
+
+    def recv_frame(self):
+        """Read a frame header and meta: (request id, status, meta, body length)"""
+        header = recv_exact(self.sock, HEADER.size)
+        opcode, status, flags, request_id, meta_length, body_length = HEADER.unpack(header)
+        meta = json.loads(recv_exact(self.sock, meta_length)) if meta_length else {}
+        return request_id, status, meta, body_length
+
+    def recv_response(self):
+        """Read a frame header and meta; the body is left on the socket"""
+        return self.recv_frame()[1:]
+
+    def recv_file(self, local_path, meta, body_length):
+        """Save a GET response body, decompressing it if the server compressed it"""
+        with part_file(local_path) as fp:
+            sink = DecompressingFile(fp, meta['compression']) if meta.get('compression') else fp
+            if meta.get('chunked'):
+                recv_chunks(self.sock, sink)
+            else:
+                self.recv_body_into(sink, body_length)
+            if sink is not fp:
+                sink.finish()
+
+    def pipeline(self, requests, window=PIPELINE_WINDOW):
+        """Send body-less requests without waiting for each response.
+
+        ``requests`` are (opcode, meta) pairs. Up to ``window`` of them are
+        in flight at once; a v3 server may answer them in any order, so
+        responses are matched by request id. GET bodies are saved to the
+        requested name like get() does. Returns the response metas in the
+        order of ``requests``.
+        """
+        requests = list(requests)
+        results = [None] * len(requests)
+        waiting = {}
+        sent = 0
+        for _ in range(len(requests)):
+            while sent < len(requests) and len(waiting) < window:
+                opcode, meta = requests[sent]
+                waiting[self.send_request(opcode, meta)] = sent
+                sent += 1
+            request_id, status, meta, body_length = self.recv_frame()
+            index = waiting.pop(request_id)
+            opcode, request = requests[index]
+            if opcode == OP_GET and status == STATUS_OK:
+                self.recv_file(request['name'], meta, body_length)
+            results[index] = meta
+        return results
+
+    def receive_buffer(self):
+        if self.buffer is None:
+            self.buffer = memoryview(bytearray(STREAM_BUFFER_SIZE))
+        return self.buffer
+
+    def recv_body_into(self, fp, length):
+        """Copy ``length`` body bytes into ``fp`` through a reusable buffer"""
+        view = self.receive_buffer()
+        while length > 0:
+            nbytes = self.sock.recv_into(view[:min(length, len(view))])
+            if nbytes == 0:
+                raise RuntimeError("Socket connection broken")
+            fp.write(view[:nbytes])
+            length -= nbytes
+
+    def recv_body_at(self, fd, position, length, progress=None):
+        """Write ``length`` body bytes into ``fd`` at ``position`` with pwrite.
+
+        ``progress(nbytes)`` is called after every write so callers can
+        record how far a segment got.
+        """
+        view = self.receive_buffer()
+        while length > 0:
+            nbytes = self.sock.recv_into(view[:min(length, len(view))])
+            if nbytes == 0:
+                raise RuntimeError("Socket connection broken")
+            written = 0
+            while written < nbytes:
+                written += os.pwrite(fd, view[written:nbytes], position + written)
+            position += nbytes
+            length -= nbytes
+            if progress:
+                progress(nbytes)
+
+    def list(self, prefix='', sort=None, limit=None, cursor=None):
+        """Plain name list, or one page of metadata when any argument is set"""
+        options = {'sort': sort, 'limit': limit, 'cursor': cursor}
+        meta = {key: value for key, value in options.items() if value is not None}
+        if prefix:
+            meta['name'] = prefix
+        self.send_request(OP_LIST, meta)
+        return self.recv_response()[1]
+
+    def iter_files(self, prefix='', sort='name', page_size=1000):
+        """Every matching file's metadata, fetched one page at a time"""
+        cursor = None
+        while True:
+            hasil = self.list(prefix, sort, page_size, cursor)
+            if hasil['status'] != 'OK':
+                raise RuntimeError(hasil['data'])
+            yield from hasil['data']
+            cursor = hasil['next_cursor']
+            if cursor is None:
+                return
+
+    def get(self, filename, local_path=None, accept=None, cached=True):
+        """Download a file; ``accept`` lists codecs the server may compress with.
+
+        With file_client_cli_pool.download_cache set (and ``cached``), a
+        copy the cache already holds is revalidated instead of downloaded;
+        the result then says ``cached``.
+        """
+        local_path = local_path or filename
+        request = {'name': filename}
+        if accept:
+            request['accept'] = accept
+        etag = file_client_cli_pool.cached_etag(filename) if cached else None
+        if etag:
+            request['if_none_match'] = etag
+        self.send_request(OP_GET, request)
+        status, meta, body_length = self.recv_response()
+        if status == STATUS_NOT_MODIFIED:
+            if file_client_cli_pool.from_cache(filename, etag, local_path):
+                return dict(meta, status='OK', cached=True)
+            return self.get(filename, local_path, accept, cached=False)
+        if status == STATUS_OK:
+            self.recv_file(local_path, meta, body_length)
+            file_client_cli_pool.remember_download(filename, local_path, meta.get('etag'))
+        return meta
+
+    def stat(self, filename):
+        """Size of a remote file, via an empty ranged GET"""
+        self.send_request(OP_GET, {'name': filename, 'offset': 0, 'length': 0})
+        return self.recv_response()[1]
+
+    def get_range(self, filename, fd, offset, length, progress=None, etag=None):
+        """Fetch ``length`` bytes from ``offset`` into the same place of ``fd``.
+
+        With ``etag`` the server refuses the range (an ERROR carrying the
+        current ``etag``) once the file no longer has that version."""
+        request = {'name': filename, 'offset': offset, 'length': length}
+        if etag:
+            request['if_match'] = etag
+        self.send_request(OP_GET, request)
+        status, meta, body_length = self.recv_response()
+        if status == STATUS_OK:
+            self.recv_body_at(fd, offset, body_length, progress)
+        return meta
+
+    def upload(self, local_path, filename=None, dedup=False, compression=None):
+        """Upload a local file; with ``dedup`` only its hash is sent when
+        the server already stores the same content. With ``compression``
+        the file is sent compressed if its first chunk compresses well."""
+        if dedup:
+            digest = file_sha256(local_path)
+            if self.have(digest):
+                hasil = self.link(filename or os.path.basename(local_path), digest)
+                if hasil['status'] == 'OK':
+                    return hasil
+        meta = {'name': filename or os.path.basename(local_path)}
+        with open(local_path, 'rb') as fp:
+            body = compress_file(fp, compression) if compression else None
+            if body is not None:
+                meta['compression'] = compression
+            else:
+                body = fp
+            with body:
+                size = os.fstat(body.fileno()).st_size
+                self.send_request(OP_UPLOAD, meta, body_file=body, body_length=size)
+        return self.recv_response()[1]
+
+    def delete(self, filename):
+        self.send_request(OP_DELETE, {'name': filename})
+        return self.recv_response()[1]
+
+    def have(self, digest):
+        self.send_request(OP_HAVE, {'hash': digest})
+        hasil = self.recv_response()[1]
+        return hasil['status'] == 'OK' and hasil['data']
+
+    def link(self, filename, digest):
+        self.send_request(OP_LINK, {'name': filename, 'hash': digest})
+        return self.recv_response()[1]
+
+    def upload_open(self, filename, size):
+        self.send_request(OP_UPLOAD_OPEN, {'name': filename, 'size': size})
+        return self.recv_response()[1]
+
+    def upload_part(self, upload_id, fp, offset, length):
+        """Send ``length`` bytes of ``fp`` from ``offset`` as one part"""
+        self.send_request(OP_UPLOAD_PART, {'upload_id': upload_id, 'offset': offset},
+                          body_file=fp, body_length=length, body_offset=offset)
+        return self.recv_response()[1]
+
+    def upload_commit(self, upload_id):
+        self.send_request(OP_UPLOAD_COMMIT, {'upload_id': upload_id})
+        return self.recv_response()[1]
+
+    def upload_abort(self, upload_id):
+        self.send_request(OP_UPLOAD_ABORT, {'upload_id': upload_id})
+        return self.recv_response()[1]
+
+    def stats(self):
+        self.send_request(OP_STATS)
+        return self.recv_response()[1]
+
+    def recv_items(self, directory=None):
+        """Read the chunked body of a batch response, yielding each item's
+        result as it arrives. MGET file bodies are saved under the item
+        name, inside ``directory`` if given, through a part file renamed
+        once the body is complete; an item whose name is not a plain file
+        name is read but not saved, and reported as an error. Consume it
+        to the end."""
+        fp = part_path = local_path = None
+        remaining = 0
+        item = None
+        try:
+            while True:
+                length = LENGTH_PREFIX.unpack(recv_exact(self.sock, LENGTH_PREFIX.size))[0]
+                if length == 0:
+                    return
+                data = recv_exact(self.sock, length)
+                if remaining > 0:
+                    if fp is not None:
+                        fp.write(data)
+                    remaining -= length
+                else:
+                    item = json.loads(data)
+                    if item['status'] != 'OK' or 'data_size' not in item:
+                        yield item
+                        continue
+                    remaining = item['data_size']
+                    name = item['name']
+                    if os.path.basename(name) != name or name in ('', '.', '..'):
+                        item = dict(item, status='ERROR', data=f"{name!r} is not a plain file name")
+                    else:
+                        local_path = os.path.join(directory, name) if directory else name
+                        fp, part_path = open_part_file(local_path)
+                if remaining <= 0:
+                    if fp is not None:
+                        fp.close()
+                        os.replace(part_path, local_path)
+                        fp = None
+                    yield item
+        finally:
+            if fp is not None:  # A body cut short
+                fp.close()
+                remove_part_file(part_path)
+
+    def get_many(self, filenames, directory=None):
+        """Download several files in one request; returns per-file results"""
+        self.send_request(OP_MGET, {'names': list(filenames)})
+        status, meta, _ = self.recv_response()
+        if status != STATUS_OK:
+            return meta
+        return dict(meta, data=list(self.recv_items(directory)))
+
+    def delete_many(self, filenames):
+        self.send_request(OP_MDELETE, {'names': list(filenames)})
+        status, meta, _ = self.recv_response()
+        if status != STATUS_OK:
+            return meta
+        return dict(meta, data=list(self.recv_items()))
+
+    def upload_many(self, local_paths):
+        """Upload several files as one request body of (meta, content)
+        records; returns per-file results"""
+        records = []
+        body_length = 0
+        for path in local_paths:
+            size = os.path.getsize(path)
+            record = json.dumps({'name': os.path.basename(path), 'size': size}).encode()
+            records.append((path, LENGTH_PREFIX.pack(len(record)) + record, size))
+            body_length += LENGTH_PREFIX.size + len(record) + size
+        self.send_header(OP_MUPLOAD, {}, body_length)
+        for path, record, size in records:
+            self.sock.sendall(record)
+            if size:
+                with open(path, 'rb') as fp:
+                    self.sock.sendfile(fp, 0, size)
+        status, meta, _ = self.recv_response()
+        if status != STATUS_OK:
+            return meta
+        return dict(meta, data=list(self.recv_items()))
+
+    def archive(self, names=None, prefix='', compression=None, directory='.', local_path=None):
+        """Download files as one tar stream, selected by ``names`` or by
+        ``prefix`` (every file when neither is given).
+
+        The archive is extracted into ``directory`` while it arrives, or
+        saved unchanged to ``local_path`` when that is given.
+        """
+        meta = {'names': list(names)} if names else {'prefix': prefix}
+        if compression:
+            meta['compression'] = compression
+        self.send_request(OP_ARCHIVE, meta)
+        status, meta, _ = self.recv_response()
+        if status != STATUS_OK:
+            return meta
+        body = ChunkedBodyReader(self.sock)
+        if local_path is not None:
+            with open(local_path, 'wb') as fp:
+                body.drain(fp)
+        else:
+            with tarfile.open(fileobj=body, mode='r|*') as tar:
+                if hasattr(tarfile, 'data_filter'):
+                    tar.extractall(directory, filter='data')
+                else:
+                    tar.extractall(directory)
+            body.drain()
+        return meta
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(STREAM_BUFFER_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def remote_list():
+    with BinaryConnection() as conn:
+        hasil = conn.list()
+    if (hasil['status']=='OK'):
+        print("daftar file : ")
+        for nmfile in hasil['data']:
+            print(f"- {nmfile}")
+        return True
+    else:
+        print("Gagal")
+        return False
+
+def remote_get(filename="", accept=None):
+    try:
+        with BinaryConnection() as conn:
+            hasil = conn.get(filename, accept=accept)
+    except Exception as e:
+        logging.warning(f"error during data receiving: {str(e)}")
+        return False
+    if (hasil['status']=='OK'):
+        return True
+    else:
+        print(f"Gagal: {hasil['data']}")
+        return False
+
+def remote_get_pipelined(filenames, window=PIPELINE_WINDOW):
+    """Download many (small) files over one connection, without a round trip each"""
+    try:
+        with BinaryConnection() as conn:
+            results = conn.pipeline([(OP_GET, {'name': filename}) for filename in filenames], window)
+    except Exception as e:
+        logging.warning(f"error during data receiving: {str(e)}")
+        return False
+    failed = [hasil for hasil in results if hasil['status'] != 'OK']
+    for hasil in failed:
+        print(f"Gagal: {hasil['data']}")
+    return not failed
+
+def report_batch(hasil, success):
+    """Print the outcome of a batch; True when every file succeeded"""
+    if hasil['status'] != 'OK':
+        print(f"Gagal: {hasil['data']}")
+        return False
+    failed = [item for item in hasil['data'] if item['status'] != 'OK']
+    print(f"{len(hasil['data']) - len(failed)} file {success}")
+    for item in failed:
+        print(f"Gagal {item['name']}: {item['data']}")
+    return not failed
+
+def remote_get_many(filenames):
+    try:
+        with BinaryConnection() as conn:
+            hasil = conn.get_many(filenames)
+    except Exception as e:
+        logging.warning(f"error during data receiving: {str(e)}")
+        return False
+    return report_batch(hasil, "berhasil didownload")
+
+def remote_upload_many(filenames):
+    """Upload ./files/<name> for every name in one request"""
+    filepaths = [os.path.join("./files", filename) for filename in filenames]
+    missing = [path for path in filepaths if not os.path.exists(path)]
+    if missing:
+        print(f"File {', '.join(missing)} tidak ditemukan di direktori files")
+        return False
+    try:
+        with BinaryConnection() as conn:
+            hasil = conn.upload_many(filepaths)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return False
+    return report_batch(hasil, "berhasil diupload")
+
+def remote_delete_many(filenames):
+    with BinaryConnection() as conn:
+        hasil = conn.delete_many(filenames)
+    return report_batch(hasil, "berhasil dihapus")
+
+
+def remote_archive(names=None, prefix='', compression=None, directory='.'):
+    """Download several files as one archive, extracted into ``directory``"""
+    try:
+        with BinaryConnection() as conn:
+            hasil = conn.archive(names, prefix, compression, directory)
+    except Exception as e:
+        logging.warning(f"error during data receiving: {str(e)}")
+        return False
+    if hasil['status'] != 'OK':
+        print(f"Gagal: {hasil['data']}")
+        return False
+    print(f"{hasil['count']} file ({hasil['total_size']} bytes) berhasil didownload sebagai {hasil['format']}")
+    return True
+
+class SegmentedDownload:
+    """Download one file as N byte ranges over N connections.
+
+    Segments are written in place with pwrite into ``<name>.part``; their
+    progress is checkpointed in ``<name>.part.json`` so an interrupted
+    download resumes from what is already on disk. Each segment is retried
+    on its own.
+
+    The checkpoint records the file's ETag and every segment is requested
+    with it (if_match): a checkpoint of another version is discarded, and
+    a file replaced during the run fails the download and drops the
+    checkpoint, instead of stitching two versions together.
+    """
+    CHECKPOINT_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, filename, local_path=None, segments=4, retries=3):
+        self.filename = filename
+        self.local_path = local_path or filename
+        self.part_path = self.local_path + '.part'
+        self.state_path = self.part_path + '.json'
+        self.segments = segments
+        self.retries = retries
+        self.lock = threading.Lock()
+        self.unsaved = 0
+        self.changed = False
+
+    def plan(self, file_size, etag):
+        """Reuse a checkpoint of the same version or split the file into fresh segments"""
+        if os.path.exists(self.part_path) and os.path.exists(self.state_path):
+            with open(self.state_path) as fp:
+                state = json.load(fp)
+            if state.get('size') == file_size and state.get('etag') == etag:
+                return state
+        count = max(1, min(self.segments, file_size // STREAM_BUFFER_SIZE or 1))
+        step = max(1, -(-file_size // count))
+        ranges = [[start, min(step, file_size - start), 0] for start in range(0, file_size, step)]
+        return {'size': file_size, 'etag': etag, 'segments': ranges}
+
+    def save_state(self):
+        with open(self.state_path + '.tmp', 'w') as fp:
+            json.dump(self.state, fp)
+        os.replace(self.state_path + '.tmp', self.state_path)
+
+    def fetch_segment(self, fd, segment):
+        def progress(nbytes):
+            with self.lock:
+                segment[2] += nbytes
+                self.unsaved += nbytes
+                if self.unsaved >= self.CHECKPOINT_BYTES:
+                    self.save_state()
+                    self.unsaved = 0
+        
+        last_error = None
+        for _ in range(self.retries):
+            start, length, done = segment
+            if done >= length:
+                return True
+            try:
+                with BinaryConnection() as conn:
+                    hasil = conn.get_range(self.filename, fd, start + done, length - done, progress,
+                                           self.state['etag'])
+                if hasil['status'] != 'OK':
+                    last_error = hasil['data']
+                    if hasil.get('etag', self.state['etag']) != self.state['etag']:
+                        self.changed = True
+                    break
+            except Exception as e:
+                last_error = str(e)
+        if segment[2] < segment[1]:
+            logging.warning(f"segment at {segment[0]} failed: {last_error}")
+            return False
+        return True
+
+    def run(self):
+        with BinaryConnection() as conn:
+            hasil = conn.stat(self.filename)
+        if hasil['status'] != 'OK':
+            print(f"Gagal: {hasil['data']}")
+            return False
+        
+        self.state = self.plan(hasil['file_size'], hasil.get('etag'))
+        fd = os.open(self.part_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, self.state['size'])
+            pending = [s for s in self.state['segments'] if s[2] < s[1]]
+            with ThreadPoolExecutor(max_workers=max(1, len(pending))) as executor:
+                ok = all(executor.map(lambda seg: self.fetch_segment(fd, seg), pending))
+        finally:
+            os.close(fd)
+            with self.lock:
+                self.save_state()
+        
+        if self.changed:
+            # What is on disk mixes two versions; start over next time
+            os.remove(self.state_path)
+            print(f"Gagal: {self.filename} berubah selama download, ulangi download")
+            return False
+        if not ok:
+            return False
+        os.replace(self.part_path, self.local_path)
+        os.remove(self.state_path)
+        return True
+
+
+def remote_get_segmented(filename="", segments=4):
+    """Download ``filename`` over ``segments`` parallel connections,
+    resuming a previous interrupted attempt if one is found"""
+    try:
+        return SegmentedDownload(filename, segments=segments).run()
+    except Exception as e:
+        logging.warning(f"error during data receiving: {str(e)}")
+        return False
+
+class ParallelUpload:
+    """Upload one file as fixed-size parts over several connections.
+
+    The server writes every part at its offset, so parts may arrive in any
+    order and a failed part is retried alone. The upload is committed once
+    every part is acknowledged, or aborted.
+    """
+    CHUNK_SIZE = 8 * 1024 * 1024
+
+    def __init__(self, local_path, filename=None, connections=4, chunk_size=CHUNK_SIZE, retries=3):
+        self.local_path = local_path
+        self.filename = filename or os.path.basename(local_path)
+        self.connections = connections
+        self.chunk_size = chunk_size
+        self.retries = retries
+
+    def send_parts(self, upload_id, parts, failures):
+        """Worker loop: one connection sending parts until the queue is empty"""
+        conn = None
+        with open(self.local_path, 'rb') as fp:
+            while True:
+                try:
+                    offset, length, attempt = parts.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    conn = conn or BinaryConnection()
+                    hasil = conn.upload_part(upload_id, fp, offset, length)
+                    if hasil['status'] == 'OK':
+                        continue
+                    error = hasil['data']
+                except Exception as e:
+                    error = str(e)
+                    if conn:
+                        conn.close()
+                    conn = None
+                if attempt + 1 < self.retries:
+                    parts.put((offset, length, attempt + 1))
+                else:
+                    failures.append(f"part at {offset}: {error}")
+        if conn:
+            conn.close()
+
+    def run(self):
+        size = os.path.getsize(self.local_path)
+        with BinaryConnection() as conn:
+            hasil = conn.upload_open(self.filename, size)
+        if hasil['status'] != 'OK':
+            return hasil
+        upload_id = hasil['upload_id']
+        
+        parts = queue.Queue()
+        for offset in range(0, size, self.chunk_size):
+            parts.put((offset, min(self.chunk_size, size - offset), 0))
+        failures = []
+        workers = max(1, min(self.connections, parts.qsize()))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in range(workers):
+                executor.submit(self.send_parts, upload_id, parts, failures)
+        
+        with BinaryConnection() as conn:
+            if failures:
+                conn.upload_abort(upload_id)
+                return {"status": "ERROR", "data": "; ".join(failures)}
+            return conn.upload_commit(upload_id)
+
+
+def remote_upload_parallel(filename="", connections=4):
+    """Upload ./files/``filename`` as parts over ``connections`` connections"""
+    filepath = os.path.join("./files", filename)
+    if not os.path.exists(filepath):
+        print(f"File {filename} tidak ditemukan di direktori files")
+        return False
+    try:
+        hasil = ParallelUpload(filepath, filename, connections=connections).run()
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return False
+    if (hasil['status']=='OK'):
+        print(f"File {filename} berhasil diupload")
+        return True
+    else:
+        print(f"Gagal upload: {hasil['data']}")
+        return False
+
+def remote_upload(filename="", dedup=False, compression=None):
+    filepath = os.path.join("./files", filename)
+    if not os.path.exists(filepath):
+        print(f"File {filename} tidak ditemukan di direktori files")
+        return False
+    try:
+        with BinaryConnection() as conn:
+            hasil = conn.upload(filepath, filename, dedup=dedup, compression=compression)
+    except Exception as e:
+        print(f"Error: {str(e)}")
+        return False
+    if (hasil['status']=='OK'):
+        print(f"File {filename} berhasil diupload")
+        return True
+    else:
+        print(f"Gagal upload: {hasil['data']}")
+        return False
+
+def remote_delete(filename=""):
+    with BinaryConnection() as conn:
+        hasil = conn.delete(filename)
+    if (hasil['status']=='OK'):
+        print(f"File {filename} berhasil dihapus")
+        return True
+    else:
+        print(f"Gagal menghapus: {hasil['data']}")
+        return False
+
+if __name__=='__main__':
+    file_client_cli_pool.server_address=('172.16.16.101', 8889)
+    remote_list()
+    remote_upload('test.txt')
+    remote_list()
@@ -0,0 +1,203 @@
+import hashlib
+import math
+import struct
+import zlib
+from typing import Callable, Optional
+
+"""
+* Upload delta ala rsync untuk file yang diupload ulang dan hanya
+  berubah sedikit.
+
+* SIGS: server membagi versi file yang dimilikinya menjadi blok
+  berukuran tetap dan mengirim signature tiap blok: checksum lemah
+  Adler-32 dan hash kuat blake2b.
+
+* Client menggeser jendela sebesar satu blok di atas file barunya.
+  Adler-32 bisa di-roll (satu byte keluar, satu byte masuk), jadi di
+  setiap posisi checksum lemah dihitung dalam O(1); hash kuat hanya
+  dihitung jika checksum lemah cocok. Blok yang cocok menjadi perintah
+  COPY (offset, panjang) dari file lama, sisanya dikirim sebagai DATA.
+
+* DELTA: server membangun file baru dari file lama + delta, sambil
+  menulis ke disk, lalu mencocokkan sha256 hasilnya dengan digest yang
+  dikirim client. Jika tidak cocok (mis. file lama berganti di antara
+  SIGS dan DELTA) upload ditolak dan client mengupload ulang penuh.
+
+* Modul ini dipakai client dan server, yang dijalankan di mesin berbeda
+  dari direktorinya masing-masing; karena itu ada dua salinan,
+  client/file_delta.py dan server/file_delta.py, yang harus tetap identik
+  (dicek oleh tests/test_shared_modules.py).
+"""
+
+MIN_BLOCK = 2 * 1024
+MAX_BLOCK = 128 * 1024
+
+ADLER_MOD = 65521
+SIGNATURE = struct.Struct('!I16s')  # Adler-32, blake2b-128
+
+OP_COPY = b'C'
+OP_DATA = b'D'
+COPY_ARGS = struct.Struct('!QI')  # Offset in the old file, length
+DATA_ARGS = struct.Struct('!I')  # Length of the literal bytes that follow
+OP_ARGS = {OP_COPY: COPY_ARGS, OP_DATA: DATA_ARGS}
+
+
+def block_size_for(size: int) -> int:
+    """About sqrt(size), a power of two between MIN_BLOCK and MAX_BLOCK"""
+    if size <= MIN_BLOCK:
+        return MIN_BLOCK
+    return min(MAX_BLOCK, max(MIN_BLOCK, 1 << round(math.log2(math.sqrt(size)))))
+
+
+def check_block_size(block_size) -> int:
+    block_size = int(block_size)
+    if not MIN_BLOCK <= block_size <= MAX_BLOCK:
+        raise ValueError(f"Block size must be between {MIN_BLOCK} and {MAX_BLOCK}")
+    return block_size
+
+
+def strong_hash(block) -> bytes:
+    return hashlib.blake2b(block, digest_size=16).digest()
+
+
+def signatures(fp, block_size: int) -> bytes:
+    """Packed SIGNATURE of every block of ``fp``; the last one may be short"""
+    out = bytearray()
+    while True:
+        block = fp.read(block_size)
+        if not block:
+            return bytes(out)
+        out += SIGNATURE.pack(zlib.adler32(block), strong_hash(block))
+
+
+def compute_delta(data, signature_data: bytes, base_size: int, block_size: int,
+                  limit: Optional[int] = None) -> Optional[bytes]:
+    """Delta turning the file described by ``signature_data`` into ``data``.
+
+    Returns None when more than ``limit`` bytes would have to be sent as
+    literal data, in which case a plain upload is cheaper.
+    """
+    blocks = {}
+    last_index = 0
+    for index, (weak, strong) in enumerate(SIGNATURE.iter_unpack(signature_data)):
+        blocks.setdefault(weak, []).append((strong, index))
+        last_index = index
+    tail_size = base_size - last_index * block_size if signature_data else 0
+
+    view = memoryview(data)
+    size = len(view)
+    out = bytearray()
+    pending = [0, 0]  # Copy not written yet, extended while blocks follow each other
+    literal_total = 0
+    limit = size if limit is None else limit
+
+    def flush_copy():
+        if pending[1]:
+            out.extend(OP_COPY + COPY_ARGS.pack(*pending))
+            pending[1] = 0
+
+    def emit_literal(start, end):
+        if end > start:
+            flush_copy()
+            out.extend(OP_DATA + DATA_ARGS.pack(end - start))
+            out.extend(view[start:end])
+
+    def emit_copy(offset, length):
+        if pending[1] and pending[0] + pending[1] == offset:
+            pending[1] += length
+        else:
+            flush_copy()
+            pending[0], pending[1] = offset, length
+
+    def find(block, weak: int) -> Optional[int]:
+        # The strong hash is only computed when the weak checksum matches
+        candidates = blocks.get(weak)
+        if candidates:
+            strong = strong_hash(block)
+            for candidate, index in candidates:
+                if candidate == strong:
+                    return index
+        return None
+
+    position = literal_start = 0
+    a = b = 0
+    rolled = False
+    while position + block_size <= size:
+        if not rolled:
+            weak = zlib.adler32(view[position:position + block_size])
+            a, b = weak & 0xffff, weak >> 16
+        match = find(view[position:position + block_size], (b << 16) | a)
+        if match is not None:
+            literal_total += position - literal_start
+            emit_literal(literal_start, position)
+            emit_copy(match * block_size, block_size)
+            position += block_size
+            literal_start = position
+            rolled = False
+            continue
+        if position - literal_start + literal_total > limit:
+            return None
+        if position + block_size < size:
+            # Roll the window one byte: data[position] leaves, the next one enters
+            leaving, entering = data[position], data[position + block_size]
+            a = (a - leaving + entering) % ADLER_MOD
+            b = (b - block_size * leaving + a - 1) % ADLER_MOD
+            rolled = True
+        position += 1
+
+    # The old file's short last block can only match the end of the new one
+    end = size
+    if 0 < tail_size < block_size and size - tail_size >= literal_start:
+        tail = view[size - tail_size:]
+        if find(tail, zlib.adler32(tail)) == last_index:
+            end = size - tail_size
+    literal_total += end - literal_start
+    if literal_total > limit:
+        return None
+    emit_literal(literal_start, end)
+    if end < size:
+        emit_copy(last_index * block_size, tail_size)
+    flush_copy()
+    return bytes(out)
+
+
+class DeltaDecoder:
+    """Push parser for a delta: ``copy(offset, length)`` for COPY
+    operations and ``literal(data)`` for the bytes of DATA operations,
+    however the delta is split into pieces"""
+    def __init__(self, copy: Callable[[int, int], None], literal: Callable[[bytes], None]):
+        self.copy = copy
+        self.literal = literal
+        self.header = b''
+        self.remaining = 0  # Literal bytes of the current DATA still to come
+
+    def feed(self, data) -> None:
+        view = memoryview(data)
+        position = 0
+        while position < len(view):
+            if self.remaining:
+                take = min(self.remaining, len(view) - position)
+                self.literal(view[position:position + take])
+                self.remaining -= take
+                position += take
+                continue
+            if not self.header:
+                op = bytes(view[position:position + 1])
+                if op not in OP_ARGS:
+                    raise ValueError("Malformed delta")
+            args = OP_ARGS[(self.header or op)[:1]]
+            take = min(1 + args.size - len(self.header), len(view) - position)
+            self.header += bytes(view[position:position + take])
+            position += take
+            if len(self.header) < 1 + args.size:
+                continue
+            values = args.unpack(self.header[1:])
+            if self.header[:1] == OP_COPY:
+                self.copy(*values)
+            else:
+                self.remaining = values[0]
+            self.header = b''
+
+    def finish(self) -> None:
+        if self.header or self.remaining:
+            raise ValueError("Truncated delta")
@@ -0,0 +1,134 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+"""
+* Cache download di disk client: file yang pernah didownload disimpan
+  bersama ETag dari server, dengan kunci (alamat server, nama file).
+
+* Download berikutnya mengirim ETag itu (if_none_match). Jika file di
+  server belum berubah, server menjawab NOT_MODIFIED tanpa isi file dan
+  salinan dari cache yang dipakai: cukup satu round trip kecil.
+
+* Ukuran total cache dibatasi (max_bytes); entri yang paling lama tidak
+  dipakai dibuang lebih dulu (LRU). Urutan pemakaian disimpan sebagai
+  mtime file cache, jadi tetap berlaku setelah program dijalankan ulang.
+
+* Tiap entri adalah satu file <kunci>-<etag> yang ditulis lewat file
+  sementara + rename, sehingga beberapa proses client boleh memakai
+  direktori cache yang sama.
+"""
+
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser('~'), '.cache', 'progjar-client')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+ETAG_PATTERN = re.compile(r'^[0-9A-Za-z_.-]+$')
+
+
+class DownloadCache:
+    def __init__(self, directory: str = DEFAULT_DIRECTORY, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries: 'OrderedDict[str, Tuple[str, int]]' = OrderedDict()  # key -> (etag, size)
+        self.total = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        # Oldest use first, as recorded in the entries' mtimes
+        found = []
+        for entry in os.scandir(self.directory):
+            key, _, etag = entry.name.partition('-')
+            if entry.name.startswith('.') or not etag or not entry.is_file():
+                continue
+            st = entry.stat()
+            found.append((st.st_mtime, key, etag, st.st_size))
+        for _, key, etag, size in sorted(found):
+            self._forget(key)  # An older copy left behind by another process
+            self.entries[key] = (etag, size)
+            self.total += size
+
+    @staticmethod
+    def key(server, filename: str) -> str:
+        if isinstance(server, tuple):
+            server = f"{server[0]}:{server[1]}"
+        return hashlib.sha256(f"{server}/{filename}".encode()).hexdigest()[:32]
+
+    def _path(self, key: str, etag: str) -> str:
+        return os.path.join(self.directory, f"{key}-{etag}")
+
+    def lookup(self, server, filename: str) -> Optional[str]:
+        """ETag of the cached copy of ``filename``, for a conditional GET"""
+        with self.lock:
+            entry = self.entries.get(self.key(server, filename))
+            return entry[0] if entry else None
+
+    def copy_to(self, server, filename: str, etag: str, local_path: str) -> bool:
+        """Copy the cached ``etag`` version to ``local_path``; False if it is gone"""
+        key = self.key(server, filename)
+        path = self._path(key, etag)
+        try:
+            shutil.copyfile(path, local_path)
+        except FileNotFoundError:
+            with self.lock:
+                if self.entries.get(key, (None,))[0] == etag:
+                    self._forget(key)
+            return False
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return True
+
+    def store(self, server, filename: str, etag: str, local_path: str) -> None:
+        """Keep a copy of the downloaded ``local_path`` under ``etag``"""
+        if not etag or not ETAG_PATTERN.match(etag):
+            return
+        size = os.path.getsize(local_path)
+        if size > self.max_bytes:
+            return
+        key = self.key(server, filename)
+        fd, temp_path = tempfile.mkstemp(prefix='.store-', dir=self.directory)
+        os.close(fd)
+        try:
+            shutil.copyfile(local_path, temp_path)
+            os.replace(temp_path, self._path(key, etag))
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        with self.lock:
+            old = self.entries.get(key)
+            if old is not None and old[0] != etag:
+                self._forget(key)
+            elif old is not None:
+                self.total -= old[1]
+            self.entries[key] = (etag, size)
+            self.entries.move_to_end(key)
+            self.total += size
+            while self.total > self.max_bytes and self.entries:
+                self._forget(next(iter(self.entries)))
+
+    def _forget(self, key: str) -> None:
+        # Called with the lock held (or from __init__)
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.total -= entry[1]
+        try:
+            os.unlink(self._path(key, entry[0]))
+        except FileNotFoundError:
+            pass
+
+    def clear(self) -> None:
+        with self.lock:
+            for key in list(self.entries):
+                self._forget(key)
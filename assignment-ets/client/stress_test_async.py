@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import gc
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from file_client_async import AsyncClient, MAX_CONNECTIONS, remote_get, remote_upload
+from stress_test_thread import (OPERATIONS, CLIENT_WORKERS, SERVER_WORKERS, FILE_SIZES,
+                                prepare_test_files, get_file_size, write_results_to_csv)
+
+"""
+* Stress test dengan client asyncio: semua client worker adalah task di
+  satu event loop (file_client_async), bukan thread atau proses. Dengan
+  --clients jumlahnya bisa ribuan, mis. --clients 1000 5000.
+
+* Matriks test, hasil dan format CSV sama dengan stress_test_thread.
+"""
+
+def raise_open_files_limit() -> None:
+    """Every concurrent client holds a socket; lift the soft fd limit to the hard one"""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError) as e:
+        logging.warning(f"Could not raise the open files limit: {str(e)}")
+
+async def execute_operation(client: AsyncClient, operation: str, filename: str, worker_id: int) -> Tuple[bool, float, int]:
+    """Execute a file operation and measure performance"""
+    start_time = time.time()
+    try:
+        logging.info(f"Worker {worker_id} starting {operation} of {filename}")
+
+        if operation == 'download':
+            success = await remote_get(filename, client=client)
+        else:  # upload
+            success = await remote_upload(filename, client=client)
+
+        file_size = get_file_size(filename)
+
+        time_taken = time.time() - start_time
+        logging.info(f"Worker {worker_id} completed {operation} in {time_taken:.2f} seconds")
+
+        return success, time_taken, file_size
+
+    except Exception as e:
+        logging.error(f"Worker {worker_id} error during {operation}: {str(e)}")
+        return False, time.time() - start_time, 0
+
+async def run_clients(operation: str, filename: str, num_clients: int, max_connections: int) -> List[Tuple[bool, float, int]]:
+    async with AsyncClient(max_connections=max_connections) as client:
+        return await asyncio.gather(*(execute_operation(client, operation, filename, i)
+                                      for i in range(num_clients)))
+
+def execute_concurrent_test(operation: str, filename: str, num_clients: int, server_workers: int,
+                            max_connections: int = MAX_CONNECTIONS) -> Dict:
+    """Run concurrent test with one asyncio task per client"""
+    start_time = time.time()
+    results = []
+
+    try:
+        results = asyncio.run(run_clients(operation, filename, num_clients, max_connections))
+
+    finally:
+        if operation == 'download':
+            try:
+                os.remove(filename)
+            except:
+                pass
+
+        gc.collect()
+
+    total_time = time.time() - start_time
+    successful_workers = sum(1 for success, _, _ in results if success)
+    failed_workers = num_clients - successful_workers
+    total_bytes = sum(bytes_transferred for _, _, bytes_transferred in results)
+
+    time_per_client = total_time / num_clients
+    throughput = total_bytes / total_time if total_time > 0 else 0
+
+    # Result dictionary
+    return {
+        "operation": operation,
+        "filename": filename,
+        "num_clients": num_clients,
+        "server_workers": server_workers,
+        "total_time": total_time,
+        "total_time_per_client": time_per_client,
+        "throughput_per_client": throughput,
+        "successful_workers": successful_workers,
+        "failed_workers": failed_workers,
+        "total_bytes_transferred": total_bytes
+    }
+
+def format_result_for_display(result: Dict) -> str:
+    """Format a result for display"""
+    lines = []
+    lines.append(f"\nAsync Results for {result['operation']} {result['filename']}:")
+    lines.append(f"Client Workers: {result['num_clients']}")
+    lines.append(f"Server Workers: {result['server_workers']}")
+    lines.append(f"Total Time per Client: {result['total_time_per_client']:.2f} seconds")
+    lines.append(f"Throughput per Client: {result['throughput_per_client']/1024/1024:.2f} MB/s")
+    lines.append(f"Successful Workers: {result['successful_workers']}")
+    lines.append(f"Failed Workers: {result['failed_workers']}")
+    lines.append("-" * 80)
+    return "\n".join(lines)
+
+def display_result(result: Dict) -> None:
+    """Display a test result"""
+    print(format_result_for_display(result))
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Asyncio-based stress test')
+    parser.add_argument('--server-workers', type=int, choices=[1, 5, 50],
+                       help='Number of server worker threads')
+    parser.add_argument('--clients', type=int, nargs='+', default=CLIENT_WORKERS,
+                       help='Numbers of concurrent clients to test')
+    parser.add_argument('--max-connections', type=int, default=MAX_CONNECTIONS,
+                       help='Connections open at once; other clients wait for a free one')
+    return parser.parse_args()
+
+def run_test_matrix(server_workers_list: List[int], client_workers: List[int], max_connections: int) -> List[Dict]:
+    """Run all combinations of tests"""
+    results = []
+
+    # Execute test matrix
+    for server_workers in server_workers_list:
+        for operation in OPERATIONS:
+            for filename in FILE_SIZES.keys():
+                for num_clients in client_workers:
+                    logging.info(f"Testing {operation} of {filename} with {num_clients} client workers and {server_workers} server workers")
+                    result = execute_concurrent_test(
+                        operation,
+                        filename,
+                        num_clients,
+                        server_workers,
+                        max_connections
+                    )
+                    display_result(result)
+                    results.append(result)
+                    gc.collect()
+
+    return results
+
+def main() -> None:
+    """Main entry point"""
+    args = parse_arguments()
+    server_workers_to_test = [args.server_workers] if args.server_workers else SERVER_WORKERS
+    raise_open_files_limit()
+    prepare_test_files()
+    results = run_test_matrix(server_workers_to_test, args.clients, args.max_connections)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    write_results_to_csv(results, f"stress_test_async_results_{timestamp}.csv")
+
+if __name__ == "__main__":
+    main()
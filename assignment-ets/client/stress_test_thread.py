@@ -9,10 +9,14 @@ from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Callable, Any
 from functools import partial
+import file_client_cli_pool
 from file_client_cli_pool import remote_get, remote_upload
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Every download is measured as a transfer, never answered from the cache
+file_client_cli_pool.download_cache = None
+
 OPERATIONS = ['upload', 'download']
 CLIENT_WORKERS = [1, 5, 50]
 SERVER_WORKERS = [1, 5, 50]
@@ -0,0 +1,128 @@
+import threading
+import time
+from typing import Dict, Optional
+
+"""
+* Admission control: berapa banyak pekerjaan yang boleh antre di depan
+  worker pool.
+
+* Setiap pekerjaan (koneksi pada mode thread/prefork, request pada mode
+  asyncio) harus masuk AdmissionQueue dulu. Kapasitasnya jumlah worker
+  ditambah kedalaman antrean; jika penuh, pekerjaan langsung ditolak
+  dengan status BUSY dan saran retry_after, bukan dibiarkan menunggu
+  di antrean tanpa batas sampai client timeout.
+
+* retry_after diperkirakan dari panjang antrean dan rata-rata lama
+  pekerjaan (EWMA), dibatasi antara MIN_RETRY_AFTER dan MAX_RETRY_AFTER.
+
+* Waktu tunggu di antrean (dari diterima sampai mulai dikerjakan) dicatat
+  untuk statistik.
+"""
+
+MIN_RETRY_AFTER = 0.05
+MAX_RETRY_AFTER = 5.0
+SERVICE_SMOOTHING = 0.2  # Weight of the newest sample in the service time average
+
+
+def busy_result(retry_after: float) -> Dict:
+    """Result sent instead of running a request that was not admitted"""
+    return {"status": "BUSY", "data": "Server busy, retry later", "retry_after": retry_after}
+
+
+class AdmissionQueue:
+    """Bounded queue in front of ``workers`` handlers.
+
+    ``try_enter`` hands out a ticket (the admission time) or None when
+    ``workers + depth`` jobs are already waiting or running. The holder
+    calls ``start`` when a worker picks the job up and ``finish`` when it
+    is done. Queue length, busy workers, rejections and busy time are
+    mirrored into ``stats`` (a ServerStats) when given.
+    """
+    def __init__(self, workers: int, depth: int, stats=None):
+        self.workers = workers
+        self.depth = depth
+        self.lock = threading.Lock()
+        self.active = 0  # Admitted and not finished: queued or running
+        self.running = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.service_time: Optional[float] = None
+        self.counters = stats
+        if stats is not None:
+            stats.set('workers', workers)
+
+    def try_enter(self) -> Optional[float]:
+        with self.lock:
+            if self.active >= self.workers + self.depth:
+                self.rejected += 1
+                if self.counters is not None:
+                    self.counters.add('rejected')
+                return None
+            self.active += 1
+            self.admitted += 1
+            self._publish()
+        return time.monotonic()
+
+    def start(self, ticket: float) -> float:
+        now = time.monotonic()
+        wait = now - ticket
+        with self.lock:
+            self.running += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self._publish()
+            if self.counters is not None:
+                self.counters.add('started')
+                self.counters.add('wait_us', int(wait * 1000000))
+        return now
+
+    def finish(self, started: Optional[float]) -> None:
+        """Release an admitted job; ``started`` is None if it never ran"""
+        with self.lock:
+            self.active -= 1
+            if started is None:
+                self._publish()
+                return
+            self.running -= 1
+            self._publish()
+            elapsed = time.monotonic() - started
+            if self.counters is not None:
+                self.counters.add('busy_us', int(elapsed * 1000000))
+            if self.service_time is None:
+                self.service_time = elapsed
+            else:
+                self.service_time += SERVICE_SMOOTHING * (elapsed - self.service_time)
+
+    def waiting(self) -> int:
+        """Admitted jobs that are still waiting for a worker"""
+        with self.lock:
+            return self.active - self.running
+
+    def retry_after(self) -> float:
+        """Seconds a rejected client should wait before trying again"""
+        with self.lock:
+            queued = max(0, self.active - self.workers)
+            service_time = self.service_time or MIN_RETRY_AFTER
+        estimate = (queued + 1) * service_time / max(1, self.workers)
+        return round(min(max(estimate, MIN_RETRY_AFTER), MAX_RETRY_AFTER), 3)
+
+    def stats(self) -> Dict:
+        with self.lock:
+            started = self.admitted - (self.active - self.running)
+            return {
+                "workers": self.workers,
+                "depth": self.depth,
+                "queued": self.active - self.running,
+                "running": self.running,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "wait_avg": self.wait_total / started if started else 0.0,
+                "wait_max": self.wait_max,
+            }
+
+    def _publish(self) -> None:
+        if self.counters is not None:
+            self.counters.set('queued', self.active - self.running)
+            self.counters.set('running', self.running)
@@ -0,0 +1,126 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+"""
+* FileCache menyimpan file yang sering di-GET di memori, supaya banyak
+  client yang mengunduh file yang sama tidak membaca dan meng-encode
+  ulang file tersebut dari disk.
+
+* Yang disimpan per file: isi mentah (bytes) dan, setelah response
+  pertama dibuat, response legacy yang sudah jadi (JSON + base64 +
+  "\r\n\r\n"). Keduanya dihitung ke dalam budget memori dalam byte;
+  jika budget terlampaui, entry yang paling lama tidak dipakai dibuang
+  (LRU).
+
+* Entry dianggap basi jika inode, ukuran, atau mtime file berubah. Upload
+  selalu memasang file baru lewat rename, sehingga inode ikut berubah;
+  FileInterface juga membuang entry secara eksplisit pada UPLOAD/DELETE.
+"""
+
+
+class CacheEntry:
+    def __init__(self, cache: "FileCache", path: str, signature: tuple, data: bytes):
+        self.cache = cache
+        self.path = path
+        self.signature = signature
+        self.data = data
+        self.response: Optional[bytes] = None
+
+    @property
+    def cost(self) -> int:
+        return len(self.data) + (len(self.response) if self.response is not None else 0)
+
+
+def file_signature(st: os.stat_result) -> tuple:
+    return (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+
+
+class FileCache:
+    """Byte-budgeted LRU cache of whole files, keyed by path"""
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, path: str, st: os.stat_result) -> Optional[CacheEntry]:
+        """Entry for ``path`` if it still matches the file on disk"""
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry.signature != file_signature(st):
+                self._remove(entry)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(path)
+            self.hits += 1
+            return entry
+
+    def peek(self, path: str, st: os.stat_result) -> Optional[CacheEntry]:
+        """Like ``lookup`` without counting or reordering"""
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry.signature == file_signature(st):
+                return entry
+            return None
+
+    def store(self, path: str, st: os.stat_result, data: bytes) -> Optional[CacheEntry]:
+        """Cache ``data`` read from ``path``; None if it cannot fit"""
+        if len(data) > self.budget:
+            return None
+        entry = CacheEntry(self, path, file_signature(st), data)
+        with self.lock:
+            old = self.entries.get(path)
+            if old is not None:
+                self._remove(old)
+            self.entries[path] = entry
+            self.size += entry.cost
+            self._evict(keep=entry)
+        return entry
+
+    def attach_response(self, entry: CacheEntry, response: bytes) -> None:
+        """Keep the finished legacy response next to the file bytes"""
+        with self.lock:
+            if entry.response is not None or self.entries.get(entry.path) is not entry:
+                return  # Built concurrently, or evicted/invalidated meanwhile
+            if entry.cost + len(response) > self.budget:
+                return
+            entry.response = response
+            self.size += len(response)
+            self.entries.move_to_end(entry.path)
+            self._evict(keep=entry)
+
+    def invalidate(self, path: str) -> None:
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None:
+                self._remove(entry)
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "bytes": self.size,
+                "budget": self.budget,
+            }
+
+    def _evict(self, keep: CacheEntry) -> None:
+        while self.size > self.budget:
+            oldest = next(iter(self.entries.values()))
+            if oldest is keep:
+                break
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, entry: CacheEntry) -> None:
+        del self.entries[entry.path]
+        self.size -= entry.cost
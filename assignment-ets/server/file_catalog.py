@@ -0,0 +1,212 @@
+import os
+import stat
+import json
+import base64
+import bisect
+import threading
+import time
+from typing import Callable, Dict, List, Any, Optional
+
+"""
+* FileCatalog adalah indeks di memori dari file yang ada di direktori
+  penyimpanan (nama, ukuran, mtime, dan hash jika diketahui), supaya LIST
+  tidak perlu os.listdir + stat untuk setiap file pada setiap request.
+
+* Catalog diperbarui langsung oleh FileInterface setiap kali sebuah nama
+  di-upload, di-link atau dihapus, dan dicocokkan ulang dengan isi disk
+  di background (perubahan oleh proses lain, file yang disalin manual).
+
+* Untuk setiap urutan (name, size, mtime) ada list terurut, sehingga satu
+  halaman LIST cukup bisect + membaca sebanyak ``limit`` entry. Cursor
+  adalah kunci entry terakhir dari halaman sebelumnya.
+"""
+
+SORT_KEYS = {
+    'name': lambda entry: (entry['name'],),
+    'size': lambda entry: (entry['size'], entry['name']),
+    'mtime': lambda entry: (entry['mtime_ns'], entry['name']),
+}
+
+
+def encode_cursor(sort: str, descending: bool, key: tuple) -> str:
+    data = json.dumps([sort, descending, list(key)]).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor: str, sort: str, descending: bool) -> tuple:
+    try:
+        cursor_sort, cursor_descending, key = json.loads(base64.urlsafe_b64decode(cursor))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if cursor_sort != sort or cursor_descending != descending:
+        raise ValueError("Cursor belongs to a different sort order")
+    return tuple(key)
+
+
+class FileCatalog:
+    """Name/size/mtime/hash index of the storage root, kept in memory.
+
+    ``digest_of(path, stat)`` supplies the optional content hash without
+    reading the file; it may return None. The catalog is loaded on first
+    use, after which a daemon thread reconciles it with the directory
+    every ``interval`` seconds (skipped while the directory mtime is
+    unchanged, except for a full pass every ``full_every`` rounds, which
+    also catches files rewritten in place).
+
+    When other processes write to the same root (prefork workers), set
+    ``shared``: every page then first checks the directory mtime and
+    rescans if it moved, trading O(page) reads for up-to-date answers.
+    """
+    def __init__(self, root: str, digest_of: Optional[Callable] = None,
+                 interval: float = 5.0, full_every: int = 12, shared: bool = False):
+        self.root = root
+        self.digest_of = digest_of
+        self.shared = shared
+        self.interval = interval
+        self.full_every = full_every
+        self.lock = threading.RLock()
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.indexes: Dict[str, List[tuple]] = {sort: [] for sort in SORT_KEYS}
+        self.loaded = False
+        self.dir_mtime = None
+        self.reconciler = None
+
+    def update(self, name: str) -> None:
+        """Re-read one name from disk after it was written or removed"""
+        with self.lock:
+            if not self.loaded:
+                return  # The initial load will see it
+            self._refresh(name)
+
+    def page(self, prefix: str = '', sort: str = 'name', descending: bool = False,
+             limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of entries whose name starts with ``prefix``.
+
+        Returns ``{"files": [...], "next_cursor": str or None}``. With the
+        name order the cost is a bisect plus the page; size and mtime orders
+        skip over non-matching names when a prefix is given.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort}")
+        if limit is not None and limit <= 0:
+            raise ValueError("Invalid limit")
+        after = decode_cursor(cursor, sort, descending) if cursor else None
+        self._ensure_loaded()
+        if self.shared:
+            self.reconcile()
+
+        with self.lock:
+            index = self.indexes[sort]
+            lo, hi = 0, len(index)
+            if sort == 'name' and prefix:
+                lo = bisect.bisect_left(index, (prefix,))
+                hi = bisect.bisect_left(index, (prefix[:-1] + chr(ord(prefix[-1]) + 1),))
+            if after is not None:
+                if descending:
+                    hi = min(hi, bisect.bisect_left(index, after))
+                else:
+                    lo = max(lo, bisect.bisect_right(index, after))
+
+            positions = range(hi - 1, lo - 1, -1) if descending else range(lo, hi)
+            files, last = [], None
+            for position in positions:
+                key = index[position]
+                name = key[-1]
+                if prefix and not name.startswith(prefix):
+                    continue
+                if limit is not None and len(files) == limit:
+                    break
+                files.append(self._public(self.entries[name]))
+                last = key
+            else:
+                last = None  # Reached the end, no next page
+
+        next_cursor = encode_cursor(sort, descending, last) if last is not None else None
+        return {"files": files, "next_cursor": next_cursor}
+
+    def reconcile(self, force: bool = False) -> None:
+        """Bring the catalog in line with the directory"""
+        try:
+            dir_mtime = os.stat(self.root).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if not force and dir_mtime == self.dir_mtime:
+            return
+        self.dir_mtime = dir_mtime
+
+        on_disk = {}
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    if entry.is_file(follow_symlinks=False):
+                        st = entry.stat(follow_symlinks=False)
+                        on_disk[entry.name] = (st.st_ino, st.st_size, st.st_mtime_ns)
+                except FileNotFoundError:
+                    continue
+
+        with self.lock:
+            known = {name: (entry['ino'], entry['size'], entry['mtime_ns'])
+                     for name, entry in self.entries.items()}
+        # Re-stat only what differs, so a write racing with the scan wins
+        for name in set(known) | set(on_disk):
+            if known.get(name) != on_disk.get(name):
+                self._refresh(name)
+
+    def _ensure_loaded(self) -> None:
+        if self.loaded:
+            return
+        with self.lock:
+            if self.loaded:
+                return
+            self.reconcile(force=True)
+            self.loaded = True
+        if self.interval:
+            self.reconciler = threading.Thread(target=self._reconcile_loop, daemon=True)
+            self.reconciler.start()
+
+    def _reconcile_loop(self) -> None:
+        rounds = 0
+        while True:
+            time.sleep(self.interval)
+            rounds += 1
+            try:
+                self.reconcile(force=rounds % self.full_every == 0)
+            except OSError:
+                pass  # Try again next round
+
+    def _refresh(self, name: str) -> None:
+        path = os.path.join(self.root, name)
+        try:
+            st = os.stat(path, follow_symlinks=False)
+        except FileNotFoundError:
+            st = None
+        if st is not None and not stat.S_ISREG(st.st_mode):
+            st = None
+        with self.lock:
+            old = self.entries.pop(name, None)
+            if old is not None:
+                for sort, key in SORT_KEYS.items():
+                    index = self.indexes[sort]
+                    del index[bisect.bisect_left(index, key(old))]
+            if st is None:
+                return
+            entry = {
+                'name': name,
+                'size': st.st_size,
+                'mtime_ns': st.st_mtime_ns,
+                'ino': st.st_ino,
+                'hash': self.digest_of(path, st) if self.digest_of else None,
+            }
+            self.entries[name] = entry
+            for sort, key in SORT_KEYS.items():
+                bisect.insort(self.indexes[sort], key(entry))
+
+    def _public(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "name": entry['name'],
+            "size": entry['size'],
+            "mtime": entry['mtime_ns'] / 1e9,
+            "hash": entry['hash'],
+        }
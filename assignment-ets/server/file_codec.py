@@ -0,0 +1,146 @@
+import bz2
+import lzma
+import zlib
+from typing import Callable, Iterator, List, Optional
+
+"""
+* Kompresi transfer yang dinegosiasikan per request, memakai codec
+  dari stdlib (zlib, lzma, bz2).
+
+* GET: client mengirim daftar codec yang diterima (accept=zlib,lzma),
+  server mencoba codec pertama yang didukung pada potongan awal file
+  (SAMPLE_SIZE byte). Jika hasilnya tidak cukup kecil (mis. JPEG atau
+  data acak) file dikirim apa adanya.
+
+* UPLOAD: client mengirim isi yang sudah dikompres dengan
+  compression=<codec>, server men-dekompres sambil menulis ke disk.
+
+* Kompresi dan dekompresi berjalan per chunk (streaming), tidak pernah
+  memegang seluruh file di memori.
+
+* Modul ini dipakai client dan server, yang dijalankan di mesin berbeda
+  dari direktorinya masing-masing; karena itu ada dua salinan,
+  client/file_codec.py dan server/file_codec.py, yang harus tetap identik
+  (dicek oleh tests/test_shared_modules.py).
+"""
+
+CODECS = {
+    'zlib': (lambda: zlib.compressobj(6), zlib.decompressobj),
+    'lzma': (lambda: lzma.LZMACompressor(preset=1), lzma.LZMADecompressor),
+    'bz2': (lambda: bz2.BZ2Compressor(9), bz2.BZ2Decompressor),
+}
+
+SAMPLE_SIZE = 64 * 1024
+MIN_SAVING = 0.1  # Compress only if the sample shrinks by at least 10%
+
+
+def parse_accept(accept) -> List[str]:
+    """'zlib,lzma' or ['zlib', 'lzma'] -> supported codecs, in client order"""
+    if not accept:
+        return []
+    if isinstance(accept, str):
+        accept = accept.split(',')
+    return [codec.strip() for codec in accept if codec.strip() in CODECS]
+
+
+def check_codec(codec: Optional[str]) -> Optional[str]:
+    if codec and codec not in CODECS:
+        raise ValueError(f"Unsupported compression: {codec}")
+    return codec or None
+
+
+def worth_compressing(codec: str, sample: bytes) -> bool:
+    if not sample:
+        return False
+    compressor = CODECS[codec][0]()
+    compressed = len(compressor.compress(sample)) + len(compressor.flush())
+    return compressed <= len(sample) * (1 - MIN_SAVING)
+
+
+def choose_codec(accept, sample: bytes) -> Optional[str]:
+    """Codec to send ``sample``'s file with, or None to send it as is"""
+    codecs = parse_accept(accept)
+    if codecs and worth_compressing(codecs[0], sample):
+        return codecs[0]
+    return None
+
+
+class OwnedChunks:
+    """Iterator over ``pieces`` read from ``stream`` that owns the stream:
+    close() closes it even when iteration never started, which closing
+    an unstarted generator alone would not"""
+    def __init__(self, pieces: Iterator[bytes], stream):
+        self.pieces = pieces
+        self.stream = stream
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> bytes:
+        return next(self.pieces)
+
+    def close(self) -> None:
+        # Raises ValueError, leaving the stream to the generator, while
+        # another thread is still running it
+        self.pieces.close()
+        self.stream.close()
+
+
+def compress_chunks(stream, codec: str, chunk_size: int) -> OwnedChunks:
+    """Compressed pieces of the rest of ``stream``, which is closed at the
+    end or by ``close()``"""
+    return OwnedChunks(_compressed_pieces(stream, codec, chunk_size), stream)
+
+
+def _compressed_pieces(stream, codec: str, chunk_size: int) -> Iterator[bytes]:
+    compressor = CODECS[codec][0]()
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with stream:
+        while True:
+            nbytes = stream.readinto(buffer)
+            if not nbytes:
+                break
+            piece = compressor.compress(view[:nbytes])
+            if piece:
+                yield piece
+    piece = compressor.flush()
+    if piece:
+        yield piece
+
+
+class Decompressor:
+    """Incremental decompression with bounded output per step.
+
+    ``feed`` hands the output to ``sink`` in pieces of at most
+    ``max_length`` bytes, so a small, highly compressed input cannot
+    expand into one huge buffer.
+    """
+    def __init__(self, codec: str, max_length: int = 1024 * 1024):
+        self.codec = codec
+        self.max_length = max_length
+        self.obj = CODECS[codec][1]()
+
+    def feed(self, data, sink: Callable) -> None:
+        obj = self.obj
+        if obj.eof:
+            if len(data):
+                raise ValueError("Data after the end of the compressed content")
+            return
+        self._emit(obj.decompress(data, self.max_length), sink)
+        if hasattr(obj, 'unconsumed_tail'):  # zlib
+            while obj.unconsumed_tail and not obj.eof:
+                self._emit(obj.decompress(obj.unconsumed_tail, self.max_length), sink)
+            if obj.unused_data:
+                raise ValueError("Data after the end of the compressed content")
+        else:  # lzma, bz2
+            while not obj.needs_input and not obj.eof:
+                self._emit(obj.decompress(b'', self.max_length), sink)
+
+    def finish(self) -> None:
+        if not self.obj.eof:
+            raise ValueError("Truncated compressed content")
+
+    def _emit(self, data: bytes, sink: Callable) -> None:
+        if data:
+            sink(data)
@@ -0,0 +1,202 @@
+import json
+import shlex
+import struct
+
+"""
+* Framing untuk dua versi protokol file server
+
+* Protokol v1 (legacy): 4 byte panjang command, command string
+  (shlex), untuk UPLOAD diikuti 4 byte panjang payload + payload base64.
+  Parameter tambahan ditulis key=value setelah nama file. Response
+  berupa JSON diakhiri "\r\n\r\n"; command raw (GETRAW) menjawab
+  dengan 4 byte panjang header JSON lalu body mentah.
+
+* Protokol v2 (binary): client membuka koneksi dengan MAGIC + 2 byte
+  versi tertinggi yang didukung, server menjawab MAGIC + versi yang
+  dipakai. Setelah itu setiap request dan response adalah satu frame:
+
+      HEADER (20 byte) | meta (JSON kecil) | body (bytes mentah)
+
+  HEADER = opcode, status, flags, request id, panjang meta, panjang body.
+  Nama file ("name") dan parameter lain (mis. "offset", "length") ada
+  di meta, isi file dikirim apa adanya di body (tanpa base64), panjang
+  body 8 byte sehingga tidak ada batas 4 GiB.
+
+* Body terkompresi yang ukurannya belum diketahui (kompresi on the fly,
+  lihat file_codec) dikirim "chunked": header/meta berisi "chunked": true
+  dan panjang body 0, lalu diikuti potongan-potongan berformat 4 byte
+  panjang + data, diakhiri potongan dengan panjang 0. Format ini sama
+  untuk GETRAW v1 dan GET v2.
+
+* Versi 3 (pipelining): format frame sama, tetapi client boleh mengirim
+  banyak request tanpa menunggu response, dan server boleh menjawab
+  request tanpa body secara paralel dan tidak berurutan. Client
+  mencocokkan response dengan request lewat request id di HEADER.
+  Client v2 tetap mendapat response berurutan.
+
+* Batch (MGET, MDELETE, MUPLOAD): response-nya selalu chunked. Untuk
+  setiap item ada satu potongan berisi JSON hasil item tersebut (name,
+  status, data, data_size), lalu untuk MGET yang berhasil diikuti
+  potongan-potongan isi file sebanyak data_size byte. Body request
+  MUPLOAD berisi record berurutan: 4 byte panjang meta, meta JSON
+  (name, size, compression) lalu size byte isi file. Nama untuk
+  MGET/MDELETE ada di meta "names" (v2) atau ditulis berurutan setelah
+  command (v1).
+
+* ARCHIVE menjawab dengan body chunked berisi file tar (atau tar.gz,
+  lihat file_archive), tanpa item JSON seperti batch.
+
+* SIGS dan DELTA mengupload ulang hanya bagian file yang berubah; DELTA
+  membawa payload seperti UPLOAD (lihat file_delta).
+
+* MAGIC dipilih supaya tidak bisa tertukar dengan request v1: dibaca
+  sebagai panjang command, b'FPV2' bernilai sekitar 1.1 GB.
+"""
+
+MAGIC = b'FPV2'
+VERSION = 3
+PIPELINE_VERSION = 3  # First version whose responses may come out of order
+VERSION_FORMAT = struct.Struct('!H')
+HEADER = struct.Struct('!BBHIIQ')
+LENGTH_PREFIX = struct.Struct('!I')
+
+OP_LIST = 1
+OP_GET = 2
+OP_UPLOAD = 3
+OP_DELETE = 4
+OP_UPLOAD_OPEN = 5
+OP_UPLOAD_PART = 6
+OP_UPLOAD_COMMIT = 7
+OP_UPLOAD_ABORT = 8
+OP_HAVE = 9
+OP_LINK = 10
+OP_STATS = 11
+OP_MGET = 12
+OP_MDELETE = 13
+OP_MUPLOAD = 14
+OP_ARCHIVE = 15
+OP_SIGS = 16
+OP_DELTA = 17
+
+# Opcode -> FileProtocol command; v2 always transfers raw bytes
+OPCODES = {
+    OP_LIST: 'list',
+    OP_GET: 'getraw',
+    OP_UPLOAD: 'uploadraw',
+    OP_DELETE: 'delete',
+    OP_UPLOAD_OPEN: 'uploadopen',
+    OP_UPLOAD_PART: 'uploadpart',
+    OP_UPLOAD_COMMIT: 'uploadcommit',
+    OP_UPLOAD_ABORT: 'uploadabort',
+    OP_HAVE: 'have',
+    OP_LINK: 'link',
+    OP_STATS: 'stats',
+    OP_MGET: 'mget',
+    OP_MDELETE: 'mdelete',
+    OP_MUPLOAD: 'mupload',
+    OP_ARCHIVE: 'archive',
+    OP_SIGS: 'sigs',
+    OP_DELTA: 'delta',
+}
+
+# v1 commands followed by a 4-byte length and a payload
+UPLOAD_COMMANDS = ('upload', 'uploadraw', 'uploadpart', 'mupload', 'delta')
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+STATUS_BUSY = 2  # Not admitted, retry after meta["retry_after"] seconds
+STATUS_NOT_MODIFIED = 3  # Conditional GET: the client's copy is current, no body
+
+STATUSES = {'OK': STATUS_OK, 'BUSY': STATUS_BUSY, 'NOT_MODIFIED': STATUS_NOT_MODIFIED}
+
+
+def succeeded(result):
+    """Whether a FileProtocol result counts as a success in the stats"""
+    return result.get('status') in ('OK', 'NOT_MODIFIED')
+
+
+# Keys a v1 command may pass as key=value; any other token is a file name
+LEGACY_OPTIONS = frozenset(('offset', 'length', 'accept', 'if_none_match', 'if_match',
+                            'compression', 'size', 'upload_id', 'hash', 'digest',
+                            'block_size', 'prefix', 'sort', 'limit', 'cursor'))
+
+
+def legacy_option(part):
+    """(key, value) when ``part`` is a known key=value option, else None"""
+    key, sep, value = part.partition('=')
+    return (key, value) if sep and key in LEGACY_OPTIONS else None
+
+
+def parse_legacy_command(command_data):
+    """v1 command bytes -> (command, filename, options).
+
+    Tokens after the filename written as a known key=value become options,
+    e.g. ``GETRAW big.bin offset=1048576 length=65536``; several plain
+    names (``MGET a.txt b.txt``, a name may contain '=') are also listed in
+    options["names"]. command is '' when the command string is empty.
+    """
+    parts = shlex.split(command_data.decode())
+    if not parts:
+        return '', '', {}
+    options = {}
+    names = parts[1:2]
+    for part in parts[2:]:
+        option = legacy_option(part)
+        if option:
+            options[option[0]] = option[1]
+        else:
+            names.append(part)
+    if len(names) > 1:
+        options['names'] = names
+    return parts[0].lower(), parts[1] if len(parts) > 1 else '', options
+
+
+def split_meta(meta):
+    """v2 request meta -> (filename, options)"""
+    options = dict(meta)
+    return options.pop('name', ''), options
+
+
+def encode_legacy(result):
+    """v1 response: JSON terminated by CRLFCRLF.
+
+    A GET result served through the FileCache carries its ``cache`` entry:
+    the finished response is reused when the entry has one, otherwise the
+    response built here is stored in it for the next request.
+    """
+    entry = result.pop('cache', None)
+    if entry is not None and entry.response is not None:
+        return entry.response
+    response = (json.dumps(result) + "\r\n\r\n").encode()
+    if entry is not None:
+        entry.cache.attach_response(entry, response)
+    return response
+
+
+def encode_raw_header(result):
+    """v1 raw response header: 4-byte length + JSON, body follows"""
+    header = json.dumps(result).encode()
+    return LENGTH_PREFIX.pack(len(header)) + header
+
+
+def encode_chunk(data):
+    """One piece of a chunked body; an empty piece ends the body"""
+    return LENGTH_PREFIX.pack(len(data)) + data
+
+
+END_CHUNK = LENGTH_PREFIX.pack(0)
+
+
+def encode_handshake(version=VERSION):
+    return MAGIC + VERSION_FORMAT.pack(version)
+
+
+def encode_frame(opcode, request_id, result, body_length=0, flags=0):
+    """v2 frame header + meta for a FileProtocol result; body follows"""
+    status = STATUSES.get(result.get('status'), STATUS_ERROR)
+    meta = json.dumps(result).encode()
+    return HEADER.pack(opcode, status, flags, request_id, len(meta), body_length) + meta
+
+
+def decode_meta(data):
+    return json.loads(data) if data else {}
@@ -1,11 +1,28 @@
 import os
 import json
 import base64
+import binascii
 import logging
 import functools
-from glob import glob
+import tempfile
+import threading
+import hashlib
+import time
+import uuid
+import re
+from glob import glob, escape as glob_escape
 from typing import Dict, List, Any, Optional, Callable
 
+from file_cache import FileCache
+from file_codec import (SAMPLE_SIZE, Decompressor, check_codec, choose_codec,
+                        compress_chunks)
+from file_catalog import FileCatalog
+from file_archive import archive_chunks, check_compression as check_archive_compression
+from file_delta import DeltaDecoder, block_size_for, check_block_size, signatures
+import file_trace
+
+logger = logging.getLogger("FileInterface")
+
 
 def error_handling(func):
     @functools.wraps(func)
@@ -13,45 +30,616 @@ def error_handling(func):
         try:
             return func(*args, **kwargs)
         except Exception as e:
-            logging.error(f"Error in {func.__name__}: {str(e)}")
+            logger.error(f"Error in {func.__name__}: {str(e)}")
             return {"status": "ERROR", "data": str(e)}
     return wrapper
 
 
+class BlobStore:
+    """Content-addressed storage behind the file names.
+
+    Every distinct content is kept once as ``.blobs/<sha256>`` and each file
+    name in the storage root is a hard link to its blob, so reads, ranged
+    reads and sendfile keep working on plain paths while disk usage follows
+    unique content. A blob whose only remaining link is its own entry in
+    ``.blobs`` is garbage and removed. This relies on names never being
+    modified in place: every write goes through a temporary file and a
+    rename. Pre-compressed copies of a blob live next to it as
+    ``<sha256>.<codec>`` and go away with it.
+    """
+    def __init__(self, root: str):
+        self.dir = os.path.join(root, '.blobs')
+        os.makedirs(self.dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self._inodes = None  # (st_dev, st_ino) -> digest, built lazily
+    
+    def path(self, digest: str) -> str:
+        if not re.fullmatch(r'[0-9a-f]{64}', digest or ''):
+            raise ValueError("Invalid content hash")
+        return os.path.join(self.dir, digest)
+    
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+    
+    def digest_of(self, path: str) -> Optional[str]:
+        """Content hash of a stored name, or None if it is not linked yet"""
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        key = (st.st_dev, st.st_ino)
+        with self.lock:
+            if self._inodes is None or self._known(key) is None:
+                # Another worker process may have added the blob
+                self._scan()
+            return self._known(key)
+    
+    def commit(self, temp_path: str, path: str, digest: str) -> None:
+        """Publish ``temp_path`` (holding content ``digest``) as ``path``"""
+        old = self.digest_of(path)
+        blob = self.path(digest)
+        try:
+            os.link(temp_path, blob)
+        except FileExistsError:
+            # Known content: point the name at the existing blob instead
+            try:
+                self._link(blob, path)
+            except FileNotFoundError:
+                # The blob was collected meanwhile; keep our copy
+                os.link(temp_path, blob)
+                os.replace(temp_path, path)
+            else:
+                os.unlink(temp_path)
+        else:
+            os.replace(temp_path, path)
+        self._remember(blob, digest)
+        if old and old != digest:
+            self.release(old)
+    
+    def link_existing(self, digest: str, path: str) -> None:
+        """Point ``path`` at content the store already holds"""
+        old = self.digest_of(path)
+        self._link(self.path(digest), path)
+        if old and old != digest:
+            self.release(old)
+    
+    def release(self, digest: Optional[str]) -> None:
+        """Drop a blob once no name links to it any more"""
+        if not digest:
+            return
+        blob = self.path(digest)
+        try:
+            if os.stat(blob).st_nlink <= 1:
+                os.unlink(blob)
+                for variant in glob(glob_escape(blob) + '.*'):
+                    os.unlink(variant)
+        except FileNotFoundError:
+            pass
+    
+    def variant_path(self, digest: str, codec: str) -> str:
+        """Where the ``codec``-compressed copy of a blob is kept"""
+        return f"{self.path(digest)}.{codec}"
+    
+    def adopt(self, path: str) -> None:
+        """Move a file that was placed in the root directly into the store"""
+        st = os.stat(path)
+        if st.st_nlink > 1 and self.digest_of(path):
+            return  # Already linked to a blob
+        digest = file_digest(path)
+        if os.stat(path).st_ino != st.st_ino:
+            return  # Replaced while hashing
+        blob = self.path(digest)
+        try:
+            os.link(path, blob)
+            self._remember(blob, digest)
+        except FileExistsError:
+            self._link(blob, path)
+    
+    def _link(self, blob: str, path: str) -> None:
+        temp_path = os.path.join(os.path.dirname(path), f'.link-{uuid.uuid4().hex}')
+        os.link(blob, temp_path)
+        os.replace(temp_path, path)
+        try:
+            # rename() is a no-op when path already links to the blob
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+    
+    def _remember(self, blob: str, digest: str) -> None:
+        st = os.stat(blob)
+        with self.lock:
+            if self._inodes is not None:
+                self._inodes[(st.st_dev, st.st_ino)] = digest
+    
+    def cached_digest(self, path: str, st: os.stat_result) -> Optional[str]:
+        """Like ``digest_of`` but never rescans the blob directory"""
+        with self.lock:
+            if self._inodes is None:
+                self._scan()
+            return self._known((st.st_dev, st.st_ino))
+    
+    def _known(self, key) -> Optional[str]:
+        # Blobs removed by any process leave their inode free for reuse,
+        # so check that the remembered blob still is that inode
+        digest = self._inodes.get(key)
+        if digest is None:
+            return None
+        try:
+            st = os.stat(os.path.join(self.dir, digest))
+        except FileNotFoundError:
+            st = None
+        if st is None or (st.st_dev, st.st_ino) != key:
+            del self._inodes[key]
+            return None
+        return digest
+    
+    def _scan(self) -> None:
+        inodes = {}
+        with os.scandir(self.dir) as entries:
+            for entry in entries:
+                if '.' in entry.name:
+                    continue  # Compressed copies and in-flight files
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                inodes[(st.st_dev, st.st_ino)] = entry.name
+        self._inodes = inodes
+
+
+def file_digest(path: str, buffer_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    buffer = bytearray(buffer_size)
+    view = memoryview(buffer)
+    with open(path, 'rb', buffering=0) as fp:
+        while True:
+            nbytes = fp.readinto(buffer)
+            if not nbytes:
+                break
+            digest.update(view[:nbytes])
+    return digest.hexdigest()
+
+
+class UploadWriter:
+    """Streams an upload into a temporary file in the storage root.
+
+    Base64 input is decoded chunk by chunk, carrying the trailing partial
+    quantum over to the next write, so the whole upload is never held in
+    memory; ``encoding='raw'`` writes chunks as they are. With a
+    ``compression`` codec the decoded bytes are decompressed on the way
+    too. The content is hashed as it is written. ``commit`` publishes the
+    temporary file atomically through the blob store; ``abort`` discards
+    it.
+    """
+    def __init__(self, path: str, encoding: str = 'base64', store: Optional[BlobStore] = None,
+                 compression: Optional[str] = None):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.encoding = encoding
+        self.store = store
+        self.decompressor = Decompressor(compression) if check_codec(compression) else None
+        self.digest = hashlib.sha256()
+        fd, self.temp_path = tempfile.mkstemp(prefix='.upload-', dir=os.path.dirname(path))
+        os.fchmod(fd, 0o644)
+        self.file = os.fdopen(fd, 'wb')
+        self._pending = b''
+    
+    def write(self, chunk) -> None:
+        if self.encoding == 'raw':
+            self._decoded(chunk)
+            return
+        data = self._pending + chunk if self._pending else bytes(chunk)
+        usable = len(data) - len(data) % 4
+        self._pending = data[usable:]
+        if usable:
+            self._decoded(binascii.a2b_base64(data[:usable]))
+    
+    def _decoded(self, data) -> None:
+        if self.decompressor is not None:
+            self.decompressor.feed(data, self._write)
+        else:
+            self._write(data)
+    
+    def _write(self, data) -> None:
+        file_trace.mark('encode')  # base64 decoding and decompression
+        self.digest.update(data)
+        self.file.write(data)
+        file_trace.mark('disk')
+    
+    def commit(self) -> Dict[str, Any]:
+        if self._pending:
+            self.abort()
+            raise ValueError("Truncated base64 content")
+        if self.decompressor is not None:
+            try:
+                self.decompressor.finish()
+            except ValueError:
+                self.abort()
+                raise
+        self.file.close()
+        if self.store is not None:
+            self.store.commit(self.temp_path, self.path, self.digest.hexdigest())
+        else:
+            os.replace(self.temp_path, self.path)
+        return {"status": "OK", "data": f"File {self.name} uploaded successfully"}
+    
+    def abort(self) -> None:
+        self.file.close()
+        try:
+            os.unlink(self.temp_path)
+        except FileNotFoundError:
+            pass
+
+
+class DeltaWriter:
+    """Rebuilds an upload from the stored version of ``path`` and a delta.
+
+    The delta is fed with ``write`` like an upload payload; COPY ranges
+    are read from the old file, which stays open even if the name is
+    replaced meanwhile. ``commit`` only publishes the result when its
+    sha256 is ``digest``.
+    """
+    def __init__(self, path: str, digest: str, store: Optional[BlobStore] = None,
+                 buffer_size: int = 1024 * 1024):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.expected = digest
+        self.buffer_size = buffer_size
+        self.base = open(path, 'rb')
+        try:
+            self.base_size = os.fstat(self.base.fileno()).st_size
+            self.upload = UploadWriter(path, 'raw', store)
+        except BaseException:
+            self.base.close()  # Nobody else holds it yet
+            raise
+        self.decoder = DeltaDecoder(self._copy, self.upload.write)
+    
+    def write(self, chunk) -> None:
+        self.decoder.feed(chunk)
+    
+    def _copy(self, offset: int, length: int) -> None:
+        if offset + length > self.base_size:
+            raise ValueError(f"Delta reads past the end of {self.name}")
+        fd = self.base.fileno()
+        while length:
+            piece = os.pread(fd, min(length, self.buffer_size), offset)
+            if not piece:
+                raise ValueError(f"{self.name} shrank while the delta was applied")
+            self.upload.write(piece)
+            offset += len(piece)
+            length -= len(piece)
+    
+    def commit(self) -> Dict[str, Any]:
+        self.base.close()
+        try:
+            self.decoder.finish()
+        except ValueError:
+            self.upload.abort()
+            raise
+        if self.upload.digest.hexdigest() != self.expected:
+            self.upload.abort()
+            raise ValueError(f"Rebuilt {self.name} does not match its digest, upload it in full")
+        return self.upload.commit()
+    
+    def abort(self) -> None:
+        self.base.close()
+        self.upload.abort()
+
+
+class UploadSession:
+    """On-disk state of a multi-part upload.
+
+    Everything lives in dot-files in the storage root: the sparse data file,
+    a JSON description and an append-only log of received ranges. Keeping it
+    on disk lets any connection, in any worker process, add parts.
+    """
+    TTL = 24 * 60 * 60  # Abandoned sessions are removed after a day
+    
+    def __init__(self, root: str, upload_id: str):
+        if not re.fullmatch(r'[0-9a-f]{32}', upload_id or ''):
+            raise ValueError("Invalid upload id")
+        self.upload_id = upload_id
+        base = os.path.join(root, f'.multipart-{upload_id}')
+        self.data_path = base
+        self.meta_path = base + '.json'
+        self.parts_path = base + '.parts'
+        self.name = None
+        self.size = 0
+    
+    @classmethod
+    def create(cls, root: str, name: str, size: int) -> 'UploadSession':
+        session = cls(root, uuid.uuid4().hex)
+        session.name, session.size = name, size
+        fd = os.open(session.data_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            os.ftruncate(fd, size)
+        finally:
+            os.close(fd)
+        with open(session.meta_path, 'w') as fp:
+            json.dump({"name": name, "size": size}, fp)
+        return session
+    
+    def load(self) -> 'UploadSession':
+        try:
+            with open(self.meta_path) as fp:
+                meta = json.load(fp)
+        except FileNotFoundError:
+            raise ValueError(f"Unknown upload id {self.upload_id}")
+        self.name, self.size = meta['name'], meta['size']
+        return self
+    
+    def record(self, offset: int, length: int) -> None:
+        # Short O_APPEND writes are atomic, even across processes
+        fd = os.open(self.parts_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, f"{offset} {length}\n".encode())
+        finally:
+            os.close(fd)
+    
+    def missing(self) -> Optional[int]:
+        """First offset not covered by a received part, or None"""
+        ranges = []
+        if os.path.exists(self.parts_path):
+            with open(self.parts_path) as fp:
+                ranges = sorted(tuple(map(int, line.split())) for line in fp if line.strip())
+        covered = 0
+        for offset, length in ranges:
+            if offset > covered:
+                break
+            covered = max(covered, offset + length)
+        return None if covered >= self.size else covered
+    
+    def discard(self, keep_data: bool = False) -> None:
+        paths = [self.meta_path, self.parts_path] + ([] if keep_data else [self.data_path])
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+    
+    @classmethod
+    def expire(cls, root: str) -> None:
+        cutoff = time.time() - cls.TTL
+        for meta_path in glob(os.path.join(root, '.multipart-*.json')):
+            try:
+                if os.path.getmtime(meta_path) < cutoff:
+                    upload_id = os.path.basename(meta_path)[len('.multipart-'):-len('.json')]
+                    cls(root, upload_id).discard()
+            except (OSError, ValueError):
+                pass
+
+
+class PartWriter:
+    """Writes one chunk of a multi-part upload at its offset.
+
+    Positional writes let several connections fill the same session file at
+    once. The range only counts as received after ``commit``, so a chunk
+    that broke off is simply sent again.
+    """
+    def __init__(self, session: UploadSession, offset: int):
+        self.session = session
+        self.offset = offset
+        self.position = offset
+        self.fd = os.open(session.data_path, os.O_WRONLY)
+    
+    def write(self, chunk) -> None:
+        view = memoryview(chunk)
+        if self.position + len(view) > self.session.size:
+            raise ValueError("Part goes past the declared upload size")
+        written = 0
+        while written < len(view):
+            written += os.pwrite(self.fd, view[written:], self.position + written)
+        self.position += written
+    
+    def commit(self) -> Dict[str, Any]:
+        os.close(self.fd)
+        self.session.record(self.offset, self.position - self.offset)
+        return {
+            "status": "OK",
+            "upload_id": self.session.upload_id,
+            "data_offset": self.offset,
+            "data_size": self.position - self.offset
+        }
+    
+    def abort(self) -> None:
+        os.close(self.fd)
+
+
 class FileInterface:
-    def __init__(self):
+    def __init__(self, root='files', buffer_size=1024 * 1024, cache: Optional[FileCache] = None,
+                 shared: bool = False, precompress: bool = False):
+        # Resolve the storage root once instead of chdir-ing into it, so that
+        # constructing another FileInterface (one per connection) does not
+        # nest a new files/ directory inside the previous one.
+        self.root = os.path.abspath(root)
+        self.buffer_size = buffer_size
+        self.cache = cache
+        # Keep a compressed copy of files that clients fetch compressed
+        self.precompress = precompress
+        self._precompressing = set()
         self._ensure_files_directory()
-        os.chdir('files/')
+        self.blobs = BlobStore(self.root)
+        # shared: other processes write to the same root
+        self.catalog = FileCatalog(self.root, self.blobs.cached_digest, shared=shared)
     
     def _ensure_files_directory(self):
-        if not os.path.exists('files'):
-            os.makedirs('files')
-            logging.info("Created files directory")
+        if not os.path.exists(self.root):
+            os.makedirs(self.root)
+            logger.info("Created files directory")
     
     @error_handling
     def list(self, params=[]):
-        filelist = [f for f in os.listdir('.') if os.path.isfile(f)]
-        return {"status": "OK", "data": filelist}
+        """File names, or one page of file metadata.
+
+        ``params`` is ``[prefix, sort, limit, cursor]``, all optional. Without
+        any of them the answer stays the plain list of names. Otherwise
+        ``data`` holds ``{name, size, mtime, hash}`` entries whose name
+        starts with ``prefix``, ordered by ``sort`` (name, size or mtime;
+        a leading '-' reverses it), at most ``limit`` of them, and
+        ``next_cursor`` is passed back as ``cursor`` for the next page.
+        """
+        prefix, sort, limit, cursor = (list(params) + [None] * 4)[:4]
+        if not any((prefix, sort, limit, cursor)):
+            names = [entry['name'] for entry in self.catalog.page()['files']]
+            return {"status": "OK", "data": names}
+        
+        sort = sort or 'name'
+        page = self.catalog.page(
+            prefix=prefix or '',
+            sort=sort.lstrip('-'),
+            descending=sort.startswith('-'),
+            limit=int(limit) if limit is not None else None,
+            cursor=cursor,
+        )
+        return {"status": "OK", "data": page['files'], "next_cursor": page['next_cursor']}
     
     @error_handling
     def get(self, params=[]):
+        """Whole file as base64.
+
+        With a cache, the result also carries the ``cache`` entry; once that
+        entry holds the finished response, ``data_file`` is left out and
+        ``encode_legacy`` sends the cached response instead.
+
+        ``params[1]`` is an optional ETag the client already holds: when the
+        file still has it the answer is NOT_MODIFIED, without the content.
+        """
         filename = params[0] if params else ""
+        if_none_match = params[1] if len(params) > 1 else None
         if not filename:
             return None
-            
-        with open(filename, 'rb') as file:
-            binary_data = file.read()
-            
-        encoded_content = self._encode_binary_data(binary_data)
+        
+        path = self._path(filename)
+        st = os.stat(path)
+        if if_none_match and if_none_match == self._etag(path, st):
+            return self._not_modified(filename, if_none_match)
+        entry = self.cache.lookup(path, st) if self.cache else None
+        if entry is None:
+            with open(path, 'rb') as file:
+                binary_data = file.read()
+                st = os.fstat(file.fileno())
+                if self.cache:
+                    entry = self.cache.store(path, st, binary_data)
+        else:
+            binary_data = entry.data
+        file_trace.mark('disk')
+        
+        result = {"status": "OK", "data_namafile": filename, "etag": self._etag(path, st)}
+        if entry is None or entry.response is None:
+            result["data_file"] = self._encode_binary_data(binary_data)
+            file_trace.mark('encode')
+        if entry is not None:
+            result["cache"] = entry
+        return result
+    
+    def memory_needed(self, params=[]) -> int:
+        """Bytes ``get`` holds while its response is built and sent: the
+        file, its base64 text and the encoded response. Nothing extra when
+        the cache already has the finished response."""
+        try:
+            path = self._path(params[0] if params else "")
+            st = os.stat(path)
+        except (OSError, ValueError):
+            return 0
+        if self.cache:
+            entry = self.cache.peek(path, st)
+            if entry is not None and entry.response is not None:
+                return 0
+        return st.st_size * 11 // 3
+    
+    @error_handling
+    def get_stream(self, params=[]):
+        """Open a file for zero-copy sending instead of loading it into memory.
+
+        ``params`` is ``[filename, offset, length, accept]``; offset and
+        length are optional and select a byte range, so interrupted or
+        segmented downloads only fetch what they miss. The caller owns the
+        returned ``stream`` and sends ``data_size`` bytes from
+        ``data_offset``.
+
+        ``accept`` lists codecs the client can decompress. For a whole-file
+        GET whose first chunk compresses well the result names the chosen
+        ``compression`` and carries either the stream of a pre-compressed
+        copy, or ``chunks``: an iterator of compressed pieces of unknown
+        total size, which the transport sends length-prefixed.
+
+        ``params[4]`` is an optional ETag, answered with NOT_MODIFIED and
+        no body while the file still has it (see ``get``). ``params[5]`` is
+        the opposite precondition: the ETag the client's partial download
+        came from; a file that no longer has it is an ERROR carrying the
+        current ``etag``, so ranges of two versions are never mixed.
+        """
+        filename = params[0] if params else ""
+        if not filename:
+            return {"status": "ERROR", "data": "Invalid filename"}
+        offset = int(params[1]) if len(params) > 1 and params[1] is not None else 0
+        length = int(params[2]) if len(params) > 2 and params[2] is not None else None
+        accept = params[3] if len(params) > 3 else None
+        if_none_match = params[4] if len(params) > 4 else None
+        if_match = params[5] if len(params) > 5 else None
+        
+        path = self._path(filename)
+        stream = open(path, 'rb')
+        st = os.fstat(stream.fileno())
+        etag = self._etag(path, st)
+        if if_none_match and if_none_match == etag:
+            stream.close()
+            return self._not_modified(filename, etag)
+        if if_match and not self._etag_matches(path, st, if_match):
+            stream.close()
+            return {"status": "ERROR", "data": f"{filename} has changed", "etag": etag}
+        file_size = st.st_size
+        if offset < 0 or offset > file_size or (length is not None and length < 0):
+            stream.close()
+            return {"status": "ERROR", "data": f"Invalid range for {filename} ({file_size} bytes)"}
+        size = file_size - offset if length is None else min(length, file_size - offset)
+        
+        # Ranges address the original bytes, so only whole files are compressed
+        codec = None
+        if accept and offset == 0 and size == file_size:
+            codec = choose_codec(accept, os.pread(stream.fileno(), SAMPLE_SIZE, 0))
+        if codec:
+            compressed = self._open_compressed(path, stream, codec)
+            if compressed is not None:
+                stream.close()
+                return {
+                    "status": "OK",
+                    "data_namafile": filename,
+                    "compression": codec,
+                    "data_offset": 0,
+                    "data_size": os.fstat(compressed.fileno()).st_size,
+                    "file_size": file_size,
+                    "etag": etag,
+                    "stream": compressed
+                }
+            return {
+                "status": "OK",
+                "data_namafile": filename,
+                "compression": codec,
+                "chunked": True,
+                "file_size": file_size,
+                "etag": etag,
+                "chunks": compress_chunks(stream, codec, self.buffer_size)
+            }
         
         return {
-            "status": "OK", 
-            "data_namafile": filename, 
-            "data_file": encoded_content
+            "status": "OK",
+            "data_namafile": filename,
+            "data_offset": offset,
+            "data_size": size,
+            "file_size": file_size,
+            "etag": etag,
+            "stream": stream
         }
     
     @error_handling
     def upload(self, params=[]):
+        """Store base64 content under ``filename``.
+
+        ``encoded_content`` is either the whole payload (str/bytes) or a
+        readable stream with ``readinto``; streams are decoded to disk
+        through a reusable buffer of ``self.buffer_size`` bytes.
+        """
         if len(params) < 2:
             return {"status": "ERROR", "data": "Missing parameters"}
             
@@ -60,9 +648,108 @@ class FileInterface:
         if not filename or not encoded_content:
             return {"status": "ERROR", "data": "Invalid parameters"}
         
-        self._write_decoded_file(filename, encoded_content)
+        if isinstance(encoded_content, str):
+            encoded_content = encoded_content.encode()
+        compression = params[2] if len(params) > 2 else None
+        return self._store(filename, encoded_content, 'base64', compression)
+    
+    @error_handling
+    def upload_raw(self, params=[]):
+        """Same as ``upload`` but the content is the file bytes themselves"""
+        if len(params) < 2:
+            return {"status": "ERROR", "data": "Missing parameters"}
+            
+        filename, content = params[0], params[1]
         
-        return {"status": "OK", "data": f"File {filename} uploaded successfully"}
+        if not filename or content is None:
+            return {"status": "ERROR", "data": "Invalid parameters"}
+        
+        compression = params[2] if len(params) > 2 else None
+        return self._store(filename, content, 'raw', compression)
+    
+    @error_handling
+    def open_upload(self, params=[]):
+        """Start an upload whose payload the caller pushes itself.
+
+        For transports that cannot hand over a blocking stream (asyncio):
+        feed the returned ``writer`` with ``write`` and finish with
+        ``commit_upload``, or call ``writer.abort()``.
+        """
+        filename = params[0] if params else ""
+        encoding = params[1] if len(params) > 1 else 'base64'
+        compression = params[2] if len(params) > 2 else None
+        
+        if not filename:
+            return {"status": "ERROR", "data": "Invalid parameters"}
+        
+        return {
+            "status": "OK",
+            "data_namafile": filename,
+            "writer": UploadWriter(self._path(filename), encoding, self.blobs, compression)
+        }
+    
+    @error_handling
+    def commit_upload(self, params=[]):
+        result = params[0].commit()
+        self._changed(getattr(params[0], 'path', None))
+        return result
+    
+    @error_handling
+    def upload_open(self, params=[]):
+        """Start a multi-part upload of ``size`` bytes into ``filename``"""
+        filename = params[0] if params else ""
+        size = int(params[1]) if len(params) > 1 and params[1] is not None else -1
+        
+        if not filename or size < 0:
+            return {"status": "ERROR", "data": "Invalid parameters"}
+        
+        self._path(filename)  # Validate the name before allocating space
+        UploadSession.expire(self.root)
+        session = UploadSession.create(self.root, filename, size)
+        return {"status": "OK", "data_namafile": filename, "upload_id": session.upload_id}
+    
+    @error_handling
+    def open_part(self, params=[]):
+        """Like ``open_upload`` for one chunk of a multi-part upload"""
+        upload_id = params[0] if params else ""
+        offset = int(params[1]) if len(params) > 1 and params[1] is not None else -1
+        
+        session = UploadSession(self.root, upload_id).load()
+        if offset < 0 or offset > session.size:
+            return {"status": "ERROR", "data": "Invalid offset"}
+        
+        return {"status": "OK", "writer": PartWriter(session, offset)}
+    
+    @error_handling
+    def upload_part(self, params=[]):
+        """Write ``content`` (raw bytes or a stream) at ``offset``"""
+        if len(params) < 3:
+            return {"status": "ERROR", "data": "Missing parameters"}
+        
+        opened = self.open_part(params[:2])
+        if opened['status'] != 'OK':
+            return opened
+        return self._fill(opened['writer'], params[2])
+    
+    @error_handling
+    def upload_commit(self, params=[]):
+        """Move a fully received multi-part upload into place"""
+        session = UploadSession(self.root, params[0] if params else "").load()
+        missing = session.missing()
+        if missing is not None:
+            return {"status": "ERROR", "data": f"Upload incomplete, missing data at offset {missing}"}
+        
+        digest = file_digest(session.data_path, self.buffer_size)
+        self.blobs.commit(session.data_path, self._path(session.name), digest)
+        self._changed(self._path(session.name))
+        session.discard(keep_data=True)
+        return {"status": "OK", "data": f"File {session.name} uploaded successfully"}
+    
+    @error_handling
+    def upload_abort(self, params=[]):
+        session = UploadSession(self.root, params[0] if params else "").load()
+        session.discard()
+        return {"status": "OK", "data": f"Upload {session.upload_id} aborted"}
     
     @error_handling
     def delete(self, params=[]):
@@ -74,23 +761,248 @@ class FileInterface:
         if not self._file_exists(filename):
             return {"status": "ERROR", "data": "File not found"}
             
-        os.unlink(filename)
+        path = self._path(filename)
+        digest = self.blobs.digest_of(path)
+        os.unlink(path)
+        self._changed(path)
+        self.blobs.release(digest)
         
         return {"status": "OK", "data": f"File {filename} deleted successfully"}
     
+    @error_handling
+    def have(self, params=[]):
+        """Pre-upload handshake: does the store already hold this content?"""
+        digest = params[0] if params else ""
+        return {"status": "OK", "data": self.blobs.has(digest)}
+    
+    @error_handling
+    def link(self, params=[]):
+        """Store ``filename`` from content the server already has"""
+        if len(params) < 2:
+            return {"status": "ERROR", "data": "Missing parameters"}
+        
+        filename, digest = params[0], params[1]
+        path = self._path(filename)
+        try:
+            self.blobs.link_existing(digest, path)
+        except FileNotFoundError:
+            return {"status": "ERROR", "data": "Unknown content, upload the file"}
+        self._changed(path)
+        
+        return {"status": "OK", "data": f"File {filename} uploaded successfully"}
+    
+    @error_handling
+    def signatures(self, params=[]):
+        """Block signatures of the stored ``filename`` for a delta upload.
+
+        ``params`` is ``[filename, block_size]``; without a block size one
+        of about sqrt(file size) is chosen.
+        """
+        filename = params[0] if params else ""
+        block_size = params[1] if len(params) > 1 else None
+        path = self._path(filename)
+        if not os.path.isfile(path):
+            return {"status": "ERROR", "data": "File not found"}
+        with open(path, 'rb', buffering=self.buffer_size) as fp:
+            size = os.fstat(fp.fileno()).st_size
+            block_size = check_block_size(block_size) if block_size else block_size_for(size)
+            data = signatures(fp, block_size)
+        file_trace.mark('disk')
+        return {
+            "status": "OK",
+            "data_namafile": filename,
+            "data": {"size": size, "block_size": block_size,
+                     "signatures": self._encode_binary_data(data)}
+        }
+    
+    @error_handling
+    def open_delta(self, params=[]):
+        """Like ``open_upload``, for a delta against the stored file"""
+        filename = params[0] if params else ""
+        digest = params[1] if len(params) > 1 else None
+        if not filename or not digest:
+            return {"status": "ERROR", "data": "Invalid parameters"}
+        if not self._file_exists(filename):
+            return {"status": "ERROR", "data": "File not found"}
+        return {
+            "status": "OK",
+            "data_namafile": filename,
+            "writer": DeltaWriter(self._path(filename), digest, self.blobs, self.buffer_size)
+        }
+    
+    @error_handling
+    def upload_delta(self, params=[]):
+        """Store ``filename`` rebuilt from its current version and a delta
+        (bytes or a stream) whose result must have sha256 ``digest``"""
+        if len(params) < 3:
+            return {"status": "ERROR", "data": "Missing parameters"}
+        filename, content, digest = params[0], params[1], params[2]
+        opened = self.open_delta([filename, digest])
+        if 'writer' not in opened:
+            return opened
+        return self._fill(opened['writer'], content)
+    
+    def get_many(self, names: List[str]):
+        """``get_stream`` for each name, one at a time: yields (name, result)"""
+        for name in names:
+            yield name, self.get_stream([name])
+    
+    def delete_many(self, names: List[str]):
+        for name in names:
+            yield name, self.delete([name])
+    
+    def upload_many(self, records):
+        """Store (name, stream, compression) records in turn: yields (name, result)"""
+        for name, stream, compression in records:
+            yield name, self.upload_raw([name, stream, compression])
+    
+    @error_handling
+    def archive(self, params=[]):
+        """Tar of the files in ``names``, or of every file starting with
+        ``prefix`` (all files without either), built while it is sent.
+
+        ``params`` is ``[names, prefix, compression]``; compression may be
+        'gzip'. The result carries ``chunks`` of the archive, of unknown
+        total length, plus the number and total size of the files.
+        """
+        names, prefix, compression = (list(params) + [None] * 3)[:3]
+        compression = check_archive_compression(compression)
+        if names:
+            entries = [(name, self._path(name)) for name in names]
+            missing = [name for name, path in entries if not os.path.isfile(path)]
+            if missing:
+                return {"status": "ERROR", "data": f"File not found: {', '.join(missing)}"}
+            total_size = sum(os.path.getsize(path) for _, path in entries)
+        else:
+            files = self.catalog.page(prefix=prefix or '')['files']
+            entries = [(entry['name'], self._path(entry['name'])) for entry in files]
+            total_size = sum(entry['size'] for entry in files)
+        return {
+            "status": "OK",
+            "format": "tar.gz" if compression else "tar",
+            "count": len(entries),
+            "total_size": total_size,
+            "chunked": True,
+            "chunks": archive_chunks(entries, compression, self.buffer_size)
+        }
+    
+    def adopt_files(self) -> None:
+        """Move files placed in the storage root by hand into the blob store"""
+        for entry in os.scandir(self.root):
+            if entry.name.startswith('.') or not entry.is_file(follow_symlinks=False):
+                continue
+            try:
+                self.blobs.adopt(entry.path)
+            except OSError as e:
+                logger.error(f"Error adopting {entry.name}: {str(e)}")
+    
     def _encode_binary_data(self, data: bytes) -> str:
         return base64.b64encode(data).decode('utf-8')
     
-    def _decode_base64_data(self, encoded_data: str) -> bytes:
-        return base64.b64decode(encoded_data)
+    def _store(self, filename: str, content, encoding: str, compression: Optional[str] = None) -> Dict[str, Any]:
+        writer = UploadWriter(self._path(filename), encoding, self.blobs, compression)
+        return self._fill(writer, content)
+    
+    def _fill(self, writer, content) -> Dict[str, Any]:
+        try:
+            if hasattr(content, 'readinto'):
+                self._copy_stream(content, writer)
+            else:
+                writer.write(content)
+        except BaseException:
+            writer.abort()
+            raise
+        return self.commit_upload([writer])
+    
+    def _copy_stream(self, stream, writer) -> None:
+        if hasattr(stream, 'chunks'):
+            # The stream brings its own (pooled) buffer
+            chunks = stream.chunks()
+            try:
+                for chunk in chunks:
+                    writer.write(chunk)
+            finally:
+                chunks.close()
+            return
+        buffer = bytearray(self.buffer_size)
+        view = memoryview(buffer)
+        while True:
+            nbytes = stream.readinto(view)
+            if not nbytes:
+                break
+            writer.write(view[:nbytes])
+    
+    def _open_compressed(self, path: str, stream, codec: str):
+        """Stream of the stored compressed copy of ``path``, if there is one.
+
+        Without one and with ``precompress`` set, a background thread
+        creates it, so only the first compressed GETs pay for compression.
+        """
+        digest = self.blobs.cached_digest(path, os.fstat(stream.fileno()))
+        if not digest:
+            return None
+        variant = self.blobs.variant_path(digest, codec)
+        try:
+            return open(variant, 'rb')
+        except FileNotFoundError:
+            pass
+        if self.precompress:
+            with self.blobs.lock:
+                if variant in self._precompressing:
+                    return None
+                self._precompressing.add(variant)
+            threading.Thread(target=self._write_compressed, args=(digest, codec, variant),
+                             daemon=True).start()
+        return None
     
-    def _write_decoded_file(self, filename: str, encoded_content: str) -> None:
-        binary_data = self._decode_base64_data(encoded_content)
-        with open(filename, 'wb') as file:
-            file.write(binary_data)
+    def _write_compressed(self, digest: str, codec: str, variant: str) -> None:
+        temp_path = os.path.join(self.blobs.dir, f'.{digest}.{codec}-{uuid.uuid4().hex}')
+        try:
+            with open(temp_path, 'wb') as out:
+                with open(self.blobs.path(digest), 'rb') as blob:
+                    for piece in compress_chunks(blob, codec, self.buffer_size):
+                        out.write(piece)
+            os.replace(temp_path, variant)
+            if not self.blobs.has(digest):
+                os.unlink(variant)  # The blob was released meanwhile
+        except OSError as e:
+            logger.error(f"Error compressing {digest} with {codec}: {str(e)}")
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+        finally:
+            with self.blobs.lock:
+                self._precompressing.discard(variant)
+    
+    def _etag(self, path: str, st: os.stat_result) -> str:
+        # The content hash when the blob store knows it, so re-uploading the
+        # same content keeps the tag; otherwise size and modification time
+        return self.blobs.cached_digest(path, st) or f"{st.st_size}-{st.st_mtime_ns}"
+    
+    def _etag_matches(self, path: str, st: os.stat_result, etag: str) -> bool:
+        # Either form identifies the content: the tag may have switched to
+        # the hash once the blob store learnt it, without the file changing
+        return etag in (f"{st.st_size}-{st.st_mtime_ns}", self.blobs.cached_digest(path, st))
+    
+    def _not_modified(self, filename: str, etag: str) -> Dict[str, Any]:
+        return {"status": "NOT_MODIFIED", "data_namafile": filename, "etag": etag}
+    
+    def _changed(self, path: Optional[str]) -> None:
+        # A name was replaced or removed: drop its cached content and
+        # update its catalog entry
+        if not path:
+            return
+        if self.cache:
+            self.cache.invalidate(path)
+        self.catalog.update(os.path.basename(path))
     
     def _file_exists(self, filename: str) -> bool:
-        return os.path.isfile(filename)
+        return os.path.isfile(self._path(filename))
+    
+    def _path(self, filename: str) -> str:
+        # Names starting with a dot are reserved for in-flight uploads
+        if not filename or os.sep in filename or filename.startswith('.'):
+            raise ValueError(f"Invalid filename: {filename}")
+        return os.path.join(self.root, filename)
 
 
 if __name__=='__main__':
@@ -0,0 +1,120 @@
+import atexit
+import itertools
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+"""
+* Logging server lewat antrean: logger hanya memasukkan record ke
+  queue (QueueHandler), dan satu thread latar (QueueListener) yang
+  menulisnya ke stdout. Thread yang melayani client tidak lagi saling
+  menunggu di write() ke stdout.
+
+* Level bisa diatur per subsystem (nama logger, lihat SUBSYSTEMS), mis.
+  --log-level WARNING --log-level FileServer=INFO.
+
+* Record di bawah WARNING bisa di-sample (--log-sample FileProtocol=0.01
+  menyimpan kira-kira 1 dari 100) atau dibatasi per detik
+  (--log-rate FileServer=50). WARNING ke atas selalu ditulis.
+
+* Setiap proses (termasuk worker prefork) memasang listener-nya sendiri
+  dengan setup(); record yang masih di queue ditulis saat proses keluar.
+"""
+
+SUBSYSTEMS = ('FileServer', 'FileProtocol', 'FileInterface')
+
+FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class SampleFilter(logging.Filter):
+    """Keeps a ``fraction`` of records below WARNING, at most ``rate`` per second"""
+    def __init__(self, fraction: float = 1.0, rate: float = 0):
+        super().__init__()
+        self.every = max(1, round(1 / fraction)) if fraction > 0 else 0
+        self.counter = itertools.count()
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.window = 0
+        self.used = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        if not self.every or next(self.counter) % self.every:
+            return False
+        if self.rate:
+            second = int(time.monotonic())
+            with self.lock:
+                if second != self.window:
+                    self.window, self.used = second, 0
+                if self.used >= self.rate:
+                    return False
+                self.used += 1
+        return True
+
+
+def parse_settings(values: Optional[List[str]]) -> Dict[str, str]:
+    """['WARNING', 'FileServer=INFO'] -> {'': 'WARNING', 'FileServer': 'INFO'}
+
+    A value without a name ('') applies to every subsystem.
+    """
+    settings = {}
+    for value in values or []:
+        name, _, setting = value.rpartition('=')
+        settings[name] = setting
+    return settings
+
+
+def setup(levels: Optional[Dict[str, str]] = None, sample: Optional[Dict[str, str]] = None,
+          rate: Optional[Dict[str, str]] = None, stream=None) -> None:
+    """Route all logging of this process through one background writer.
+
+    ``levels``, ``sample`` and ``rate`` map logger names ('' for all) to a
+    level name, a kept fraction and records per second. Calling it again
+    replaces the previous configuration.
+    """
+    global _listener
+    stop()
+    levels = levels or {}
+    sample = sample or {}
+    rate = rate or {}
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter(FORMAT, DATE_FORMAT))
+    records = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, handler)
+    _listener.start()
+
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(logging.handlers.QueueHandler(records))
+    root.setLevel(levels.get('', logging.INFO))
+
+    for name in (set(SUBSYSTEMS) | set(levels) | set(sample) | set(rate)) - {''}:
+        logger = logging.getLogger(name)
+        logger.setLevel(levels.get(name, logging.NOTSET))
+        for old in [f for f in logger.filters if isinstance(f, SampleFilter)]:
+            logger.removeFilter(old)
+        fraction = float(sample.get(name, sample.get('', 1.0)))
+        per_second = float(rate.get(name, rate.get('', 0)))
+        if fraction < 1.0 or per_second:
+            logger.addFilter(SampleFilter(fraction, per_second))
+
+
+def stop() -> None:
+    """Write out queued records and stop the background writer"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop)
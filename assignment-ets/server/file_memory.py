@@ -0,0 +1,179 @@
+import asyncio
+import socket
+import struct
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, List, Optional
+
+"""
+* Pengaturan memori untuk transfer file.
+
+* MemoryBudget membatasi total byte buffer transfer yang dipakai semua
+  koneksi dalam satu proses. Transfer baru yang tidak muat menunggu
+  sampai ada yang selesai, daripada RSS server terus membesar.
+
+* BufferPool meminjamkan bytearray yang dipakai ulang (recv_into),
+  dihitung terhadap MemoryBudget.
+
+* Ukuran buffer per koneksi mengikuti bandwidth-delay product (BDP) yang
+  diukur kernel (TCP_INFO), dibatasi antara MIN_BUFFER dan batas atas
+  dari konfigurasi. Buffer socket kernel dibiarkan di-autotune.
+"""
+
+MIN_BUFFER = 64 * 1024
+
+# Offsets in Linux struct tcp_info
+_TCPI_SND_MSS = 16
+_TCPI_RTT = 68
+_TCPI_SND_CWND = 80
+_TCPI_RCV_SPACE = 96
+_TCPI_DELIVERY_RATE = 160
+_TCP_INFO_SIZE = 232
+
+
+def measure_bdp(sock: socket.socket) -> Optional[int]:
+    """Bandwidth-delay product of a TCP connection in bytes, if measurable.
+
+    Uses RTT x delivery rate when the kernel has a rate sample, otherwise
+    the congestion window; the receive-side window estimate covers
+    connections that mostly receive.
+    """
+    if not hasattr(socket, 'TCP_INFO'):
+        return None
+    try:
+        info = sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO, _TCP_INFO_SIZE)
+    except OSError:
+        return None
+    if len(info) < _TCPI_RCV_SPACE + 4:
+        return None
+    snd_mss, = struct.unpack_from('I', info, _TCPI_SND_MSS)
+    rtt_us, = struct.unpack_from('I', info, _TCPI_RTT)
+    snd_cwnd, = struct.unpack_from('I', info, _TCPI_SND_CWND)
+    rcv_space, = struct.unpack_from('I', info, _TCPI_RCV_SPACE)
+    delivery_rate = 0
+    if len(info) >= _TCPI_DELIVERY_RATE + 8:
+        delivery_rate, = struct.unpack_from('Q', info, _TCPI_DELIVERY_RATE)
+    if delivery_rate and rtt_us:
+        bdp = rtt_us * delivery_rate // 1000000
+    else:
+        bdp = snd_cwnd * snd_mss
+    return max(bdp, rcv_space)
+
+
+def buffer_size_for(sock: socket.socket, maximum: int) -> int:
+    """Transfer buffer for ``sock``: twice the BDP, a power of two, clamped"""
+    bdp = measure_bdp(sock)
+    if not bdp:
+        return maximum
+    size = MIN_BUFFER
+    while size < 2 * bdp and size < maximum:
+        size *= 2
+    return max(MIN_BUFFER, min(size, maximum))
+
+
+class MemoryBudget:
+    """Bytes of transfer memory shared by all connections of a process.
+
+    A request larger than the whole budget is trimmed to it, so it still
+    runs, alone.
+    """
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self.waits = 0
+        self.condition = threading.Condition()
+
+    def try_acquire(self, nbytes: int) -> bool:
+        nbytes = min(nbytes, self.limit)
+        with self.condition:
+            if self.used + nbytes > self.limit:
+                return False
+            self.used += nbytes
+            return True
+
+    def acquire(self, nbytes: int) -> None:
+        nbytes = min(nbytes, self.limit)
+        with self.condition:
+            if self.used + nbytes > self.limit:
+                self.waits += 1
+                self.condition.wait_for(lambda: self.used + nbytes <= self.limit)
+            self.used += nbytes
+
+    def release(self, nbytes: int) -> None:
+        nbytes = min(nbytes, self.limit)
+        with self.condition:
+            self.used -= nbytes
+            self.condition.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes: int):
+        if not nbytes:
+            yield
+            return
+        self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
+
+    @asynccontextmanager
+    async def reserve_async(self, nbytes: int):
+        """``reserve`` for the event loop: waits without blocking it"""
+        if not nbytes:
+            yield
+            return
+        if not self.try_acquire(nbytes):
+            with self.condition:
+                self.waits += 1
+            delay = 0.001
+            while not self.try_acquire(nbytes):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.05)
+        try:
+            yield
+        finally:
+            self.release(nbytes)
+
+    def stats(self) -> Dict[str, int]:
+        with self.condition:
+            return {"limit": self.limit, "used": self.used, "waits": self.waits}
+
+
+class BufferPool:
+    """Reusable bytearrays whose use is accounted against a MemoryBudget.
+
+    Returned buffers are kept for reuse up to ``max_idle`` bytes in total;
+    idle buffers are not counted in the budget.
+    """
+    def __init__(self, budget: MemoryBudget, max_idle: Optional[int] = None):
+        self.budget = budget
+        self.max_idle = budget.limit // 4 if max_idle is None else max_idle
+        self.idle: Dict[int, List[bytearray]] = {}
+        self.idle_bytes = 0
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def buffer(self, size: int):
+        self.budget.acquire(size)
+        try:
+            buffer = self._take(size)
+            try:
+                yield buffer
+            finally:
+                self._give(buffer)
+        finally:
+            self.budget.release(size)
+
+    def _take(self, size: int) -> bytearray:
+        with self.lock:
+            free = self.idle.get(size)
+            if free:
+                self.idle_bytes -= size
+                return free.pop()
+        return bytearray(size)
+
+    def _give(self, buffer: bytearray) -> None:
+        with self.lock:
+            if self.idle_bytes + len(buffer) <= self.max_idle:
+                self.idle.setdefault(len(buffer), []).append(buffer)
+                self.idle_bytes += len(buffer)
@@ -0,0 +1,117 @@
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, List
+
+from file_stats import BUCKETS
+
+"""
+* Endpoint /metrics dalam format teks Prometheus, di port tersendiri
+  (default hanya di 127.0.0.1), untuk monitoring yang men-scrape HTTP.
+
+* Isinya diambil dari ServerStats.snapshot(), jadi pada mode prefork
+  angka yang diekspor sudah dijumlahkan dari semua proses worker.
+
+* HTTP server berjalan di satu daemon thread miliknya sendiri, terpisah
+  dari worker pool maupun event loop, sehingga scrape tidak pernah
+  berebut worker dengan request client.
+"""
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _metric(lines: List[str], name: str, kind: str, help_text: str, samples) -> None:
+    """Append one metric family; ``samples`` are (suffix, labels, value)"""
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for suffix, labels, value in samples:
+        label_text = ','.join(f'{key}="{_label(val)}"' for key, val in labels.items())
+        lines.append(f"{name}{suffix}{{{label_text}}} {_number(value)}" if label_text
+                     else f"{name}{suffix} {_number(value)}")
+
+
+def render(snapshot: Dict, prefix: str = 'file_server') -> str:
+    """ServerStats snapshot -> Prometheus text exposition"""
+    commands = snapshot['commands']
+    lines: List[str] = []
+
+    _metric(lines, f'{prefix}_requests_total', 'counter', 'Requests served, by command',
+            [('', {'command': c}, v['count']) for c, v in commands.items()])
+    _metric(lines, f'{prefix}_request_errors_total', 'counter', 'Requests answered with an error',
+            [('', {'command': c}, v['errors']) for c, v in commands.items()])
+
+    samples = []
+    for command, values in commands.items():
+        cumulative = 0
+        for bound, count in zip(BUCKETS, values['buckets']):
+            cumulative += count
+            samples.append(('_bucket', {'command': command, 'le': bound}, cumulative))
+        samples.append(('_bucket', {'command': command, 'le': '+Inf'}, values['count']))
+        samples.append(('_sum', {'command': command}, values['seconds']))
+        samples.append(('_count', {'command': command}, values['count']))
+    _metric(lines, f'{prefix}_request_duration_seconds', 'histogram',
+            'Time from reading a request to sending its response', samples)
+
+    _metric(lines, f'{prefix}_transfer_bytes_total', 'counter',
+            'Request and response bytes, by command and direction',
+            [('', {'command': c, 'direction': d}, v[f'bytes_{d}'])
+             for c, v in commands.items() for d in ('in', 'out')])
+
+    connections = snapshot['connections']
+    queue = snapshot['queue']
+    _metric(lines, f'{prefix}_open_connections', 'gauge', 'Connections being served',
+            [('', {}, connections['active'])])
+    _metric(lines, f'{prefix}_connections_total', 'counter', 'Connections served',
+            [('', {}, connections['total'])])
+    _metric(lines, f'{prefix}_queue_depth', 'gauge', 'Admitted work waiting for a worker',
+            [('', {}, queue['depth'])])
+    _metric(lines, f'{prefix}_workers_busy', 'gauge', 'Workers serving a request or connection',
+            [('', {}, queue['running'])])
+    _metric(lines, f'{prefix}_workers', 'gauge', 'Workers over all processes',
+            [('', {}, queue['workers'])])
+    _metric(lines, f'{prefix}_rejected_total', 'counter', 'Work turned away with BUSY',
+            [('', {}, queue['rejected'])])
+    _metric(lines, f'{prefix}_queue_wait_seconds', 'summary', 'Time admitted work waited for a worker',
+            [('_sum', {}, queue['wait_seconds']), ('_count', {}, queue['started'])])
+    _metric(lines, f'{prefix}_worker_busy_seconds_total', 'counter', 'Time workers spent busy',
+            [('', {}, snapshot['busy_seconds'])])
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsServer(threading.Thread):
+    """Serves ``GET /metrics`` for a ServerStats on a daemon thread"""
+    def __init__(self, stats, port: int, host: str = '127.0.0.1'):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        stats_source = stats
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = render(stats_source.snapshot()).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood the log
+
+        self.httpd = HTTPServer((host, port), Handler)
+
+    def run(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,156 @@
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import List, Optional
+
+"""
+* Profiling per proses server, diaktifkan dengan --profile.
+
+* "sample": sebuah thread mengambil stack semua thread setiap
+  SAMPLE_INTERVAL detik (sys._current_frames) dan menghitung stack yang
+  sama. Overhead kecil dan ikut menunjukkan thread yang sedang menunggu
+  socket atau disk. Hasilnya format "folded" (satu stack per baris +
+  jumlah sampel) yang bisa langsung dibuat flamegraph.
+
+* "cprofile": cProfile di setiap thread worker (dan thread event loop).
+  Lebih detail tetapi lebih lambat. Hasilnya file .prof untuk pstats.
+  Sejak Python 3.12 hanya satu cProfile boleh aktif per proses, jadi
+  yang diprofile hanya thread pertama yang memulainya.
+
+* Setiap proses menulis file sendiri (profile-<pid>.folded / .prof);
+  file dari beberapa worker prefork digabung dengan:
+
+      python file_profile.py merge <output> <file>...
+"""
+
+SAMPLE_INTERVAL = 0.01
+
+_lock = threading.Lock()
+_mode: Optional[str] = None
+_directory = 'profiles'
+_samples: Counter = Counter()
+_profiles: List[cProfile.Profile] = []
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _sample_loop() -> None:
+    me = threading.get_ident()
+    while True:
+        time.sleep(SAMPLE_INTERVAL)
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stacks.append(';'.join(reversed(stack)))
+        with _lock:
+            _samples.update(stacks)
+
+
+def start(mode: Optional[str], directory: str = 'profiles') -> None:
+    """Start profiling this process; ``mode`` is 'sample', 'cprofile' or None"""
+    global _mode, _directory
+    _mode, _directory = mode, directory
+    if mode == 'sample':
+        threading.Thread(target=_sample_loop, daemon=True).start()
+
+
+def thread_started() -> None:
+    """Pool initializer: profile the calling thread in cprofile mode.
+
+    On Python 3.12+ a second active cProfile raises ValueError, so only
+    the first thread that gets here is profiled; the others run without.
+    """
+    if _mode != 'cprofile':
+        return
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        return  # Python 3.12+: only one cProfile may be active per process
+    with _lock:
+        _profiles.append(profile)
+
+
+class _Snapshot:
+    """Stats of a profile taken while it keeps running, in the form
+    pstats.Stats loads. Stats(profile) itself would call create_stats(),
+    which disables the profile from this thread and drops the calls its
+    own thread still has in progress."""
+    def __init__(self, profile: cProfile.Profile):
+        profile.snapshot_stats()
+        self.stats = profile.stats
+
+    def create_stats(self) -> None:
+        pass
+
+
+def write() -> Optional[str]:
+    """Write what was collected so far to this process's profile file.
+
+    May run on any thread (e.g. the SIGUSR1 handler): cprofile profiles
+    are snapshotted without being disabled, so later dumps keep adding up.
+    """
+    if _mode is None:
+        return None
+    os.makedirs(_directory, exist_ok=True)
+    if _mode == 'sample':
+        path = os.path.join(_directory, f"profile-{os.getpid()}.folded")
+        with _lock:
+            samples = dict(_samples)
+        with open(path + '.tmp', 'w') as fp:
+            for stack, count in samples.items():
+                fp.write(f"{stack} {count}\n")
+        os.replace(path + '.tmp', path)
+        return path
+
+    path = os.path.join(_directory, f"profile-{os.getpid()}.prof")
+    with _lock:
+        snapshots = [_Snapshot(profile) for profile in _profiles]
+    stats = None
+    for snapshot in snapshots:
+        if not snapshot.stats:
+            continue
+        if stats is None:
+            stats = pstats.Stats(snapshot)
+        else:
+            stats.add(snapshot)
+    if stats is None:
+        return None
+    stats.dump_stats(path)
+    return path
+
+
+def merge(output: str, paths: List[str]) -> None:
+    """Combine profile files of several processes into ``output``"""
+    if output.endswith('.folded'):
+        total: Counter = Counter()
+        for path in paths:
+            with open(path) as fp:
+                for line in fp:
+                    stack, _, count = line.rstrip('\n').rpartition(' ')
+                    if stack:
+                        total[stack] += int(count)
+        with open(output, 'w') as fp:
+            for stack, count in total.most_common():
+                fp.write(f"{stack} {count}\n")
+    else:
+        pstats.Stats(*paths).dump_stats(output)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4 or sys.argv[1] != 'merge':
+        print("usage: python file_profile.py merge <output.folded|output.prof> <file>...")
+        sys.exit(1)
+    merge(sys.argv[2], sys.argv[3:])
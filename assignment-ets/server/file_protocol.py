@@ -1,10 +1,12 @@
 import json
 import logging
 import shlex
-import sys
 from typing import Dict, Any, Callable, List
 
 from file_interface import FileInterface
+from file_cache import FileCache
+from file_stats import ServerStats
+from file_framing import LENGTH_PREFIX, decode_meta
 
 """
 * class FileProtocol bertugas untuk memproses 
@@ -18,52 +20,205 @@ pada akhirnya akan diproses dalam bentuk string
 string
 """
 
+# Output goes through file_logging's queue; level and sampling per subsystem
 logger = logging.getLogger("FileProtocol")
-handler = logging.StreamHandler(sys.stdout)
-handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-logger.addHandler(handler)
-logger.setLevel(logging.INFO)
+
+MAX_RECORD_META = 64 * 1024  # Longest meta of one MUPLOAD record
+
+
+def read_exact(stream, length: int, allow_end: bool = False):
+    """``length`` bytes from a ``readinto`` stream; None at a clean end if allowed"""
+    data = bytearray(length)
+    view = memoryview(data)
+    received = 0
+    while received < length:
+        nbytes = stream.readinto(view[received:])
+        if not nbytes:
+            if allow_end and received == 0:
+                return None
+            raise ValueError("Batch upload ended inside a record")
+        received += nbytes
+    return data
+
+
+class RecordReader:
+    """The payload of one MUPLOAD record, read through the batch's buffer"""
+    def __init__(self, stream, length: int, buffer: memoryview):
+        self.stream = stream
+        self.remaining = length
+        self.buffer = buffer
+
+    def readinto(self, buffer):
+        if self.remaining == 0:
+            return 0
+        nbytes = self.stream.readinto(memoryview(buffer)[:self.remaining])
+        if not nbytes:
+            raise ValueError("Batch upload ended inside a record")
+        self.remaining -= nbytes
+        return nbytes
+
+    def chunks(self):
+        while self.remaining:
+            nbytes = self.readinto(self.buffer)
+            yield self.buffer[:nbytes]
+
+    def drain(self):
+        for _ in self.chunks():
+            pass
 
 
 class FileProtocol:
-    def __init__(self):
-        self.file = FileInterface()
+    def __init__(self, buffer_size=1024 * 1024, cache_size=0, shared=False, precompress=False,
+                 stats=None):
+        # cache_size: memory budget in bytes for hot GETs, 0 disables it
+        # shared: other processes serve the same storage directory
+        # precompress: keep compressed copies of files fetched compressed
+        # stats: ServerStats filled by the transport and reported by STATS
+        self.stats = stats or ServerStats()
+        cache = FileCache(cache_size) if cache_size > 0 else None
+        self.file = FileInterface(buffer_size=buffer_size, cache=cache, shared=shared,
+                                  precompress=precompress)
         self.command_handlers = {
             'list': self._handle_list,
             'get': self._handle_get,
+            'getraw': self._handle_getraw,
             'upload': self._handle_upload,
+            'uploadraw': self._handle_uploadraw,
             'delete': self._handle_delete,
+            'uploadopen': self._handle_uploadopen,
+            'uploadpart': self._handle_uploadpart,
+            'uploadcommit': self._handle_uploadcommit,
+            'uploadabort': self._handle_uploadabort,
+            'have': self._handle_have,
+            'link': self._handle_link,
+            'stats': self._handle_stats,
+            'mget': self._handle_mget,
+            'mdelete': self._handle_mdelete,
+            'mupload': self._handle_mupload,
+            'archive': self._handle_archive,
+            'sigs': self._handle_sigs,
+            'delta': self._handle_delta,
         }
+        # Commands answered with a length-prefixed header and raw body
+        # instead of JSON terminated by CRLFCRLF
+        self.raw_commands = {'getraw', 'mget', 'mdelete', 'mupload', 'archive'}
     
-    def proses_string(self, command='', filename='', content=None):
-        logger.info(f"Processing command: '{command}' with filename: '{filename}'")
+    def proses_string(self, command='', filename='', content=None, options=None):
+        logger.info("Processing command: %r with filename: %r", command, filename)
         
         try:
             command = command.lower().strip()
             
             if command in self.command_handlers:
-                return self.command_handlers[command](filename, content)
+                return self.command_handlers[command](filename, content, options or {})
             else:
-                logger.warning(f"Unknown command received: {command}")
+                logger.warning("Unknown command received: %s", command)
                 return {"status": "ERROR", "data": "Unknown command"}
                 
         except Exception as e:
-            logger.error(f"Error processing command: {str(e)}")
+            logger.error("Error processing command: %s", str(e))
             return {"status": "ERROR", "data": str(e)}
     
-    def _handle_list(self, filename=None, content=None):
-        logger.info("Executing LIST command")
-        return self.file.list()
+    def memory_needed(self, command='', filename='', options=None):
+        """Bytes a request keeps in memory while it is answered.
+
+        Only the legacy GET builds its whole response in memory; uploads
+        and raw downloads go through fixed-size buffers or sendfile.
+        """
+        if command.lower().strip() == 'get' and filename:
+            return self.file.memory_needed([filename])
+        return 0
+    
+    def open_upload(self, command='', filename='', options=None):
+        """Start an upload whose payload the transport pushes itself.
+
+        Used by the asyncio engine, which cannot hand a blocking stream to
+        proses_string. Returns a result holding a ``writer`` to feed and
+        pass to ``self.file.commit_upload``, or the same error result that
+        proses_string would have produced.
+        """
+        options = options or {}
+        command = command.lower().strip()
+        if command == 'uploadpart':
+            return self.file.open_part([options.get('upload_id'), options.get('offset')])
+        if command == 'delta' and filename:
+            return self.file.open_delta([filename, options.get('digest')])
+        if not filename or command not in ('upload', 'uploadraw'):
+            return self.proses_string(command, filename, None, options)
+        encoding = 'raw' if command == 'uploadraw' else 'base64'
+        return self.file.open_upload([filename, encoding, options.get('compression')])
+    
+    def batch_result(self, items, count=None):
+        """Result of a batch command: the (name, result) ``items`` follow as
+        chunks, each item's JSON and, for MGET, the file body after it"""
+        result = {"status": "OK", "chunked": True, "chunks": self._item_chunks(items)}
+        if count is not None:
+            result["count"] = count
+        return result
+    
+    def _item_chunks(self, items):
+        buffer_size = self.file.buffer_size
+        for name, item in items:
+            stream = item.pop('stream', None)
+            item['name'] = name
+            if stream is None:
+                yield json.dumps(item).encode()
+                continue
+            # Opened before the item's JSON is sent, so closed even if the
+            # body is abandoned right there
+            with stream:
+                yield json.dumps(item).encode()
+                remaining = item['data_size']
+                while remaining:
+                    piece = stream.read(min(remaining, buffer_size))
+                    if not piece:
+                        raise RuntimeError(f"{name} shrank while it was sent")
+                    remaining -= len(piece)
+                    yield piece
     
-    def _handle_get(self, filename='', content=None):
+    def upload_records(self, content):
+        """Split a MUPLOAD body into (name, payload stream, compression)"""
+        buffer = memoryview(bytearray(self.file.buffer_size))
+        while True:
+            prefix = read_exact(content, LENGTH_PREFIX.size, allow_end=True)
+            if prefix is None:
+                return
+            meta_length = LENGTH_PREFIX.unpack(prefix)[0]
+            if meta_length > MAX_RECORD_META:
+                raise ValueError(f"Record meta of {meta_length} bytes")
+            meta = decode_meta(read_exact(content, meta_length))
+            record = RecordReader(content, int(meta.get('size', 0)), buffer)
+            yield meta.get('name', ''), record, meta.get('compression')
+            record.drain()  # Whatever a rejected upload left unread
+    
+    def _batch_names(self, filename, options):
+        return options.get('names') or ([filename] if filename else [])
+    
+    def _handle_list(self, filename=None, content=None, options=None):
+        # The filename slot of LIST is a name prefix
+        logger.info("Executing LIST command with prefix: %r", filename or '')
+        return self.file.list([filename, options.get('sort'), options.get('limit'),
+                               options.get('cursor')])
+    
+    def _handle_get(self, filename='', content=None, options=None):
         if not filename:
             logger.warning("GET command missing filename")
             return {"status": "ERROR", "data": "Filename required for GET command"}
             
-        logger.info(f"Executing GET command for file: {filename}")
-        return self.file.get([filename])
+        logger.info("Executing GET command for file: %s", filename)
+        return self.file.get([filename, options.get('if_none_match')])
     
-    def _handle_upload(self, filename='', content=None):
+    def _handle_getraw(self, filename='', content=None, options=None):
+        if not filename:
+            logger.warning("GETRAW command missing filename")
+            return {"status": "ERROR", "data": "Filename required for GETRAW command"}
+            
+        logger.info("Executing GETRAW command for file: %s", filename)
+        return self.file.get_stream([filename, options.get('offset'), options.get('length'),
+                                     options.get('accept'), options.get('if_none_match'),
+                                     options.get('if_match')])
+    
+    def _handle_upload(self, filename='', content=None, options=None):
         if not filename:
             logger.warning("UPLOAD command missing filename")
             return {"status": "ERROR", "data": "Filename required for UPLOAD command"}
@@ -72,16 +227,116 @@ class FileProtocol:
             logger.warning("UPLOAD command missing content")
             return {"status": "ERROR", "data": "Content required for UPLOAD command"}
             
-        logger.info(f"Executing UPLOAD command for file: {filename}")
-        return self.file.upload([filename, content])
+        logger.info("Executing UPLOAD command for file: %s", filename)
+        return self.file.upload([filename, content, options.get('compression')])
     
-    def _handle_delete(self, filename='', content=None):
+    def _handle_uploadraw(self, filename='', content=None, options=None):
+        if not filename:
+            logger.warning("UPLOADRAW command missing filename")
+            return {"status": "ERROR", "data": "Filename required for UPLOADRAW command"}
+            
+        if content is None:
+            logger.warning("UPLOADRAW command missing content")
+            return {"status": "ERROR", "data": "Content required for UPLOADRAW command"}
+            
+        logger.info("Executing UPLOADRAW command for file: %s", filename)
+        return self.file.upload_raw([filename, content, options.get('compression')])
+    
+    def _handle_delete(self, filename='', content=None, options=None):
         if not filename:
             logger.warning("DELETE command missing filename")
             return {"status": "ERROR", "data": "Filename required for DELETE command"}
             
-        logger.info(f"Executing DELETE command for file: {filename}")
+        logger.info("Executing DELETE command for file: %s", filename)
         return self.file.delete([filename])
+    
+    def _handle_uploadopen(self, filename='', content=None, options=None):
+        if not filename:
+            logger.warning("UPLOADOPEN command missing filename")
+            return {"status": "ERROR", "data": "Filename required for UPLOADOPEN command"}
+            
+        logger.info("Opening multi-part upload for file: %s", filename)
+        return self.file.upload_open([filename, options.get('size')])
+    
+    def _handle_uploadpart(self, filename='', content=None, options=None):
+        if content is None:
+            logger.warning("UPLOADPART command missing content")
+            return {"status": "ERROR", "data": "Content required for UPLOADPART command"}
+            
+        return self.file.upload_part([options.get('upload_id'), options.get('offset'), content])
+    
+    def _handle_uploadcommit(self, filename='', content=None, options=None):
+        logger.info("Committing multi-part upload %s", options.get('upload_id'))
+        return self.file.upload_commit([options.get('upload_id')])
+    
+    def _handle_uploadabort(self, filename='', content=None, options=None):
+        logger.info("Aborting multi-part upload %s", options.get('upload_id'))
+        return self.file.upload_abort([options.get('upload_id')])
+    
+    def _handle_have(self, filename='', content=None, options=None):
+        # v1 sends the hash in place of the filename, v2 as an option
+        return self.file.have([options.get('hash') or filename])
+    
+    def _handle_link(self, filename='', content=None, options=None):
+        if not filename:
+            logger.warning("LINK command missing filename")
+            return {"status": "ERROR", "data": "Filename required for LINK command"}
+            
+        logger.info("Executing LINK command for file: %s", filename)
+        return self.file.link([filename, options.get('hash')])
+    
+    def _handle_stats(self, filename='', content=None, options=None):
+        logger.info("Executing STATS command")
+        return {"status": "OK", "data": self.stats.snapshot()}
+    
+    def _handle_mget(self, filename='', content=None, options=None):
+        names = self._batch_names(filename, options)
+        logger.info("Executing MGET command for %d files", len(names))
+        return self.batch_result(self.file.get_many(names), len(names))
+    
+    def _handle_mdelete(self, filename='', content=None, options=None):
+        names = self._batch_names(filename, options)
+        logger.info("Executing MDELETE command for %d files", len(names))
+        return self.batch_result(self.file.delete_many(names), len(names))
+    
+    def _handle_archive(self, filename='', content=None, options=None):
+        # Like LIST, a single filename slot is a name prefix; several names
+        # (or v2 meta "names") select exact files
+        names = options.get('names')
+        prefix = options.get('prefix', filename or '')
+        logger.info("Executing ARCHIVE command for %s",
+                    f"{len(names)} files" if names else f"prefix {prefix!r}")
+        return self.file.archive([names, prefix, options.get('compression')])
+    
+    def _handle_sigs(self, filename='', content=None, options=None):
+        if not filename:
+            logger.warning("SIGS command missing filename")
+            return {"status": "ERROR", "data": "Filename required for SIGS command"}
+            
+        logger.info("Executing SIGS command for file: %s", filename)
+        return self.file.signatures([filename, options.get('block_size')])
+    
+    def _handle_delta(self, filename='', content=None, options=None):
+        if not filename:
+            logger.warning("DELTA command missing filename")
+            return {"status": "ERROR", "data": "Filename required for DELTA command"}
+            
+        if content is None:
+            logger.warning("DELTA command missing content")
+            return {"status": "ERROR", "data": "Content required for DELTA command"}
+            
+        logger.info("Executing DELTA command for file: %s", filename)
+        return self.file.upload_delta([filename, content, options.get('digest')])
+    
+    def _handle_mupload(self, filename='', content=None, options=None):
+        if content is None:
+            logger.warning("MUPLOAD command missing content")
+            return {"status": "ERROR", "data": "Content required for MUPLOAD command"}
+        
+        logger.info("Executing MUPLOAD command")
+        # The body has to be consumed before the response goes out
+        results = list(self.file.upload_many(self.upload_records(content)))
+        return self.batch_result(results, len(results))
 
 
 if __name__=='__main__':
@@ -8,19 +8,53 @@ import json
 import struct
 import os
 import multiprocessing
+import multiprocessing.connection
 import argparse
+import select
 import signal
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 
 from file_protocol import FileProtocol
+from file_admission import AdmissionQueue, busy_result
+from file_stats import ServerStats, new_row
+from file_metrics import MetricsServer
+import file_logging
+import file_profile
+import file_trace
+from file_memory import MemoryBudget, BufferPool, MIN_BUFFER, buffer_size_for
+from file_interface import FileInterface
+from file_framing import (MAGIC, VERSION, PIPELINE_VERSION, VERSION_FORMAT, HEADER, OPCODES,
+                          UPLOAD_COMMANDS, parse_legacy_command, split_meta,
+                          encode_handshake, encode_frame, encode_legacy,
+                          encode_raw_header, encode_chunk, END_CHUNK, decode_meta,
+                          LENGTH_PREFIX, succeeded)
 
 # Socket configuration
 SOCKET_CONFIG = {
-    'buffer_size': 256 * 1024 * 1024,  # 256MB buffer
-    'chunk_size': 256 * 1024 * 1024,   # 256MB chunks
+    'buffer_size': None,               # SO_SNDBUF/SO_RCVBUF, None leaves them to kernel autotuning
+    'upload_buffer': 1024 * 1024,      # Largest per-connection transfer buffer (sized by BDP below)
+    'memory_budget': 512 * 1024 * 1024,  # Transfer memory shared by the connections of a process
+    'max_command': 1024 * 1024,        # Longest accepted command / v2 meta
+    'cache_size': 512 * 1024 * 1024,   # 512MB of hot GET content per process
+    'precompress': False,              # Store compressed copies of files fetched compressed
     'backlog': 100,                    # Connection backlog
+    'queue_depth': 50,                 # Admitted jobs that may wait for a busy worker
+    'shed_timeout': 1.0,               # Time given to a rejected client to send and read
+    'pipeline_depth': 32,              # Requests of one v3 connection processed at once
+    'yield_poll': 0.05,                # Seconds between checks whether an idle v1 connection yields its worker
+    'stats_interval': 0,               # Seconds between logged stats summaries, 0 disables
+    'metrics_port': 0,                 # HTTP port of the Prometheus /metrics endpoint, 0 disables
+    'metrics_host': '127.0.0.1',       # Interface of the /metrics endpoint
+    'profile': None,                   # 'sample' or 'cprofile' to profile every worker process
+    'trace': 0,                        # Per-request phase traces kept in the ring buffer, 0 disables
+    'profile_dir': 'profiles',         # Where profiles and trace dumps are written
+    'log_levels': {},                  # Logger name ('' for all) -> level, see file_logging
+    'log_sample': {},                  # Logger name -> fraction of INFO/DEBUG records kept
+    'log_rate': {},                    # Logger name -> INFO/DEBUG records per second
     'keepalive': {
         'idle': 60,                    # Seconds before sending keepalive probes
         'interval': 10,                # Interval between keepalives
@@ -40,40 +74,218 @@ def with_error_handling(func):
             return None
     return wrapper
 
+def new_protocol(shared=False, stats=None):
+    """FileProtocol configured from SOCKET_CONFIG"""
+    return FileProtocol(buffer_size=SOCKET_CONFIG['upload_buffer'],
+                        cache_size=SOCKET_CONFIG['cache_size'],
+                        shared=shared,
+                        precompress=SOCKET_CONFIG['precompress'],
+                        stats=stats)
+
+def new_buffer_pool():
+    """Per-process transfer buffers limited by SOCKET_CONFIG['memory_budget']"""
+    return BufferPool(MemoryBudget(SOCKET_CONFIG['memory_budget']))
+
+def log_cache_stats(protocol):
+    if protocol is not None and protocol.file.cache is not None:
+        logger.info(f"GET cache: {protocol.file.cache.stats()}")
+
+def start_monitoring(stats):
+    """Periodic stats log and /metrics endpoint, when configured"""
+    if SOCKET_CONFIG['stats_interval']:
+        stats.report_every(SOCKET_CONFIG['stats_interval'], logger)
+    if SOCKET_CONFIG['metrics_port']:
+        MetricsServer(stats, SOCKET_CONFIG['metrics_port'], SOCKET_CONFIG['metrics_host']).start()
+        logger.info(f"Metrics on http://{SOCKET_CONFIG['metrics_host']}:{SOCKET_CONFIG['metrics_port']}/metrics")
+
+# Small chunked pieces (batch items) are sent together up to this size
+COALESCE_BYTES = 64 * 1024
+
+def next_pieces(chunks):
+    """Pull pieces from ``chunks`` until about COALESCE_BYTES; [] at the end"""
+    pieces = []
+    size = 0
+    for piece in chunks:
+        pieces.append(piece)
+        size += len(piece)
+        if size >= COALESCE_BYTES:
+            break
+    return pieces
+
+@contextmanager
+def result_body(result):
+    """Pop the body a result owns (``stream`` or ``chunks``) for sending.
+
+    Both are closed on the way out, also when sending fails or is
+    cancelled before the body is reached.
+    """
+    stream = result.pop('stream', None)
+    chunks = result.pop('chunks', None)
+    try:
+        yield stream, chunks
+    finally:
+        if stream is not None:
+            stream.close()
+        if chunks is not None:
+            try:
+                chunks.close()
+            except ValueError:
+                pass  # Cancelled while the pool was still reading it
+
+def start_diagnostics():
+    """Profiler and request tracing of this process, when configured"""
+    file_profile.start(SOCKET_CONFIG['profile'], SOCKET_CONFIG['profile_dir'])
+    file_trace.enable(SOCKET_CONFIG['trace'])
+
+def dump_diagnostics(sig=None, frame=None):
+    """Write the trace ring buffer and the profile so far (SIGUSR1)"""
+    for path in (file_trace.dump_to(SOCKET_CONFIG['profile_dir']), file_profile.write()):
+        if path:
+            logger.info(f"Wrote {path}")
+
+class SocketReader:
+    """File-like view over the next ``length`` bytes of a connection.
+
+    Lets an upload be consumed straight from the socket instead of being
+    collected in memory first. ``chunks`` receives into one pooled buffer
+    sized by the connection's bandwidth-delay product. Raises
+    ConnectionError if the peer goes away before the announced length has
+    arrived.
+    """
+    def __init__(self, connection, length, buffers):
+        self.connection = connection
+        self.remaining = length
+        self.buffers = buffers
+
+    def readinto(self, buffer):
+        if self.remaining == 0:
+            return 0
+        view = memoryview(buffer)[:self.remaining]
+        nbytes = self.connection.recv_into(view)
+        if nbytes == 0:
+            raise ConnectionError("Client disconnected during upload")
+        self.remaining -= nbytes
+        file_trace.mark('recv')
+        return nbytes
+
+    def chunks(self):
+        """Yield the payload as views of a reused buffer"""
+        if not self.remaining:
+            return
+        size = min(self.remaining, buffer_size_for(self.connection, SOCKET_CONFIG['upload_buffer']))
+        with self.buffers.buffer(size) as buffer:
+            view = memoryview(buffer)
+            while self.remaining:
+                nbytes = self.readinto(view)
+                yield view[:nbytes]
+
+    def drain(self):
+        """Discard the unconsumed part of the payload; False if the peer left"""
+        try:
+            for _ in self.chunks():
+                pass
+        except ConnectionError:
+            return False
+        return True
+
 class ProcessTheClient:
     """Handles client connections and processes requests"""
-    def __init__(self, connection, address):
+    def __init__(self, connection, address, protocol=None, buffers=None, requests=None,
+                 admission=None):
         self.connection = optimize_socket(connection)
         self.address = address
-        self.protocol = FileProtocol()
+        self.protocol = protocol or new_protocol()
+        self.stats = self.protocol.stats
+        self.buffers = buffers or new_buffer_pool()
+        self.requests = requests  # Executor for pipelined v3 requests, None runs them in order
+        self.admission = admission  # AdmissionQueue whose waiting connections an idle v1 client yields to
+        self.send_lock = threading.Lock()  # One response frame at a time on the socket
         self.running = True
-        logger.info(f"New client handler for {address}")
+        logger.info("New client handler for %s", address)
 
     def receive_data(self, length):
-        """Receive exact amount of data"""
-        chunks = []
+        """Receive exact amount of data (headers and commands, not payloads)"""
+        if length > SOCKET_CONFIG['max_command']:
+            logger.warning(f"Refusing {length} byte command from {self.address}")
+            return None
+        data = bytearray(length)
+        view = memoryview(data)
         bytes_received = 0
         
         while bytes_received < length:
-            chunk = self.connection.recv(min(length - bytes_received, 
-                                            SOCKET_CONFIG['chunk_size']))
-            if not chunk:
+            nbytes = self.connection.recv_into(view[bytes_received:])
+            if not nbytes:
                 return None
-                
-            chunks.append(chunk)
-            bytes_received += len(chunk)
+            bytes_received += nbytes
+            
+        return data
+
+    @with_error_handling
+    def reject(self, retry_after):
+        """Answer the first request with BUSY and close, without serving it.
+
+        The reply needs the right framing, so the opening request is read
+        first; whatever else the client sends (an upload payload) is read
+        and dropped for up to ``shed_timeout`` so that closing does not
+        reset the connection before the client saw the reply.
+        """
+        result = busy_result(retry_after)
+        deadline = time.monotonic() + SOCKET_CONFIG['shed_timeout']
+        self.connection.settimeout(SOCKET_CONFIG['shed_timeout'])
+        try:
+            opening = self.receive_data(4)
+            if not opening:
+                return
+            if opening == MAGIC:
+                version_data = self.receive_data(VERSION_FORMAT.size)
+                if version_data is None:
+                    return
+                self.connection.sendall(encode_handshake(min(VERSION_FORMAT.unpack(version_data)[0], VERSION)))
+                header = self.receive_data(HEADER.size)
+                if not header:
+                    return
+                opcode, _, _, request_id, _, _ = HEADER.unpack(header)
+                self.connection.sendall(encode_frame(opcode, request_id, result))
+            else:
+                command_data = self.receive_data(struct.unpack('!I', opening)[0])
+                if not command_data:
+                    return
+                command, _, _ = parse_legacy_command(command_data)
+                self.send_result(result, raw=command in self.protocol.raw_commands)
             
-        return b''.join(chunks)
+            self.connection.shutdown(socket.SHUT_WR)
+            scratch = bytearray(MIN_BUFFER)
+            while time.monotonic() < deadline and self.connection.recv_into(scratch):
+                pass
+        except (socket.timeout, ConnectionError):
+            pass
+        finally:
+            self.connection.close()
 
     @with_error_handling
     def handle_client(self):
         """Main client handling loop"""
+        self.stats.add('connections')
+        self.stats.add('active_connections')
+        try:
+            # The first 4 bytes are either the v2 magic or the length of
+            # the first legacy command
+            opening = self.receive_data(4)
+            if not opening:
+                return
+            if opening == MAGIC:
+                self.serve_v2()
+            else:
+                self.serve_legacy(opening)
+        finally:
+            # Clean up connection
+            self.connection.close()
+            self.stats.add('active_connections', -1)
+            logger.info("Connection closed for %s", self.address)
+
+    def serve_legacy(self, length_data):
+        """Protocol v1: length-prefixed shlex commands, JSON responses"""
         while self.running:
-            # Read message length
-            length_data = self.connection.recv(4)
-            if not length_data:
-                break
-                
             # Parse command length and read command
             cmd_length = struct.unpack('!I', length_data)[0]
             command_data = self.receive_data(cmd_length)
@@ -82,44 +294,205 @@ class ProcessTheClient:
                 break
                 
             # Parse command
-            command_str = command_data.decode()
-            parts = shlex.split(command_str)
+            trace = file_trace.begin()
+            command, filename, options = parse_legacy_command(command_data)
+            file_trace.mark('parse')
             
-            if not parts:
-                continue
-                
-            # Extract command components
-            command = parts[0].lower()
-            filename = parts[1] if len(parts) > 1 else ''
-            
-            # Handle file upload
-            content = None
-            if command == 'upload':
-                length_data = self.connection.recv(4)
-                if length_data:
+            if command:
+                started = time.perf_counter()
+                bytes_in = 4 + cmd_length
+                # Handle file upload: the payload is streamed to disk by the
+                # protocol instead of being collected here first
+                content = None
+                if command in UPLOAD_COMMANDS:
+                    length_data = self.receive_data(4)
+                    if not length_data:
+                        break
                     file_length = struct.unpack('!I', length_data)[0]
-                    content = self.receive_data(file_length)
+                    bytes_in += 4 + file_length
+                    content = SocketReader(self.connection, file_length, self.buffers)
+                
+                # Process command and send response; a legacy GET holds the
+                # whole encoded file, so it waits for room in the budget
+                memory = self.protocol.memory_needed(command, filename, options)
+                with self.buffers.budget.reserve(memory):
+                    file_trace.mark('wait')
+                    result = self.protocol.proses_string(command, filename, content, options)
+                    file_trace.mark('process')
+                    # Keep the stream in sync if the upload was rejected early,
+                    # and stop if the client went away mid-upload
+                    if content is not None and not content.drain():
+                        break
+                    bytes_out = self.send_result(result, raw=command in self.protocol.raw_commands)
+                self.stats.record(command, time.perf_counter() - started,
+                                  succeeded(result), bytes_in, bytes_out)
+                file_trace.end(trace, command, filename, result.get('status'))
+            else:
+                file_trace.end(trace, command)
             
-            # Process command and send response
-            result = self.protocol.proses_string(command, filename, content)
-            response = json.dumps(result) + "\r\n\r\n"
-            self.connection.sendall(response.encode())
+            # Read next message length
+            if not self.await_command():
+                break
+            length_data = self.receive_data(4)
+            if not length_data:
+                break
+
+    def await_command(self):
+        """Wait for the next v1 command of a kept-alive connection.
+
+        The connection holds this worker while it is idle, so it is given
+        up (False) when nothing arrives and another connection waits for a
+        worker; the client reconnects for its next command.
+        """
+        if self.admission is None:
+            return True
+        poller = select.poll()
+        poller.register(self.connection, select.POLLIN)
+        while not poller.poll(SOCKET_CONFIG['yield_poll'] * 1000):
+            if not self.running or self.admission.waiting():
+                return False
+        return True
+
+    def serve_v2(self):
+        """Protocol v2: fixed binary header, JSON meta and raw body"""
+        version_data = self.receive_data(VERSION_FORMAT.size)
+        if not version_data:
+            return
+        version = min(VERSION_FORMAT.unpack(version_data)[0], VERSION)
+        self.connection.sendall(encode_handshake(version))
         
-        # Clean up connection
-        self.connection.close()
-        logger.info(f"Connection closed for {self.address}")
+        # v3 clients match responses by request id, so requests without a
+        # body run concurrently on the request pool while this thread reads
+        # on; requests with a body are read and answered here, in order
+        pipelined = version >= PIPELINE_VERSION and self.requests is not None
+        depth = SOCKET_CONFIG['pipeline_depth']
+        slots = threading.BoundedSemaphore(depth)
+        try:
+            while self.running:
+                header = self.receive_data(HEADER.size)
+                if not header:
+                    break
+                opcode, _, _, request_id, meta_length, body_length = HEADER.unpack(header)
+                started = time.perf_counter()
+                trace = file_trace.begin()
+                meta_data = self.receive_data(meta_length) if meta_length else b''
+                if meta_data is None:
+                    break
+                meta = decode_meta(meta_data)
+                file_trace.mark('parse')
+                
+                # The body is only consumed by uploads; drain() skips the rest
+                content = SocketReader(self.connection, body_length, self.buffers)
+                bytes_in = HEADER.size + meta_length + body_length
+                if pipelined and body_length == 0:
+                    slots.acquire()
+                    try:
+                        self.requests.submit(contextvars.copy_context().run, self.answer_pipelined, slots,
+                                             opcode, request_id, meta, content, started, bytes_in, trace)
+                    except RuntimeError:
+                        slots.release()  # Server shutting down
+                        break
+                elif not self.answer(opcode, request_id, meta, content, started, bytes_in, trace):
+                    break
+        finally:
+            # Requests still running send their responses before the close
+            for _ in range(depth):
+                slots.acquire()
+
+    def answer(self, opcode, request_id, meta, content, started, bytes_in, trace):
+        """Process one v2 request and send its frame; False if the client left"""
+        command = OPCODES.get(opcode, '')
+        filename, options = split_meta(meta)
+        result = self.protocol.proses_string(command, filename, content, options)
+        file_trace.mark('process')
+        if not content.drain():
+            return False
+        bytes_out = self.send_frame(opcode, request_id, result)
+        self.stats.record(command, time.perf_counter() - started, succeeded(result),
+                          bytes_in, bytes_out)
+        file_trace.end(trace, command, filename, result.get('status'))
+        return True
+
+    @with_error_handling
+    def answer_pipelined(self, slots, *request):
+        try:
+            self.answer(*request)
+        finally:
+            slots.release()
+
+    def send_result(self, result, raw=False):
+        """Send a command result back to a v1 client.
+
+        Raw commands (GETRAW) answer with a 4-byte length prefixed JSON
+        header; on success the header is followed by ``data_size`` bytes of
+        file body, copied from disk with sendfile. Everything else keeps the
+        JSON + CRLFCRLF format. Returns the number of bytes sent.
+        """
+        with result_body(result) as (stream, chunks):
+            if not raw:
+                response = encode_legacy(result)
+                file_trace.mark('encode')
+                self.connection.sendall(response)
+                file_trace.mark('send')
+                return len(response)
+            
+            header = encode_raw_header(result)
+            self.connection.sendall(header)
+            if stream is not None:
+                # sendfile() rejects a zero count
+                if result['data_size']:
+                    self.connection.sendfile(stream, result.get('data_offset', 0), result['data_size'])
+                file_trace.mark('send')
+                return len(header) + result['data_size']
+            if chunks is not None:
+                return len(header) + self.send_chunks(chunks)
+            file_trace.mark('send')
+            return len(header)
+
+    def send_frame(self, opcode, request_id, result):
+        """Send a command result back to a v2 client as one frame"""
+        with result_body(result) as (stream, chunks):
+            body_length = result['data_size'] if stream is not None else 0
+            frame = encode_frame(opcode, request_id, result, body_length)
+            with self.send_lock:
+                self.connection.sendall(frame)
+                if stream is not None:
+                    if body_length:
+                        self.connection.sendfile(stream, result.get('data_offset', 0), body_length)
+                elif chunks is not None:
+                    body_length = self.send_chunks(chunks)
+        file_trace.mark('send')
+        return len(frame) + body_length
+
+    def send_chunks(self, chunks):
+        """Send a body of unknown length (compressed on the fly) in pieces"""
+        sent = len(END_CHUNK)
+        while True:
+            pieces = next_pieces(chunks)
+            if not pieces:
+                break
+            data = b''.join(encode_chunk(piece) for piece in pieces)
+            file_trace.mark('encode')
+            self.connection.sendall(data)
+            sent += len(data)
+            file_trace.mark('send')
+        self.connection.sendall(END_CHUNK)
+        return sent
 
 class Server(threading.Thread):
     """Server that handles client connections using a worker pool"""
-    def __init__(self, ipaddress='0.0.0.0', port=8889, max_workers=50, use_process_pool=False):
+    def __init__(self, ipaddress='0.0.0.0', port=8889, max_workers=50, reuse_port=False, stats=None):
         threading.Thread.__init__(self)
         self.ipaddress = ipaddress
         self.port = port
         self.max_workers = max_workers
-        self.use_process_pool = use_process_pool
+        self.reuse_port = reuse_port
+        self.stats = stats or ServerStats()
         self.running = False
         self.socket = None
         self.pool = None
+        self.protocol = None
+        self.admission = None
         self.daemon = True  # Allow the thread to terminate with the program
     
     def initialize(self):
@@ -127,20 +500,33 @@ class Server(threading.Thread):
         # Create and configure socket
         self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         optimize_socket(self.socket)
+        if self.reuse_port:
+            # Several processes listen on the same port; the kernel spreads
+            # incoming connections across their accept queues
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
         
         # Bind socket
         self.socket.bind((self.ipaddress, self.port))
         self.socket.listen(SOCKET_CONFIG['backlog'])
         
-        # Create appropriate worker pool
-        if self.use_process_pool:
-            self.pool = ProcessPoolExecutor(max_workers=self.max_workers)
-            pool_type = "Process"
-        else:
-            self.pool = ThreadPoolExecutor(max_workers=self.max_workers)
-            pool_type = "Thread"
+        # One protocol instance shared by every connection of this server;
+        # with reuse_port sibling processes write to the same directory
+        self.protocol = new_protocol(shared=self.reuse_port, stats=self.stats)
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                       initializer=file_profile.thread_started)
+        # Pipelined v3 requests get their own workers: a connection waiting
+        # for its requests must not wait on the pool it occupies
+        self.requests = ThreadPoolExecutor(max_workers=self.max_workers,
+                                           initializer=file_profile.thread_started)
+        self.buffers = new_buffer_pool()
+        
+        # Connections beyond the workers and the queue are turned away with
+        # BUSY by one shedding thread; past its own limit they are just closed
+        self.admission = AdmissionQueue(self.max_workers, SOCKET_CONFIG['queue_depth'], self.stats)
+        self.shedder = ThreadPoolExecutor(max_workers=1)
+        self.shedding = threading.BoundedSemaphore(SOCKET_CONFIG['backlog'])
             
-        logger.info(f"Server initialized with {self.max_workers} {pool_type} workers")
+        logger.info(f"Server initialized with {self.max_workers} Thread workers")
         logger.info(f"Server listening on {self.ipaddress}:{self.port}")
     
     def stop(self):
@@ -154,6 +540,9 @@ class Server(threading.Thread):
         # Shutdown the pool
         if self.pool:
             self.pool.shutdown(wait=True)
+            self.requests.shutdown(wait=True)
+            self.shedder.shutdown(wait=True)
+            dump_diagnostics()
             
         logger.info("Server stopped")
     
@@ -161,6 +550,7 @@ class Server(threading.Thread):
         """Main server loop"""
         self.initialize()
         self.running = True
+        start_monitoring(self.stats)
         
         try:
             while self.running:
@@ -169,9 +559,14 @@ class Server(threading.Thread):
                     self.socket.settimeout(1.0)  # 1 second timeout
                     client_socket, client_address = self.socket.accept()
                     
-                    # Create client handler and submit to pool
-                    handler = ProcessTheClient(client_socket, client_address)
-                    self.pool.submit(handler.handle_client)
+                    # Create client handler and submit to pool if it fits
+                    handler = ProcessTheClient(client_socket, client_address, self.protocol,
+                                               self.buffers, self.requests, self.admission)
+                    ticket = self.admission.try_enter()
+                    if ticket is not None:
+                        self.pool.submit(self.serve, handler, ticket)
+                    else:
+                        self.shed(handler)
                     
                 except socket.timeout:
                     # This allows checking self.running periodically
@@ -183,6 +578,472 @@ class Server(threading.Thread):
                     
         finally:
             self.stop()
+            log_cache_stats(self.protocol)
+            logger.info(f"Admission: {self.admission.stats()}")
+
+    def serve(self, handler, ticket):
+        """Run an admitted connection on a pool worker"""
+        started = self.admission.start(ticket)
+        try:
+            handler.handle_client()
+        finally:
+            self.admission.finish(started)
+
+    def shed(self, handler):
+        """Turn a connection away with BUSY off the accept loop"""
+        if not self.shedding.acquire(blocking=False):
+            handler.connection.close()
+            return
+        retry_after = self.admission.retry_after()
+        
+        def reject():
+            try:
+                handler.reject(retry_after)
+            finally:
+                self.shedding.release()
+        
+        self.shedder.submit(reject)
+
+def run_worker(ipaddress, port, threads, socket_config, stats_rows, index):
+    """Entry point of one prefork worker process.
+
+    Runs a threaded Server on its own SO_REUSEPORT listener with its own
+    FileProtocol, until the supervisor sends SIGTERM. Its counters go to
+    row ``index`` of the shared ``stats_rows``.
+    """
+    SOCKET_CONFIG.update(socket_config)
+    configure_logging()
+    # The supervisor reports and exports metrics for all workers
+    SOCKET_CONFIG['stats_interval'] = 0
+    SOCKET_CONFIG['metrics_port'] = 0
+    server = Server(ipaddress=ipaddress, port=port, max_workers=threads, reuse_port=True,
+                    stats=ServerStats(stats_rows, index))
+    
+    def request_stop(sig, frame):
+        server.running = False
+    
+    # Ctrl-C reaches the whole process group; only the supervisor reacts
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGUSR1, dump_diagnostics)
+    start_diagnostics()
+    server.run()
+
+class PreforkServer(threading.Thread):
+    """Supervisor of pre-forked worker processes.
+
+    Every worker accepts on its own listener bound with SO_REUSEPORT, so
+    parsing and base64/JSON work run on separate cores instead of behind
+    one GIL. Workers that die are restarted.
+    """
+    def __init__(self, ipaddress='0.0.0.0', port=8889, processes=5, threads_per_process=1):
+        threading.Thread.__init__(self)
+        self.ipaddress = ipaddress
+        self.port = port
+        self.processes = processes
+        self.threads_per_process = threads_per_process
+        self.running = False
+        self.workers = []
+        self.lock = threading.Lock()
+        # One shared counter row per worker slot, kept across restarts
+        self.stats = ServerStats([new_row() for _ in range(processes)], row=None)
+        self.daemon = True  # Allow the thread to terminate with the program
+
+    def spawn_worker(self, index):
+        self.stats.clear_gauges(index)
+        worker = multiprocessing.Process(
+            target=run_worker,
+            args=(self.ipaddress, self.port, self.threads_per_process, dict(SOCKET_CONFIG),
+                  self.stats.rows, index),
+            daemon=True
+        )
+        worker.start()
+        worker.started_at = time.monotonic()
+        return worker
+
+    def run(self):
+        """Start the workers and restart any that exit"""
+        self.running = True
+        with self.lock:
+            self.workers = [self.spawn_worker(index) for index in range(self.processes)]
+        logger.info(f"Server initialized with {self.processes} worker processes "
+                    f"x {self.threads_per_process} threads")
+        logger.info(f"Server listening on {self.ipaddress}:{self.port}")
+        start_monitoring(self.stats)
+        
+        while self.running:
+            multiprocessing.connection.wait([w.sentinel for w in self.workers], timeout=1.0)
+            with self.lock:
+                if not self.running:
+                    break
+                for index, worker in enumerate(self.workers):
+                    if worker.is_alive():
+                        continue
+                    logger.warning(f"Worker {worker.pid} exited with code {worker.exitcode}, restarting")
+                    # Avoid a tight restart loop when workers die on startup
+                    if time.monotonic() - worker.started_at < 1.0:
+                        time.sleep(1.0)
+                    self.workers[index] = self.spawn_worker(index)
+
+    def signal_workers(self, sig):
+        with self.lock:
+            for worker in self.workers:
+                if worker.is_alive():
+                    os.kill(worker.pid, sig)
+
+    def stop(self):
+        """Terminate all workers"""
+        self.running = False
+        with self.lock:
+            for worker in self.workers:
+                if worker.is_alive():
+                    worker.terminate()
+            for worker in self.workers:
+                worker.join(timeout=5)
+                if worker.is_alive():
+                    worker.kill()
+            self.workers = []
+        logger.info("Server stopped")
+
+class AsyncServer(threading.Thread):
+    """Server that holds client connections on an asyncio event loop.
+
+    A connection costs a coroutine instead of a pool worker, so thousands of
+    idle or slow clients can stay connected. Only disk and encoding work is
+    handed to a bounded thread pool of ``max_workers``. Speaks the same v1
+    and v2 protocols as ProcessTheClient, through the same FileProtocol.
+    """
+    def __init__(self, ipaddress='0.0.0.0', port=8889, max_workers=50):
+        threading.Thread.__init__(self)
+        self.ipaddress = ipaddress
+        self.port = port
+        self.max_workers = max_workers
+        self.loop = None
+        self.pool = None
+        self.protocol = None
+        self.stats = None
+        self.admission = None
+        self.stopped = asyncio.Event()
+        self.daemon = True  # Allow the thread to terminate with the program
+
+    def stop(self):
+        """Ask the event loop to close the listener and finish"""
+        try:
+            if self.loop:
+                self.loop.call_soon_threadsafe(self.stopped.set)
+        except RuntimeError:
+            pass  # Loop already closed
+
+    def run(self):
+        """Run the event loop until stop() is called"""
+        self.loop = asyncio.new_event_loop()
+        file_profile.thread_started()
+        self.pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                       initializer=file_profile.thread_started)
+        self.protocol = new_protocol()
+        self.stats = self.protocol.stats
+        self.budget = MemoryBudget(SOCKET_CONFIG['memory_budget'])
+        self.admission = AdmissionQueue(self.max_workers, SOCKET_CONFIG['queue_depth'], self.stats)
+        start_monitoring(self.stats)
+        try:
+            self.loop.run_until_complete(self.serve())
+            # Cancel connections that are still open
+            tasks = asyncio.all_tasks(self.loop)
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                self.loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        finally:
+            self.loop.close()
+            self.pool.shutdown(wait=True)
+            dump_diagnostics()
+            log_cache_stats(self.protocol)
+            logger.info(f"Admission: {self.admission.stats()}")
+            logger.info("Server stopped")
+
+    async def serve(self):
+        self.slots = asyncio.Semaphore(self.max_workers)
+        server = await asyncio.start_server(
+            self.handle_client, self.ipaddress, self.port,
+            backlog=SOCKET_CONFIG['backlog'], reuse_address=True)
+        logger.info(f"Server initialized with asyncio and {self.max_workers} I/O workers")
+        logger.info(f"Server listening on {self.ipaddress}:{self.port}")
+        async with server:
+            await self.stopped.wait()
+
+    def run_blocking(self, func, *args):
+        """Run disk or encoding work on the bounded pool, in the caller's
+        context so that the request trace follows it"""
+        return self.loop.run_in_executor(self.pool, contextvars.copy_context().run, func, *args)
+
+    @asynccontextmanager
+    async def admitted(self):
+        """Hold one of ``max_workers`` request slots.
+
+        Connections are cheap here, so admission is per request: yields
+        False when the queue in front of the slots is full, and the caller
+        answers BUSY on the same connection.
+        """
+        ticket = self.admission.try_enter()
+        if ticket is None:
+            yield False
+            return
+        started = None
+        try:
+            async with self.slots:
+                started = self.admission.start(ticket)
+                yield True
+        finally:
+            self.admission.finish(started)
+
+    def busy(self):
+        return busy_result(self.admission.retry_after())
+
+    async def handle_client(self, reader, writer):
+        """Per-connection coroutine, the asyncio twin of ProcessTheClient"""
+        address = writer.get_extra_info('peername')
+        optimize_socket(writer.get_extra_info('socket'))
+        logger.info("New client handler for %s", address)
+        self.stats.add('connections')
+        self.stats.add('active_connections')
+        try:
+            opening = await reader.readexactly(4)
+            if opening == MAGIC:
+                await self.serve_v2(reader, writer)
+            else:
+                await self.serve_legacy(opening, reader, writer)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Client went away
+        except Exception as e:
+            logger.error(f"Error in handle_client: {str(e)}")
+        finally:
+            writer.close()
+            self.stats.add('active_connections', -1)
+            logger.info("Connection closed for %s", address)
+
+    async def serve_legacy(self, length_data, reader, writer):
+        while True:
+            cmd_length = struct.unpack('!I', length_data)[0]
+            if cmd_length > SOCKET_CONFIG['max_command']:
+                logger.warning(f"Refusing {cmd_length} byte command")
+                return
+            trace = file_trace.begin()
+            command, filename, options = parse_legacy_command(await reader.readexactly(cmd_length))
+            file_trace.mark('parse')
+            
+            if command:
+                raw = command in self.protocol.raw_commands
+                started = time.perf_counter()
+                bytes_in = 4 + cmd_length
+                async with self.admitted() as admitted:
+                    if command in UPLOAD_COMMANDS:
+                        file_length = struct.unpack('!I', await reader.readexactly(4))[0]
+                        bytes_in += 4 + file_length
+                        if admitted:
+                            result = await self.receive_upload(command, filename, reader, writer, file_length, options)
+                        else:
+                            await self.discard(reader, file_length)
+                            result = self.busy()
+                        bytes_out = await self.send_result(writer, result, raw=raw)
+                    elif not admitted:
+                        await self.send_result(writer, self.busy(), raw=raw)
+                    else:
+                        # A legacy GET holds the whole encoded file in memory
+                        memory = self.protocol.memory_needed(command, filename, options)
+                        async with self.budget.reserve_async(memory):
+                            file_trace.mark('wait')
+                            result = await self.run_blocking(
+                                self.protocol.proses_string, command, filename, None, options)
+                            file_trace.mark('process')
+                            bytes_out = await self.send_result(writer, result, raw=raw)
+                if admitted:
+                    self.stats.record(command, time.perf_counter() - started,
+                                      succeeded(result), bytes_in, bytes_out)
+                    file_trace.end(trace, command, filename, result.get('status'))
+                else:
+                    file_trace.end(trace, command, filename, 'BUSY')
+            else:
+                file_trace.end(trace, command)
+            
+            length_data = await reader.readexactly(4)
+
+    async def serve_v2(self, reader, writer):
+        version_data = await reader.readexactly(VERSION_FORMAT.size)
+        version = min(VERSION_FORMAT.unpack(version_data)[0], VERSION)
+        writer.write(encode_handshake(version))
+        
+        # As in ProcessTheClient.serve_v2: v3 requests without a body are
+        # answered by their own tasks, possibly out of order
+        pipelined = version >= PIPELINE_VERSION
+        send_lock = asyncio.Lock()
+        slots = asyncio.Semaphore(SOCKET_CONFIG['pipeline_depth'])
+        tasks = set()
+        try:
+            while True:
+                header = await reader.readexactly(HEADER.size)
+                opcode, _, _, request_id, meta_length, body_length = HEADER.unpack(header)
+                started = time.perf_counter()
+                trace = file_trace.begin()
+                if meta_length > SOCKET_CONFIG['max_command']:
+                    logger.warning(f"Refusing {meta_length} byte request meta")
+                    return
+                meta = decode_meta(await reader.readexactly(meta_length))
+                file_trace.mark('parse')
+                
+                request = (reader, writer, send_lock, opcode, request_id, meta, body_length, started,
+                           HEADER.size + meta_length + body_length, trace)
+                if pipelined and body_length == 0:
+                    await slots.acquire()
+                    task = asyncio.create_task(self.answer(*request))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                    task.add_done_callback(lambda _: slots.release())
+                else:
+                    await self.answer(*request)
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def answer(self, reader, writer, send_lock, opcode, request_id, meta, body_length,
+                     started, bytes_in, trace):
+        """Process one v2 request and send its frame"""
+        command = OPCODES.get(opcode, '')
+        filename, options = split_meta(meta)
+        async with self.admitted() as admitted:
+            if not admitted:
+                await self.discard(reader, body_length)
+                result = self.busy()
+            elif command in UPLOAD_COMMANDS:
+                result = await self.receive_upload(command, filename, reader, writer, body_length, options)
+            else:
+                await self.discard(reader, body_length)
+                result = await self.run_blocking(
+                    self.protocol.proses_string, command, filename, None, options)
+            file_trace.mark('process')
+            async with send_lock:
+                bytes_out = await self.send_frame(writer, opcode, request_id, result)
+        if admitted:
+            self.stats.record(command, time.perf_counter() - started, succeeded(result),
+                              bytes_in, bytes_out)
+        file_trace.end(trace, command, filename, result.get('status'))
+
+    async def receive_upload(self, command, filename, reader, writer, length, options=None):
+        """Stream an upload payload into the storage root.
+
+        Reading stays on the event loop; only each buffered chunk's decode
+        and write runs on the pool, so a slow uploader holds no thread.
+        """
+        if command == 'mupload':
+            return await self.receive_batch(reader, writer, length)
+        opened = await self.run_blocking(self.protocol.open_upload, command, filename, options)
+        if 'writer' not in opened:
+            # Rejected: skip the payload and answer like FileProtocol does
+            await self.discard(reader, length)
+            return opened
+        
+        upload = opened['writer']
+        remaining = length
+        chunk_size = buffer_size_for(writer.get_extra_info('socket'), SOCKET_CONFIG['upload_buffer'])
+        try:
+            async with self.budget.reserve_async(chunk_size):
+                while remaining:
+                    chunk = await reader.readexactly(min(remaining, chunk_size))
+                    remaining -= len(chunk)
+                    await self.run_blocking(upload.write, chunk)
+        except Exception as e:
+            upload.abort()
+            if isinstance(e, (asyncio.IncompleteReadError, ConnectionError)):
+                raise
+            # Bad content (e.g. invalid base64): keep the stream in sync
+            await self.discard(reader, remaining)
+            return {"status": "ERROR", "data": str(e)}
+        except BaseException:
+            upload.abort()
+            raise
+        return await self.run_blocking(self.protocol.file.commit_upload, [upload])
+
+    async def receive_batch(self, reader, writer, length):
+        """MUPLOAD: every record of the body goes through receive_upload"""
+        results = []
+        while length:
+            meta_length = LENGTH_PREFIX.unpack(await reader.readexactly(LENGTH_PREFIX.size))[0]
+            length -= LENGTH_PREFIX.size
+            if meta_length > min(length, SOCKET_CONFIG['max_command']):
+                await self.discard(reader, length)
+                return {"status": "ERROR", "data": "Malformed batch upload"}
+            meta = decode_meta(await reader.readexactly(meta_length))
+            size = int(meta.get('size', 0))
+            length -= meta_length
+            if size > length:
+                await self.discard(reader, length)
+                return {"status": "ERROR", "data": "Malformed batch upload"}
+            length -= size
+            name = meta.get('name', '')
+            results.append((name, await self.receive_upload('uploadraw', name, reader, writer, size, meta)))
+        return self.protocol.batch_result(results, len(results))
+
+    async def discard(self, reader, length):
+        while length:
+            chunk = await reader.readexactly(min(length, MIN_BUFFER))
+            length -= len(chunk)
+
+    async def send_result(self, writer, result, raw=False):
+        """Returns the number of bytes sent"""
+        with result_body(result) as (stream, chunks):
+            if not raw:
+                # Encoding a base64 GET result is heavy; keep it off the loop
+                if 'data_file' in result:
+                    response = await self.run_blocking(encode_legacy, result)
+                else:
+                    response = encode_legacy(result)
+                file_trace.mark('encode')
+                writer.write(response)
+                sent = len(response)
+            else:
+                header = encode_raw_header(result)
+                writer.write(header)
+                sent = len(header)
+                if stream is not None:
+                    if result['data_size']:
+                        await self.loop.sendfile(writer.transport, stream,
+                                                 result.get('data_offset', 0), result['data_size'])
+                    sent += result['data_size']
+                elif chunks is not None:
+                    sent += await self.send_chunks(writer, chunks)
+        await writer.drain()
+        file_trace.mark('send')
+        return sent
+
+    async def send_frame(self, writer, opcode, request_id, result):
+        with result_body(result) as (stream, chunks):
+            body_length = result['data_size'] if stream is not None else 0
+            frame = encode_frame(opcode, request_id, result, body_length)
+            writer.write(frame)
+            if stream is not None:
+                if body_length:
+                    await self.loop.sendfile(writer.transport, stream,
+                                             result.get('data_offset', 0), body_length)
+            elif chunks is not None:
+                body_length = await self.send_chunks(writer, chunks)
+        await writer.drain()
+        file_trace.mark('send')
+        return len(frame) + body_length
+
+    async def send_chunks(self, writer, chunks):
+        """Compress or read on the pool, a few pieces at a time, and send them"""
+        sent = len(END_CHUNK)
+        while True:
+            pieces = await self.run_blocking(next_pieces, chunks)
+            if not pieces:
+                break
+            data = b''.join(encode_chunk(piece) for piece in pieces)
+            file_trace.mark('encode')
+            writer.write(data)
+            sent += len(data)
+            await writer.drain()
+            file_trace.mark('send')
+        writer.write(END_CHUNK)
+        return sent
 
 @contextmanager
 def managed_socket(sock_type=socket.SOCK_STREAM):
@@ -194,20 +1055,22 @@ def managed_socket(sock_type=socket.SOCK_STREAM):
         sock.close()
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s [%(levelname)s] %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
-logger = logging.getLogger(__name__)
+def configure_logging():
+    file_logging.setup(SOCKET_CONFIG['log_levels'], SOCKET_CONFIG['log_sample'],
+                       SOCKET_CONFIG['log_rate'])
+
+configure_logging()
+logger = logging.getLogger("FileServer")
 
 def optimize_socket(sock):
     """Apply performance optimizations to a socket"""
-    # Set buffer sizes
-    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 
-                    struct.pack('i', SOCKET_CONFIG['buffer_size']))
-    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 
-                    struct.pack('i', SOCKET_CONFIG['buffer_size']))
+    # Set buffer sizes only when pinned: setting them turns off the
+    # kernel's per-connection autotuning
+    if SOCKET_CONFIG['buffer_size']:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 
+                        struct.pack('i', SOCKET_CONFIG['buffer_size']))
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 
+                        struct.pack('i', SOCKET_CONFIG['buffer_size']))
     
     # Set TCP options
     sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
@@ -251,16 +1114,68 @@ def main():
     )
     
     # Define arguments
-    parser.add_argument('--mode', type=int, choices=[1, 2], 
-                       help='Pool mode: 1=ThreadPool, 2=ProcessPool')
+    parser.add_argument('--mode', type=int, choices=[1, 2, 3], 
+                       help='Pool mode: 1=ThreadPool, 2=Prefork processes, 3=asyncio')
     parser.add_argument('--workers', type=int, choices=[1, 5, 50], 
                        help='Number of workers')
+    parser.add_argument('--threads-per-worker', type=int, default=1,
+                       help='Threads inside each worker process (mode 2)')
     parser.add_argument('--port', type=int, default=8889, 
                        help='Port to listen on')
+    parser.add_argument('--upload-buffer', type=int,
+                       default=SOCKET_CONFIG['upload_buffer'],
+                       help='Largest transfer buffer per connection; smaller when the BDP allows')
+    parser.add_argument('--memory-budget', type=int,
+                       default=SOCKET_CONFIG['memory_budget'],
+                       help='Transfer memory in bytes shared by the connections of a process')
+    parser.add_argument('--socket-buffer', type=int, default=SOCKET_CONFIG['buffer_size'],
+                       help='Pin SO_SNDBUF/SO_RCVBUF to this many bytes instead of kernel autotuning')
+    parser.add_argument('--cache-size', type=int,
+                       default=SOCKET_CONFIG['cache_size'],
+                       help='Memory budget in bytes for cached GETs (per process), 0 disables')
+    parser.add_argument('--precompress', action='store_true',
+                       help='Keep compressed copies of files clients fetch compressed')
+    parser.add_argument('--queue-depth', type=int, default=SOCKET_CONFIG['queue_depth'],
+                       help='Jobs that may wait for a busy worker before clients get BUSY')
+    parser.add_argument('--stats-interval', type=float, default=SOCKET_CONFIG['stats_interval'],
+                       help='Log a stats summary every N seconds, 0 disables')
+    parser.add_argument('--metrics-port', type=int, default=SOCKET_CONFIG['metrics_port'],
+                       help='Serve Prometheus metrics on this port at /metrics, 0 disables')
+    parser.add_argument('--metrics-host', default=SOCKET_CONFIG['metrics_host'],
+                       help='Interface for the metrics endpoint')
+    parser.add_argument('--profile', choices=['sample', 'cprofile'],
+                       help='Profile every worker process into --profile-dir')
+    parser.add_argument('--trace', type=int, nargs='?', const=1000, default=SOCKET_CONFIG['trace'],
+                       help='Keep phase timings of the last N requests; dumped on SIGUSR1')
+    parser.add_argument('--profile-dir', default=SOCKET_CONFIG['profile_dir'],
+                       help='Directory for profile files and trace dumps')
+    parser.add_argument('--log-level', action='append', metavar='[NAME=]LEVEL',
+                       help='Log level for all or one subsystem '
+                            f'({", ".join(file_logging.SUBSYSTEMS)}); repeatable')
+    parser.add_argument('--log-sample', action='append', metavar='[NAME=]FRACTION',
+                       help='Keep only this fraction of INFO records, e.g. FileProtocol=0.01')
+    parser.add_argument('--log-rate', action='append', metavar='[NAME=]PER_SECOND',
+                       help='Keep at most this many INFO records per second')
     parser.add_argument('--non-interactive', action='store_true',
                        help='Run in non-interactive mode')
     
     args = parser.parse_args()
+    SOCKET_CONFIG['upload_buffer'] = args.upload_buffer
+    SOCKET_CONFIG['memory_budget'] = args.memory_budget
+    SOCKET_CONFIG['buffer_size'] = args.socket_buffer
+    SOCKET_CONFIG['cache_size'] = args.cache_size
+    SOCKET_CONFIG['precompress'] = args.precompress
+    SOCKET_CONFIG['queue_depth'] = args.queue_depth
+    SOCKET_CONFIG['stats_interval'] = args.stats_interval
+    SOCKET_CONFIG['metrics_port'] = args.metrics_port
+    SOCKET_CONFIG['metrics_host'] = args.metrics_host
+    SOCKET_CONFIG['profile'] = args.profile
+    SOCKET_CONFIG['trace'] = args.trace
+    SOCKET_CONFIG['profile_dir'] = os.path.abspath(args.profile_dir)
+    SOCKET_CONFIG['log_levels'] = file_logging.parse_settings(args.log_level)
+    SOCKET_CONFIG['log_sample'] = file_logging.parse_settings(args.log_sample)
+    SOCKET_CONFIG['log_rate'] = file_logging.parse_settings(args.log_rate)
+    configure_logging()
     
     # Determine if we should use interactive mode
     use_interactive = (
@@ -273,9 +1188,10 @@ def main():
         print("\n=== File Server Configuration ===")
         print("Select execution mode:")
         print("  1. MultiThread Pool")
-        print("  2. MultiProcess Pool")
+        print("  2. MultiProcess (prefork)")
+        print("  3. Asyncio (I/O workers)")
         
-        mode = get_user_input("\nMode [1, 2]", [1, 2])
+        mode = get_user_input("\nMode [1, 2, 3]", [1, 2, 3])
         workers = get_user_input("Server Workers [1, 5, 50]" , [1, 5, 50])
     else:
         # Use command line arguments or defaults
@@ -290,16 +1206,29 @@ def main():
         multiprocessing.set_start_method('spawn')
     
     # Print configuration
-    pool_type = "Process Pool" if use_process_pool else "Thread Pool"
+    pool_type = {1: "Thread Pool", 2: "Prefork Processes", 3: "Asyncio"}[mode]
     print(f"\nStarting server with {pool_type} and {workers} workers")
     
     # Create server instance
-    server = Server(
-        ipaddress='0.0.0.0',
-        port=args.port,
-        max_workers=workers,
-        use_process_pool=use_process_pool
-    )
+    if mode == 3:
+        server = AsyncServer(
+            ipaddress='0.0.0.0',
+            port=args.port,
+            max_workers=workers
+        )
+    elif use_process_pool:
+        server = PreforkServer(
+            ipaddress='0.0.0.0',
+            port=args.port,
+            processes=workers,
+            threads_per_process=args.threads_per_worker
+        )
+    else:
+        server = Server(
+            ipaddress='0.0.0.0',
+            port=args.port,
+            max_workers=workers
+        )
     
     # Set up signal handlers for graceful shutdown
     def signal_handler(sig, frame):
@@ -309,10 +1238,19 @@ def main():
     
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
+    if use_process_pool:
+        # Each worker dumps its own traces and profile
+        signal.signal(signal.SIGUSR1, lambda sig, frame: server.signal_workers(sig))
+    else:
+        start_diagnostics()
+        signal.signal(signal.SIGUSR1, dump_diagnostics)
     
     # Start server
     server.start()
     
+    # Move files copied into the storage root by hand into the blob store
+    threading.Thread(target=FileInterface().adopt_files, daemon=True).start()
+    
     # Keep main thread alive
     try:
         while True:
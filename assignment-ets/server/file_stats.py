@@ -0,0 +1,201 @@
+import bisect
+import logging
+import threading
+import time
+from multiprocessing.sharedctypes import RawArray
+from typing import Dict, List, Optional
+
+"""
+* Counter performa server yang cukup murah untuk selalu aktif: satu lock
+  dan beberapa penjumlahan integer per request.
+
+* Per command: histogram latency (bucket tetap, lihat BUCKETS), total
+  waktu, jumlah error dan byte masuk/keluar. Global: byte masuk/keluar, koneksi aktif dan
+  total, antrean admission (queued, running, workers, rejected, waktu
+  tunggu) dan total waktu sibuk worker untuk menghitung utilisasi.
+
+* Semua angka disimpan dalam satu baris integer (RawArray). Pada mode
+  prefork supervisor membuat satu baris per proses worker di shared
+  memory; setiap worker hanya menulis barisnya sendiri, dan STATS di
+  worker mana pun menjumlahkan semua baris, sehingga hasilnya mencakup
+  seluruh proses.
+"""
+
+# Upper bounds of the latency buckets in seconds; one more bucket catches the rest
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+           0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COMMANDS = ('list', 'get', 'getraw', 'upload', 'uploadraw', 'delete', 'uploadopen',
+            'uploadpart', 'uploadcommit', 'uploadabort', 'have', 'link', 'stats',
+            'mget', 'mdelete', 'mupload', 'archive', 'sigs', 'delta', 'other')
+
+COUNTERS = ('bytes_in', 'bytes_out', 'connections', 'active_connections',
+            'rejected', 'queued', 'running', 'workers', 'started', 'wait_us', 'busy_us')
+
+# Counters that describe the present, cleared when a worker process is replaced
+GAUGES = ('active_connections', 'queued', 'running')
+
+# Row layout: per command the bucket counts, total microseconds, errors and
+# bytes in/out, then the global counters
+_SUM = len(BUCKETS) + 1
+_ERRORS = _SUM + 1
+_BYTES_IN = _SUM + 2
+_BYTES_OUT = _SUM + 3
+_STRIDE = _SUM + 4
+_COMMAND_INDEX = {command: i * _STRIDE for i, command in enumerate(COMMANDS)}
+_COUNTER_INDEX = {counter: len(COMMANDS) * _STRIDE + i for i, counter in enumerate(COUNTERS)}
+ROW_SIZE = len(COMMANDS) * _STRIDE + len(COUNTERS)
+
+
+def new_row():
+    """Zeroed counter row, in memory that child processes can share"""
+    return RawArray('q', ROW_SIZE)
+
+
+def percentile(buckets: List[int], fraction: float) -> Optional[float]:
+    """Upper bound of the bucket holding the ``fraction`` quantile"""
+    total = sum(buckets)
+    if not total:
+        return None
+    rank = fraction * total
+    seen = 0
+    for bound, count in zip(BUCKETS + (None,), buckets):
+        seen += count
+        if seen >= rank:
+            return bound
+    return None
+
+
+class ServerStats:
+    """Counters of one server process, readable for all processes.
+
+    ``rows`` holds one row per process and ``row`` is the index this
+    process writes to; with ``row=None`` the instance only reads (the
+    prefork supervisor).
+    """
+    def __init__(self, rows=None, row: Optional[int] = 0):
+        self.rows = rows if rows is not None else [new_row()]
+        self.own = self.rows[row] if row is not None else None
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def record(self, command: str, seconds: float, ok: bool = True,
+               bytes_in: int = 0, bytes_out: int = 0) -> None:
+        """Account one finished request"""
+        base = _COMMAND_INDEX.get(command, _COMMAND_INDEX['other'])
+        bucket = base + bisect.bisect_left(BUCKETS, seconds)
+        row = self.own
+        with self.lock:
+            row[bucket] += 1
+            row[base + _SUM] += int(seconds * 1000000)
+            if not ok:
+                row[base + _ERRORS] += 1
+            row[base + _BYTES_IN] += bytes_in
+            row[base + _BYTES_OUT] += bytes_out
+            row[_COUNTER_INDEX['bytes_in']] += bytes_in
+            row[_COUNTER_INDEX['bytes_out']] += bytes_out
+
+    def add(self, counter: str, amount: int = 1) -> None:
+        with self.lock:
+            self.own[_COUNTER_INDEX[counter]] += amount
+
+    def set(self, counter: str, value: int) -> None:
+        self.own[_COUNTER_INDEX[counter]] = value
+
+    def clear_gauges(self, row: int) -> None:
+        """Forget what a dead worker process was doing"""
+        for gauge in GAUGES:
+            self.rows[row][_COUNTER_INDEX[gauge]] = 0
+
+    def totals(self) -> List[int]:
+        totals = [0] * ROW_SIZE
+        for row in self.rows:
+            for i, value in enumerate(row[:]):
+                totals[i] += value
+        return totals
+
+    def snapshot(self) -> Dict:
+        """All counters summed over every process, as sent by STATS"""
+        totals = self.totals()
+        counter = {name: totals[index] for name, index in _COUNTER_INDEX.items()}
+        commands = {}
+        errors = 0
+        for command, base in _COMMAND_INDEX.items():
+            buckets = totals[base:base + _SUM]
+            count = sum(buckets)
+            if not count:
+                continue
+            command_errors = totals[base + _ERRORS]
+            errors += command_errors
+            commands[command] = {
+                "count": count,
+                "errors": command_errors,
+                "seconds": totals[base + _SUM] / 1000000,
+                "mean": totals[base + _SUM] / count / 1000000,
+                "bytes_in": totals[base + _BYTES_IN],
+                "bytes_out": totals[base + _BYTES_OUT],
+                "p50": percentile(buckets, 0.5),
+                "p90": percentile(buckets, 0.9),
+                "p99": percentile(buckets, 0.99),
+                "buckets": buckets,
+            }
+        workers = counter['workers']
+        return {
+            "uptime": time.time() - self.started,
+            "connections": {"active": counter['active_connections'],
+                            "total": counter['connections']},
+            "bytes": {"in": counter['bytes_in'], "out": counter['bytes_out']},
+            "queue": {"depth": counter['queued'], "running": counter['running'],
+                      "workers": workers, "rejected": counter['rejected'],
+                      "started": counter['started'],
+                      "wait_seconds": counter['wait_us'] / 1000000,
+                      "wait_avg": counter['wait_us'] / counter['started'] / 1000000
+                                  if counter['started'] else 0.0},
+            "utilisation": counter['running'] / workers if workers else 0.0,
+            "busy_seconds": counter['busy_us'] / 1000000,
+            "errors": errors,
+            "commands": commands,
+            "bucket_bounds": list(BUCKETS),
+        }
+
+    def report_every(self, interval: float, log: logging.Logger) -> threading.Thread:
+        """Log a summary of the last ``interval`` seconds from a daemon thread"""
+        def report():
+            previous = self.snapshot()
+            while True:
+                time.sleep(interval)
+                current = self.snapshot()
+                log.info(f"Stats: {summarize(previous, current)}")
+                previous = current
+
+        thread = threading.Thread(target=report, daemon=True)
+        thread.start()
+        return thread
+
+
+def summarize(previous: Dict, current: Dict) -> Dict:
+    """Rates and latencies between two snapshots"""
+    elapsed = max(current['uptime'] - previous['uptime'], 1e-9)
+    workers = current['queue']['workers']
+    busy = current['busy_seconds'] - previous['busy_seconds']
+    commands = {}
+    for command, now in current['commands'].items():
+        before = previous['commands'].get(command)
+        buckets = [a - b for a, b in zip(now['buckets'], before['buckets'])] if before else now['buckets']
+        count = sum(buckets)
+        if count:
+            commands[command] = {
+                "rps": round(count / elapsed, 2),
+                "errors": now['errors'] - (before['errors'] if before else 0),
+                "p50": percentile(buckets, 0.5),
+                "p99": percentile(buckets, 0.99),
+            }
+    return {
+        "active": current['connections']['active'],
+        "queued": current['queue']['depth'],
+        "rejected": current['queue']['rejected'] - previous['queue']['rejected'],
+        "in_mbps": round((current['bytes']['in'] - previous['bytes']['in']) / elapsed / 1e6, 2),
+        "out_mbps": round((current['bytes']['out'] - previous['bytes']['out']) / elapsed / 1e6, 2),
+        "utilisation": round(busy / (workers * elapsed), 3) if workers else 0.0,
+        "commands": commands,
+    }
@@ -0,0 +1,107 @@
+import contextvars
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+"""
+* Trace per request (opsional): berapa lama sebuah request menghabiskan
+  waktu di setiap fase, mis. parse, recv, disk, encode, send.
+
+* Transport memanggil begin() saat command diterima dan end() setelah
+  response terkirim; kode di antaranya (FileInterface, SocketReader, ...)
+  cukup memanggil mark(fase) setelah sebuah fase selesai. Waktu sejak
+  mark sebelumnya dijumlahkan ke fase tersebut.
+
+* Trace yang sedang berjalan disimpan di ContextVar, sehingga ikut
+  berpindah dari event loop ke thread pool pada mode asyncio (lihat
+  AsyncServer.run_blocking). Jika tracing mati, mark() hanya satu
+  ContextVar.get().
+
+* Trace yang selesai masuk ring buffer berukuran tetap, yang bisa
+  diambil dengan recent() atau ditulis ke file dengan dump_to()
+  (mis. saat SIGUSR1).
+"""
+
+_current: contextvars.ContextVar = contextvars.ContextVar('file_trace', default=None)
+_lock = threading.Lock()
+_ring: Optional[deque] = None
+
+
+class Trace:
+    __slots__ = ('started', 'wall', 'last', 'phases')
+
+    def __init__(self):
+        self.started = self.last = time.perf_counter()
+        self.wall = time.time()
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + now - self.last
+        self.last = now
+
+
+def enable(capacity: int) -> None:
+    """Keep the last ``capacity`` request traces; 0 turns tracing off"""
+    global _ring
+    _ring = deque(maxlen=capacity) if capacity else None
+
+
+def enabled() -> bool:
+    return _ring is not None
+
+
+def begin() -> Optional[Trace]:
+    """Start tracing the current request; returns the trace for ``end``"""
+    if _ring is None:
+        return None
+    trace = Trace()
+    _current.set(trace)
+    return trace
+
+
+def mark(phase: str) -> None:
+    trace = _current.get()
+    if trace is not None:
+        trace.mark(phase)
+
+
+def end(trace: Optional[Trace], command: str, filename: str = '', status: str = '') -> None:
+    """Finish ``trace``; it may have been begun in another thread or task"""
+    if trace is None:
+        return
+    _current.set(None)
+    if _ring is None:
+        return
+    record = {
+        "time": trace.wall,
+        "command": command,
+        "name": filename,
+        "status": status,
+        "total_ms": round((time.perf_counter() - trace.started) * 1000, 3),
+        "phases_ms": {phase: round(seconds * 1000, 3) for phase, seconds in trace.phases.items()},
+    }
+    with _lock:
+        _ring.append(record)
+
+
+def recent() -> List[Dict]:
+    with _lock:
+        return list(_ring) if _ring is not None else []
+
+
+def dump_to(directory: str) -> Optional[str]:
+    """Write the ring buffer as JSON lines to ``trace-<pid>.jsonl``"""
+    if _ring is None:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"trace-{os.getpid()}.jsonl")
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w') as fp:
+        for record in recent():
+            fp.write(json.dumps(record) + '\n')
+    os.replace(temp_path, path)
+    return path
@@ -0,0 +1,27 @@
+import os
+import unittest
+
+"""
+* client/ dan server/ dijalankan di mesin berbeda, jadi modul yang
+  dipakai keduanya disalin ke dua direktori. Test ini memastikan
+  salinannya tidak berbeda.
+
+Jalankan dari assignment-ets: python -m unittest discover tests
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SHARED_MODULES = ('file_codec.py', 'file_delta.py')
+
+
+class SharedModulesTest(unittest.TestCase):
+    def test_client_and_server_copies_are_identical(self):
+        for name in SHARED_MODULES:
+            with self.subTest(module=name):
+                with open(os.path.join(ROOT, 'client', name), 'rb') as client_copy, \
+                        open(os.path.join(ROOT, 'server', name), 'rb') as server_copy:
+                    self.assertEqual(client_copy.read(), server_copy.read(),
+                                     f"client/{name} and server/{name} differ")
+
+
+if __name__ == '__main__':
+    unittest.main()
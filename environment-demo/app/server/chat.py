@@ -19,7 +19,7 @@ class Chat:
 			if (command=='auth'):
 				username=j[1].strip()
 				password=j[2].strip()
-				logging.warning("AUTH: auth {} {}" . format(username,password))
+				logging.info("AUTH: auth {}" . format(username))
 				return self.autentikasi_user(username,password)
 			elif (command=='send'):
 				sessionid = j[1].strip()
@@ -28,12 +28,12 @@ class Chat:
 				for w in j[3:]:
 					message="{} {}" . format(message,w)
 				usernamefrom = self.sessions[sessionid]['username']
-				logging.warning("SEND: session {} send message from {} to {}" . format(sessionid, usernamefrom,usernameto))
+				logging.info("SEND: send message from {} to {}" . format(usernamefrom,usernameto))
 				return self.send_message(sessionid,usernamefrom,usernameto,message)
 			elif (command=='inbox'):
 				sessionid = j[1].strip()
 				username = self.sessions[sessionid]['username']
-				logging.warning("INBOX: {}" . format(sessionid))
+				logging.info("INBOX: {}" . format(username))
 				return self.get_inbox(username)
 			else:
 				return {'status': 'ERROR', 'message': '**Protocol Tidak Benar'}
@@ -88,6 +88,14 @@ class Chat:
 			
 		return {'status': 'OK', 'messages': msgs}
 
+	def queued_messages(self):
+		# jumlah pesan yang belum diambil (inbox) per user
+		queued={}
+		for username in list(self.users):
+			incoming = self.users[username]['incoming']
+			queued[username]=sum(q.qsize() for q in list(incoming.values()))
+		return queued
+
 
 if __name__=="__main__":
 	j = Chat()
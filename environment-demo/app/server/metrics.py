@@ -0,0 +1,104 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Endpoint /metrics (format teks Prometheus) untuk chat server, di port
+# tersendiri dan thread tersendiri sehingga scrape tidak mengganggu
+# thread yang melayani client.
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COMMANDS = ('auth', 'send', 'inbox')  # selain ini dicatat sebagai 'other'
+
+class Metrics:
+     def __init__(self):
+          self.lock = threading.Lock()
+          self.requests = {}
+          self.open_connections = 0
+          self.connections_total = 0
+
+     def connection_opened(self):
+          with self.lock:
+               self.open_connections += 1
+               self.connections_total += 1
+
+     def connection_closed(self):
+          with self.lock:
+               self.open_connections -= 1
+
+     def record(self, command, seconds, ok, bytes_in, bytes_out):
+          if command not in COMMANDS:
+               command = 'other'
+          with self.lock:
+               if command not in self.requests:
+                    self.requests[command] = {'buckets': [0] * (len(BUCKETS) + 1), 'sum': 0.0,
+                                              'errors': 0, 'bytes_in': 0, 'bytes_out': 0}
+               r = self.requests[command]
+               r['buckets'][bisect.bisect_left(BUCKETS, seconds)] += 1
+               r['sum'] += seconds
+               if not ok:
+                    r['errors'] += 1
+               r['bytes_in'] += bytes_in
+               r['bytes_out'] += bytes_out
+
+     def render(self, queued):
+          with self.lock:
+               requests = {c: dict(r, buckets=list(r['buckets'])) for c, r in self.requests.items()}
+               open_connections = self.open_connections
+               connections_total = self.connections_total
+          lines = []
+          def family(name, kind, help_text):
+               lines.append("# HELP {} {}" . format(name, help_text))
+               lines.append("# TYPE {} {}" . format(name, kind))
+
+          family('chat_requests_total', 'counter', 'Requests served, by command')
+          for c, r in requests.items():
+               lines.append('chat_requests_total{{command="{}"}} {}' . format(c, sum(r['buckets'])))
+          family('chat_request_errors_total', 'counter', 'Requests answered with ERROR')
+          for c, r in requests.items():
+               lines.append('chat_request_errors_total{{command="{}"}} {}' . format(c, r['errors']))
+          family('chat_request_duration_seconds', 'histogram', 'Time to process a request and send the reply')
+          for c, r in requests.items():
+               cumulative = 0
+               for bound, count in zip(BUCKETS, r['buckets']):
+                    cumulative += count
+                    lines.append('chat_request_duration_seconds_bucket{{command="{}",le="{}"}} {}' . format(c, bound, cumulative))
+               lines.append('chat_request_duration_seconds_bucket{{command="{}",le="+Inf"}} {}' . format(c, sum(r['buckets'])))
+               lines.append('chat_request_duration_seconds_sum{{command="{}"}} {}' . format(c, r['sum']))
+               lines.append('chat_request_duration_seconds_count{{command="{}"}} {}' . format(c, sum(r['buckets'])))
+          family('chat_transfer_bytes_total', 'counter', 'Request and reply bytes, by command and direction')
+          for c, r in requests.items():
+               lines.append('chat_transfer_bytes_total{{command="{}",direction="in"}} {}' . format(c, r['bytes_in']))
+               lines.append('chat_transfer_bytes_total{{command="{}",direction="out"}} {}' . format(c, r['bytes_out']))
+          family('chat_open_connections', 'gauge', 'Connected clients')
+          lines.append('chat_open_connections {}' . format(open_connections))
+          family('chat_connections_total', 'counter', 'Clients that connected')
+          lines.append('chat_connections_total {}' . format(connections_total))
+          family('chat_queued_messages', 'gauge', 'Messages waiting in a user\'s inbox')
+          for username, count in queued.items():
+               lines.append('chat_queued_messages{{user="{}"}} {}' . format(username, count))
+          return "\n".join(lines) + "\n"
+
+class MetricsServer(threading.Thread):
+     def __init__(self, metrics, chat, port, host='127.0.0.1'):
+          threading.Thread.__init__(self)
+          self.daemon = True
+
+          class Handler(BaseHTTPRequestHandler):
+               def do_GET(self):
+                    if self.path.split('?')[0] != '/metrics':
+                         self.send_error(404)
+                         return
+                    body = metrics.render(chat.queued_messages()).encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+               def log_message(self, format, *args):
+                    pass
+
+          self.httpd = HTTPServer((host, port), Handler)
+
+     def run(self):
+          self.httpd.serve_forever()
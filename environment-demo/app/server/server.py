@@ -5,13 +5,40 @@ import time
 import sys
 import json
 import logging
+import logging.handlers
 import os
+import queue
 from chat import Chat
+from metrics import Metrics, MetricsServer
 
 SERVER_IP=os.getenv('SERVER_IP') or "0.0.0.0"
 SERVER_PORT=os.getenv('SERVER_PORT') or "8889"
+METRICS_IP=os.getenv('METRICS_IP') or "127.0.0.1"
+METRICS_PORT=os.getenv('METRICS_PORT')
+LOG_LEVEL=os.getenv('LOG_LEVEL') or "WARNING"
+# isi request/response hanya ditulis jika LOG_PAYLOAD=1, password dan session disamarkan
+LOG_PAYLOAD=os.getenv('LOG_PAYLOAD')=='1'
 
 chatserver = Chat()
+metrics = Metrics()
+
+def setup_logging():
+     # thread client hanya memasukkan record ke queue, satu thread yang menulis ke stderr
+     records = queue.SimpleQueue()
+     listener = logging.handlers.QueueListener(records, logging.StreamHandler())
+     listener.start()
+     root = logging.getLogger()
+     root.handlers = [logging.handlers.QueueHandler(records)]
+     root.setLevel(LOG_LEVEL)
+     return listener
+
+def redact(rcv):
+     j = rcv.split(" ")
+     if j[0].strip()=='auth' and len(j)>2:
+          j[2] = '***'
+     elif j[0].strip() in ('send','inbox') and len(j)>1:
+          j[1] = '***'
+     return " ".join(j)
 
 class ProcessTheClient(threading.Thread):
      def __init__(self, connection, address):
@@ -20,6 +47,7 @@ class ProcessTheClient(threading.Thread):
           threading.Thread.__init__(self)
 
      def run(self):
+          metrics.connection_opened()
           rcv=""
           while True:
                data = self.connection.recv(32)
@@ -28,15 +56,23 @@ class ProcessTheClient(threading.Thread):
                     rcv=rcv+d
                     if rcv[-2:]=='\r\n':
                          #end of command, proses string
-                         logging.warning("data dari client: {}" . format(rcv))
-                         hasil = json.dumps(chatserver.proses(rcv))
+                         if LOG_PAYLOAD:
+                              logging.warning("data dari client: {}" . format(redact(rcv)))
+                         mulai = time.perf_counter()
+                         jawaban = chatserver.proses(rcv)
+                         hasil = json.dumps(jawaban)
                          hasil=hasil+"\r\n\r\n"
-                         logging.warning("balas ke  client: {}" . format(hasil))
+                         if LOG_PAYLOAD:
+                              logging.warning("balas ke  client: {}" . format(
+                                   json.dumps(dict(jawaban, tokenid='***') if 'tokenid' in jawaban else jawaban)))
                          self.connection.sendall(hasil.encode())
+                         metrics.record(rcv.split(" ")[0].strip(), time.perf_counter() - mulai,
+                                        jawaban.get('status') == 'OK', len(rcv), len(hasil))
                          rcv=""
                else:
                     break
           self.connection.close()
+          metrics.connection_closed()
 
 class Server(threading.Thread):
      def __init__(self):
@@ -58,6 +94,9 @@ class Server(threading.Thread):
      
 
 def main():
+     setup_logging()
+     if METRICS_PORT:
+          MetricsServer(metrics, chatserver, int(METRICS_PORT), METRICS_IP).start()
      svr = Server()
      svr.start()
 